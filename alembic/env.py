@@ -18,6 +18,9 @@ from app.models.user import User  # noqa: F401
 from app.models.resume import Resume  # noqa: F401
 from app.models.job import Job  # noqa: F401
 from app.models.job_match import JobMatch  # noqa: F401
+from app.models.job_window_stats import JobWindowStats  # noqa: F401
+from app.models.embedding_cache import EmbeddingCache  # noqa: F401
+from app.models.scrape_cursor import ScrapeCursor  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
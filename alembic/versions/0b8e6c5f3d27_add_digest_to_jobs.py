@@ -0,0 +1,30 @@
+"""Add digest to jobs
+
+Revision ID: 0b8e6c5f3d27
+Revises: e4f17b8d2a63
+Create Date: 2026-10-17 16:48:05.291733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b8e6c5f3d27'
+down_revision: Union[str, Sequence[str], None] = 'e4f17b8d2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('digest', sa.Text(), nullable=True))
+    op.add_column('jobs', sa.Column('digest_version', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'digest_version')
+    op.drop_column('jobs', 'digest')
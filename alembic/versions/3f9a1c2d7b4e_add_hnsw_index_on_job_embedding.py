@@ -0,0 +1,38 @@
+"""Add HNSW index on jobs.embedding and created_at index
+
+Revision ID: 3f9a1c2d7b4e
+Revises: 7095cad4feb7
+Create Date: 2026-10-17 09:12:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7b4e'
+down_revision: Union[str, Sequence[str], None] = '7095cad4feb7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_jobs_created_at', 'jobs', ['created_at'], unique=False)
+    op.create_index(
+        'ix_jobs_embedding_hnsw',
+        'jobs',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_embedding_hnsw', table_name='jobs')
+    op.drop_index('ix_jobs_created_at', table_name='jobs')
@@ -0,0 +1,36 @@
+"""Add unique (user_id, job_id) constraint on job_matches
+
+Revision ID: 5d2c8e7a1f90
+Revises: b81e4d09c6a2
+Create Date: 2026-10-17 11:58:43.204719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c8e7a1f90'
+down_revision: Union[str, Sequence[str], None] = 'b81e4d09c6a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 先清理并发写入产生的重复匹配，保留最早创建的一条
+    op.execute("""
+        DELETE FROM job_matches a
+        USING job_matches b
+        WHERE a.user_id = b.user_id
+          AND a.job_id = b.job_id
+          AND (a.created_at, a.id) > (b.created_at, b.id)
+    """)
+    op.create_unique_constraint('uq_job_matches_user_job', 'job_matches', ['user_id', 'job_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_job_matches_user_job', 'job_matches', type_='unique')
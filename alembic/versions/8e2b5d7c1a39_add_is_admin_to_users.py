@@ -0,0 +1,28 @@
+"""Add is_admin to users
+
+Revision ID: 8e2b5d7c1a39
+Revises: f3a9c7e1b542
+Create Date: 2026-10-17 22:41:03.127594
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2b5d7c1a39'
+down_revision: Union[str, Sequence[str], None] = 'f3a9c7e1b542'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_admin')
@@ -0,0 +1,28 @@
+"""Add matched_until watermark to resumes
+
+Revision ID: 9a47f3b6e215
+Revises: 5d2c8e7a1f90
+Create Date: 2026-10-17 13:20:11.873095
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a47f3b6e215'
+down_revision: Union[str, Sequence[str], None] = '5d2c8e7a1f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('resumes', sa.Column('matched_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('resumes', 'matched_until')
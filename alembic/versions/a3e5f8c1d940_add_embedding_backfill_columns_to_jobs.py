@@ -0,0 +1,38 @@
+"""Add embedding backfill columns to jobs
+
+Revision ID: a3e5f8c1d940
+Revises: 7c1d9e3a5b48
+Create Date: 2026-10-17 18:39:16.274905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e5f8c1d940'
+down_revision: Union[str, Sequence[str], None] = '7c1d9e3a5b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('embedding_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('jobs', sa.Column('embedding_last_attempt_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_jobs_missing_embedding',
+        'jobs',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text('embedding IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_missing_embedding', table_name='jobs')
+    op.drop_column('jobs', 'embedding_last_attempt_at')
+    op.drop_column('jobs', 'embedding_attempts')
@@ -0,0 +1,46 @@
+"""Replace float32 HNSW index on jobs.embedding with a halfvec expression index
+
+Revision ID: b81e4d09c6a2
+Revises: 3f9a1c2d7b4e
+Create Date: 2026-10-17 10:41:27.530816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e4d09c6a2'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c2d7b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # halfvec 需要 pgvector >= 0.7.0
+    op.create_index(
+        'ix_jobs_embedding_halfvec_hnsw',
+        'jobs',
+        [sa.text('(embedding::halfvec(1536)) halfvec_cosine_ops')],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+    )
+    op.drop_index('ix_jobs_embedding_hnsw', table_name='jobs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_jobs_embedding_hnsw',
+        'jobs',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+    op.drop_index('ix_jobs_embedding_halfvec_hnsw', table_name='jobs')
@@ -0,0 +1,35 @@
+"""Add job_window_stats table
+
+Revision ID: c6e0a2f4d813
+Revises: 9a47f3b6e215
+Create Date: 2026-10-17 14:05:39.661248
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e0a2f4d813'
+down_revision: Union[str, Sequence[str], None] = '9a47f3b6e215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_window_stats',
+    sa.Column('window_days', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('total_jobs', sa.Integer(), nullable=False),
+    sa.Column('jobs_with_embedding', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('window_days')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_window_stats')
@@ -0,0 +1,34 @@
+"""Add scrape_cursors table
+
+Revision ID: d92b6f0e4c17
+Revises: a3e5f8c1d940
+Create Date: 2026-10-17 19:24:08.531690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd92b6f0e4c17'
+down_revision: Union[str, Sequence[str], None] = 'a3e5f8c1d940'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scrape_cursors',
+    sa.Column('source', sa.String(length=100), nullable=False),
+    sa.Column('last_posted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_source_id', sa.String(length=255), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scrape_cursors')
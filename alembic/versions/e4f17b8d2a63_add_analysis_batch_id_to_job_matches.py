@@ -0,0 +1,30 @@
+"""Add analysis_batch_id to job_matches
+
+Revision ID: e4f17b8d2a63
+Revises: c6e0a2f4d813
+Create Date: 2026-10-17 16:02:37.518264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f17b8d2a63'
+down_revision: Union[str, Sequence[str], None] = 'c6e0a2f4d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_matches', sa.Column('analysis_batch_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_job_matches_analysis_batch_id'), 'job_matches', ['analysis_batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_job_matches_analysis_batch_id'), table_name='job_matches')
+    op.drop_column('job_matches', 'analysis_batch_id')
@@ -0,0 +1,28 @@
+"""Add analysis_attempts to job_matches
+
+Revision ID: f3a9c7e1b542
+Revises: d92b6f0e4c17
+Create Date: 2026-10-17 21:12:45.608317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c7e1b542'
+down_revision: Union[str, Sequence[str], None] = 'd92b6f0e4c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_matches', sa.Column('analysis_attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job_matches', 'analysis_attempts')
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 from app.core.database import get_db
 from app.core.auth_deps import get_current_active_user
 from app.models.user import User
 from app.models.job_match import JobMatch
 from app.services.job_matching_service import JobMatchingService
+from app.services.lazy_analysis_service import LazyMatchAnalysisService, MatchAnalysisGenerationError
 from app.schemas.match import JobMatchListResponse, JobMatchResponse, JobInMatch
+import json
 import logging
 from typing import List
+from uuid import UUID
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/matches", tags=["matches"])
@@ -54,3 +58,48 @@ async def get_user_matches(
     except Exception as e:
         logger.error(f"获取用户 {current_user.username} 的岗位匹配失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="获取岗位匹配失败")
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.get("/{match_id}/analysis/stream")
+async def stream_match_analysis(
+    match_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    以 Server-Sent Events 流式获取一条匹配的AI分析
+
+    已有分析时直接返回；否则 (lazy 模式) 在第一次访问时生成并保存，
+    同一条匹配的并发请求共享同一次生成。
+    事件: delta (data.text 为新增文本)、done (data.analysis 为完整分析)、error。
+    """
+    match = db.query(JobMatch).options(
+        joinedload(JobMatch.job), joinedload(JobMatch.resume)
+    ).filter(
+        JobMatch.id == match_id,
+        JobMatch.user_id == current_user.id
+    ).first()
+    if not match:
+        raise HTTPException(status_code=404, detail="岗位匹配不存在")
+
+    async def event_stream():
+        parts = []
+        try:
+            async for text in LazyMatchAnalysisService.stream_analysis(match):
+                parts.append(text)
+                yield _sse_event("delta", {"text": text})
+            yield _sse_event("done", {"analysis": "".join(parts).strip()})
+        except MatchAnalysisGenerationError as e:
+            yield _sse_event("error", {"detail": str(e)})
+        except Exception as e:
+            logger.error(f"流式生成匹配 {match_id} 的AI分析失败: {e}", exc_info=True)
+            yield _sse_event("error", {"detail": "生成AI分析失败"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
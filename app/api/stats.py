@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.auth_deps import get_current_admin_user
+from app.models.user import User
+from app.services.job_stats_service import JobStatsService
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.embedding_service import EmbeddingService
+from app.schemas.stats import EmbeddingCoverageResponse, AnalysisCacheStatsResponse, EmbeddingCacheStatsResponse
+import logging
+
+logger = logging.getLogger(__name__)
+# 运维统计接口，仅管理员可访问
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("/embedding-coverage", response_model=EmbeddingCoverageResponse)
+async def get_embedding_coverage(
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db),
+    days: int = Query(1, ge=1, description="时间窗口天数，需为 JOB_STATS_WINDOWS 中配置的窗口")
+):
+    """
+    获取岗位向量覆盖率
+
+    返回指定时间窗口内的岗位总数与已生成向量的岗位数。
+    数据来自每次爬取后计算的缓存统计，不会对岗位表发起额外的 COUNT 查询。
+    只支持 JOB_STATS_WINDOWS 中配置的窗口 (只有这些窗口会在爬取后刷新)。
+    """
+    if days not in settings.JOB_STATS_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的时间窗口，可选值: {', '.join(str(window) for window in settings.JOB_STATS_WINDOWS)}"
+        )
+
+    try:
+        stats = JobStatsService.get_window_stats(db, days)
+
+        return EmbeddingCoverageResponse(
+            window_days=stats.window_days,
+            window_start=stats.window_start,
+            total_jobs=stats.total_jobs,
+            jobs_with_embedding=stats.jobs_with_embedding,
+            jobs_missing_embedding=stats.jobs_missing_embedding,
+            coverage=stats.jobs_with_embedding / stats.total_jobs if stats.total_jobs else 1.0,
+            computed_at=stats.computed_at
+        )
+
+    except Exception as e:
+        logger.error(f"获取岗位向量覆盖率失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="获取岗位向量覆盖率失败")
+
+@router.get("/analysis-cache", response_model=AnalysisCacheStatsResponse)
+async def get_analysis_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    获取匹配分析缓存的命中/未命中计数
+
+    计数由所有 worker 共享，hit_ratio = hits / (hits + misses)。
+    """
+    try:
+        return AnalysisCacheStatsResponse(**MatchAnalysisCache.get_stats())
+
+    except Exception as e:
+        logger.error(f"获取匹配分析缓存统计失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="获取匹配分析缓存统计失败")
+
+@router.get("/embedding-cache", response_model=EmbeddingCacheStatsResponse)
+async def get_embedding_cache_stats(
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取向量缓存的命中/未命中计数与缓存条数
+
+    相同文本 (同一模型) 只调用一次 embeddings 接口，hit_ratio = hits / (hits + misses)。
+    """
+    try:
+        return EmbeddingCacheStatsResponse(**EmbeddingService.get_cache_stats(db))
+
+    except Exception as e:
+        logger.error(f"获取向量缓存统计失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="获取向量缓存统计失败")
@@ -19,9 +19,14 @@ celery_app.conf.update(
 
 # Celery Beat Schedule
 # This will run the run_daily_flow task every day at 4:00 AM
+# and drain the embedding backlog every EMBEDDING_BACKFILL_INTERVAL_MINUTES minutes
 celery_app.conf.beat_schedule = {
     'run-daily-matching-flow': {
         'task': 'app.tasks.run_daily_flow',
         'schedule': crontab(hour=4, minute=0),
     },
+    'backfill-job-embeddings': {
+        'task': 'app.tasks.backfill_job_embeddings',
+        'schedule': settings.EMBEDDING_BACKFILL_INTERVAL_MINUTES * 60.0,
+    },
 }
@@ -4,7 +4,7 @@ Install: pip install pydantic-settings
 """
 from pydantic import Field, field_validator, model_validator, ConfigDict
 from pydantic_settings import BaseSettings
-from typing import Optional, Any
+from typing import Optional, Any, List
 import logging
 import os
 from pathlib import Path
@@ -68,6 +68,329 @@ class Settings(BaseSettings):
         min_length=1,
         description="OpenAI API key (should start with 'sk-' in production)"
     )
+    OPENAI_BASE_URL: Optional[str] = Field(
+        default=None,
+        description="Override the OpenAI API base URL, e.g. http://localhost:8001/v1 for fake_openai_server.py"
+    )
+    OPENAI_VERIFY_ON_INIT: bool = Field(
+        default=True,
+        description="Call models.list() when the OpenAI client is created to fail fast on a bad key"
+    )
+    
+    OPENAI_RATE_LIMIT_ENABLED: bool = Field(
+        default=True,
+        description="Pace all OpenAI calls through a Redis token bucket shared by every worker"
+    )
+    OPENAI_RPM_LIMIT: int = Field(
+        default=500,
+        ge=1,
+        description="Requests per minute allowed per model (set slightly below the account limit)"
+    )
+    OPENAI_TPM_LIMIT: int = Field(
+        default=200000,
+        ge=1,
+        description="Tokens per minute allowed per model (set slightly below the account limit)"
+    )
+    OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS: int = Field(
+        default=600,
+        ge=1,
+        description="Maximum time a call waits for rate-limit capacity before giving up"
+    )
+    OPENAI_RATE_LIMIT_MAX_RETRIES: int = Field(
+        default=5,
+        ge=0,
+        description="Retries for transient OpenAI failures (429, 5xx, connection errors)"
+    )
+    OPENAI_CIRCUIT_BREAKER_THRESHOLD: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive transient failures that open the circuit for a model"
+    )
+    OPENAI_CIRCUIT_BREAKER_RESET_SECONDS: int = Field(
+        default=30,
+        ge=1,
+        description="How long an open circuit pauses all calls for that model"
+    )
+    
+    # ==================== Embedding Configuration ====================
+    EMBEDDING_BATCH_MAX_INPUTS: int = Field(
+        default=2048,
+        ge=1,
+        le=2048,
+        description="Maximum number of texts sent in one embeddings request (API limit 2048)"
+    )
+    EMBEDDING_BATCH_MAX_TOKENS: int = Field(
+        default=250000,
+        ge=1000,
+        le=300000,
+        description="Estimated token budget of one embeddings request (API limit 300k, kept below for estimate error)"
+    )
+    EMBEDDING_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Reuse stored vectors for identical embedding input text (embedding_cache table)"
+    )
+    EMBEDDING_ON_SCRAPE: bool = Field(
+        default=True,
+        description="Embed new jobs while scraping; if disabled, jobs are committed right away and embedded by the backfill task"
+    )
+    EMBEDDING_BACKFILL_INTERVAL_MINUTES: int = Field(
+        default=10,
+        ge=1,
+        description="How often the backfill task embeds jobs that are missing vectors"
+    )
+    EMBEDDING_BACKFILL_BATCH_SIZE: int = Field(
+        default=500,
+        ge=1,
+        description="Jobs claimed (FOR UPDATE SKIP LOCKED) and embedded per backfill transaction"
+    )
+    EMBEDDING_BACKFILL_MAX_ATTEMPTS: int = Field(
+        default=5,
+        ge=1,
+        description="Failed embedding attempts after which a job is no longer retried"
+    )
+    EMBEDDING_BACKFILL_BACKOFF_SECONDS: int = Field(
+        default=300,
+        ge=0,
+        description="Delay before retrying a failed job, doubled after every further failure"
+    )
+    EMBEDDING_BACKFILL_BACKOFF_MAX_SECONDS: int = Field(
+        default=21600,
+        ge=0,
+        description="Upper bound of the retry delay for a failed job"
+    )
+    
+    # ==================== Scraping Configuration ====================
+    SCRAPE_INCREMENTAL: bool = Field(
+        default=True,
+        description="Keep a per-source cursor (newest posted_at ingested) and only fetch newer postings"
+    )
+    SCRAPER_HTTP2: bool = Field(
+        default=True,
+        description="Use HTTP/2 for scraper requests when the h2 package is installed"
+    )
+    SCRAPER_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="Default per-request timeout of scraper requests (scrapers may override it)"
+    )
+    SCRAPER_MAX_CONNECTIONS: int = Field(
+        default=20,
+        ge=1,
+        description="Connection pool size of the HTTP client shared by all scrapers"
+    )
+    SCRAPER_CONCURRENCY_PER_SOURCE: int = Field(
+        default=4,
+        ge=1,
+        description="Default limit of concurrent requests to a single source (scrapers may override it)"
+    )
+    SCRAPER_MAX_RETRIES: int = Field(
+        default=3,
+        ge=0,
+        description="Retries of a scraper request after connection errors, timeouts, 429 or 5xx responses"
+    )
+    SCRAPER_RETRY_BACKOFF_SECONDS: float = Field(
+        default=1.0,
+        ge=0,
+        description="Base of the jittered exponential backoff between scraper retries"
+    )
+    SCRAPE_PIPELINE_QUEUE_SIZE: int = Field(
+        default=500,
+        ge=1,
+        description="Capacity of each bounded queue between the fetch, dedupe and embed stages of the scrape pipeline"
+    )
+    SCRAPE_PIPELINE_DEDUPE_BATCH_SIZE: int = Field(
+        default=200,
+        ge=1,
+        description="Normalized jobs checked against the database and inserted per dedupe batch"
+    )
+    SCRAPE_PIPELINE_EMBED_BATCH_SIZE: int = Field(
+        default=500,
+        ge=1,
+        description="New jobs embedded per embed batch"
+    )
+    SCRAPE_PIPELINE_FLUSH_SECONDS: float = Field(
+        default=2.0,
+        gt=0,
+        description="A partially filled batch is flushed when no item arrives for this long"
+    )
+    
+    # ==================== Vector Search Configuration ====================
+    VECTOR_HNSW_EF_SEARCH: int = Field(
+        default=100,
+        ge=1,
+        le=1000,
+        description="HNSW ef_search for job matching queries (higher = better recall, slower)"
+    )
+    VECTOR_HNSW_ITERATIVE_SCAN: str = Field(
+        default="strict_order",
+        pattern="^(off|strict_order|relaxed_order)$",
+        description="pgvector (>=0.8) iterative index scan mode, keeps filtered ANN queries from returning too few rows"
+    )
+    MATCHING_QUANTIZED_SEARCH: bool = Field(
+        default=True,
+        description="First-pass ANN search on the halfvec (float16) index, then exact float32 re-rank of the candidates"
+    )
+    MATCHING_RERANK_CANDIDATES: int = Field(
+        default=200,
+        ge=1,
+        le=1000,
+        description="Number of quantized first-pass candidates re-ranked with exact cosine distance"
+    )
+    MATCHING_EXACT_SEARCH: bool = Field(
+        default=False,
+        description="Bypass the ANN index and run exact (sequential scan) similarity search"
+    )
+    
+    # ==================== Matching Configuration ====================
+    MATCHING_BACKEND: str = Field(
+        default="sql",
+        pattern="^(sql|numpy|push)$",
+        description="Candidate search backend: 'sql' (pgvector query per resume), 'numpy' (in-process matrix top-k) "
+                    "or 'push' (candidates scored when jobs are embedded, kept in Redis)"
+    )
+    PUSH_MATCHING_CANDIDATES: int = Field(
+        default=50,
+        ge=1,
+        le=1000,
+        description="Candidates kept per resume per day in the push-matching Redis sorted sets"
+    )
+    PUSH_MATCHING_RETENTION_DAYS: int = Field(
+        default=3,
+        ge=1,
+        description="Days before a push-matching candidate set expires"
+    )
+    MATCHING_INCREMENTAL: bool = Field(
+        default=True,
+        description="Only score jobs newer than each resume's watermark and merge them with its existing top-k"
+    )
+    MATCHING_SET_BASED: bool = Field(
+        default=False,
+        description="Match all users with a single set-based SQL statement (LATERAL top-k) instead of chunked tasks"
+    )
+    MATCHING_CHUNK_SIZE: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="Number of users scored together (and written in one transaction) per matching task"
+    )
+    MATCHING_MATRIX_CACHE_SECONDS: int = Field(
+        default=300,
+        ge=0,
+        description="How long a worker reuses its in-memory job embedding matrix (numpy backend)"
+    )
+    
+    # ==================== Job Snapshot Configuration ====================
+    JOB_SNAPSHOT_ENABLED: bool = Field(
+        default=False,
+        description="Publish a memory-mapped job embedding snapshot after scraping and use it for numpy matching"
+    )
+    JOB_SNAPSHOT_DIR: str = Field(
+        default="/tmp/job_snapshots",
+        description="Directory shared by scraper and Celery workers for job embedding snapshots"
+    )
+    JOB_SNAPSHOT_DAYS: int = Field(
+        default=7,
+        ge=1,
+        le=90,
+        description="Number of days of jobs included in each snapshot"
+    )
+    JOB_SNAPSHOT_KEEP_VERSIONS: int = Field(
+        default=2,
+        ge=1,
+        description="Number of snapshot versions kept on disk"
+    )
+    
+    # ==================== Job Stats Configuration ====================
+    JOB_STATS_WINDOWS: List[int] = Field(
+        default=[1, 7],
+        description="Window sizes (days) whose job/embedding counts are refreshed after every scrape"
+    )
+    JOB_STATS_MAX_AGE_MINUTES: int = Field(
+        default=1440,
+        ge=1,
+        description="Cached window statistics older than this are recomputed on read"
+    )
+    
+    # ==================== Match Analysis Configuration ====================
+    MATCH_ANALYSIS_MODE: str = Field(
+        default="sync",
+        pattern="^(sync|multi|batch|lazy)$",
+        description="'sync' generates analyses while matching; 'multi' does the same but analyzes all of a "
+                    "resume's new jobs in one chat call; 'batch' writes matches first and "
+                    "generates their analyses offline through the OpenAI Batch API; 'lazy' generates "
+                    "each analysis the first time the match is viewed and streams it to the client"
+    )
+    MATCH_MULTI_ANALYSIS_MAX_JOBS: int = Field(
+        default=10,
+        ge=1,
+        le=50,
+        description="Maximum number of jobs analyzed together in one chat call in 'multi' mode"
+    )
+    MATCH_ANALYSIS_CONCURRENCY: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of match analysis LLM calls in flight at once"
+    )
+    MATCH_ANALYSIS_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="Per-call timeout for a match analysis LLM request"
+    )
+    MATCH_ANALYSIS_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Cache generated match analyses in Redis, keyed by a hash of prompt version, model and inputs"
+    )
+    MATCH_ANALYSIS_CACHE_TTL_SECONDS: int = Field(
+        default=30 * 24 * 3600,
+        ge=60,
+        description="Time-to-live of a cached match analysis"
+    )
+    MATCH_ANALYSIS_CACHE_MAX_ENTRIES: int = Field(
+        default=100000,
+        ge=1,
+        description="Maximum number of cached match analyses; the oldest entries are evicted first"
+    )
+    MATCH_ANALYSIS_BATCH_BACKEND: str = Field(
+        default="openai",
+        pattern="^(openai|local)$",
+        description="Batch endpoint used in batch mode: the OpenAI Batch API or a local file-based stand-in for offline runs"
+    )
+    MATCH_ANALYSIS_BATCH_DIR: str = Field(
+        default="/tmp/match_analysis_batches",
+        description="Directory for batch input/output JSONL files (and the local stand-in's state)"
+    )
+    MATCH_ANALYSIS_BATCH_MAX_REQUESTS: int = Field(
+        default=50000,
+        ge=1,
+        le=50000,
+        description="Maximum number of analysis requests submitted in one batch"
+    )
+    MATCH_ANALYSIS_BATCH_POLL_SECONDS: int = Field(
+        default=300,
+        ge=1,
+        description="Interval between batch status polls"
+    )
+    MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS: int = Field(
+        default=3,
+        ge=1,
+        description="Failed batch requests after which a match is no longer resubmitted"
+    )
+    
+    # ==================== Job Digest Configuration ====================
+    JOB_DIGEST_ENABLED: bool = Field(
+        default=True,
+        description="Summarize new jobs into compact requirement digests after scraping and use them in match analysis prompts"
+    )
+    JOB_DIGEST_MODEL: str = Field(
+        default="gpt-4o-mini",
+        description="Chat model used to generate job digests"
+    )
+    JOB_DIGEST_DAYS: int = Field(
+        default=7,
+        ge=1,
+        le=90,
+        description="Jobs created within this many days are digested if they have no current digest"
+    )
     
     # ==================== Application Configuration ====================
     DEBUG: bool = Field(
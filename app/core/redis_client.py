@@ -0,0 +1,27 @@
+import logging
+from functools import lru_cache
+import redis
+import redis.asyncio
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_redis_client() -> redis.Redis:
+    """
+    Returns a shared Redis client for application data (candidate sets, caches, limiters).
+    It uses the same REDIS_URL as the Celery broker.
+    The client is cached so every caller reuses one connection pool per process.
+    """
+    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    logger.info("Redis client initialized.")
+    return client
+
+
+def create_async_redis_client() -> redis.asyncio.Redis:
+    """
+    Returns a new asyncio Redis client for use inside request handlers.
+    Not cached: the client's connections are bound to the running event loop,
+    so callers close it (`async with`) when they are done.
+    """
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
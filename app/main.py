@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api import auth, resume, matches
+from app.api import auth, resume, matches, stats
 from app.tasks import run_daily_flow
 
 app = FastAPI(
@@ -23,6 +23,7 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(resume.router, prefix="/api", tags=["resume"])
 app.include_router(matches.router, prefix="/api", tags=["matches"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime
+from pgvector.sqlalchemy import Vector
+from datetime import datetime
+from app.models.base import Base
+
+class EmbeddingCache(Base):
+    """
+    以 (输入文本的 SHA-256, 模型名) 为键的持久化向量缓存。
+    同一岗位出现在多个来源或被重新发布时，嵌入文本完全相同，直接复用已有向量，不再调用OpenAI。
+    """
+    __tablename__ = 'embedding_cache'
+
+    content_hash = Column(String(64), primary_key=True)  # 嵌入输入文本的 SHA-256 (hex)
+    model = Column(String(100), primary_key=True)
+    embedding = Column(Vector(), nullable=False)  # 不限定维度，不同模型的向量长度不同
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<EmbeddingCache(model='{self.model}', content_hash='{self.content_hash[:12]}')>"
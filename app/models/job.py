@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import ARRAY, UUID, JSONB
 from pgvector.sqlalchemy import Vector
 from .base import Base
@@ -44,12 +44,30 @@ class Job(Base):
 
     # 用于AI匹配的字段 (预留)
     embedding = Column(Vector(1536), nullable=True) # JD内容的向量表示
+    # 向量补齐队列：生成失败的次数与最近一次尝试时间，达到上限后不再重试
+    embedding_attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    embedding_last_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    # 精简的岗位要求摘要，代替原始JD用于逐对的匹配分析 prompt
+    digest = Column(Text, nullable=True)
+    digest_version = Column(String(20), nullable=True) # 生成摘要时的 JOB_DIGEST_PROMPT_VERSION
 
     matches = relationship("JobMatch", back_populates="job", cascade="all, delete-orphan")
 
     __table_args__ = (
         # 创建一个复合唯一约束，确保同一个来源的同一个职位ID只被记录一次
         UniqueConstraint('source', 'source_id', name='uq_source_source_id'),
+        # 匹配时按时间窗口过滤岗位
+        Index('ix_jobs_created_at', 'created_at'),
+        # 向量补齐任务只扫描缺失向量的岗位
+        Index('ix_jobs_missing_embedding', 'created_at', postgresql_where=text('embedding IS NULL')),
+        # 向量近似最近邻索引 (HNSW, cosine)，避免每个用户匹配时全表扫描
+        # 索引建在 halfvec (float16) 表达式上，体积减半；检索结果再用原始 float32 向量精确重排
+        Index(
+            'ix_jobs_embedding_halfvec_hnsw',
+            text('(embedding::halfvec(1536)) halfvec_cosine_ops'),
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+        ),
     )
 
     def __repr__(self):
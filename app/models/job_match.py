@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Float, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Float, Integer, String, Text, Boolean, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -15,6 +15,10 @@ class JobMatch(Base):
     
     similarity_score = Column(Float, nullable=False)
     analysis = Column(Text, nullable=True)
+    # 正在为该匹配生成分析的 Batch API 任务 ID (batch 模式)，避免重复提交
+    analysis_batch_id = Column(String, nullable=True, index=True)
+    # 该匹配在 batch 中生成分析失败的次数，达到 MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS 后不再提交
+    analysis_attempts = Column(Integer, nullable=False, default=0, server_default='0')
     is_viewed = Column(Boolean, default=False, nullable=False)
     
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
@@ -24,5 +28,10 @@ class JobMatch(Base):
     resume = relationship("Resume", back_populates="matches")
     job = relationship("Job", back_populates="matches")
 
+    __table_args__ = (
+        # 同一用户与同一岗位只保留一条匹配记录，批量写入时用 ON CONFLICT DO NOTHING 去重
+        UniqueConstraint('user_id', 'job_id', name='uq_job_matches_user_job'),
+    )
+
     def __repr__(self):
         return f"<JobMatch(user_id={self.user_id}, job_id={self.job_id}, score={self.similarity_score:.4f})>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime
+from datetime import datetime
+from app.models.base import Base
+
+class JobWindowStats(Base):
+    """
+    按时间窗口缓存的岗位统计 (每次爬取后计算一次)，
+    匹配流程和运维接口直接读取，不必在热路径上反复 COUNT(*)
+    """
+    __tablename__ = 'job_window_stats'
+
+    window_days = Column(Integer, primary_key=True, autoincrement=False)  # 时间窗口天数，如 1 表示过去 24 小时
+    window_start = Column(DateTime(timezone=True), nullable=False)  # 计算时的窗口起点
+    total_jobs = Column(Integer, nullable=False, default=0)
+    jobs_with_embedding = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    @property
+    def jobs_missing_embedding(self) -> int:
+        return self.total_jobs - self.jobs_with_embedding
+
+    def __repr__(self):
+        return f"<JobWindowStats(window_days={self.window_days}, total={self.total_jobs}, embedded={self.jobs_with_embedding})>"
@@ -33,6 +33,9 @@ class Resume(Base):
     embedding = Column(Vector(1536), nullable=True)  # OpenAI 或 BGE 模型生成的向量（维度如1536或384）
     parsed_at = Column(DateTime(timezone=True), nullable=True)  # 语义信息生成的时间戳
 
+    # 增量匹配水位线：已参与打分的最新岗位创建时间，简历向量变化时重置
+    matched_until = Column(DateTime(timezone=True), nullable=True)
+
     # 关联到用户和匹配记录
     user = relationship("User", back_populates="resumes")
     matches = relationship("JobMatch", back_populates="resume", cascade="all, delete-orphan")
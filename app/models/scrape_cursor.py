@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.models.base import Base
+
+class ScrapeCursor(Base):
+    """
+    每个数据来源的增量抓取游标：已入库的最新岗位发布时间及其来源ID。
+    下次抓取只请求 (或只处理) 比游标更新的岗位；删除某来源的记录即可重新全量抓取。
+    """
+    __tablename__ = 'scrape_cursors'
+
+    source = Column(String(100), primary_key=True)
+    last_posted_at = Column(DateTime(timezone=True), nullable=False)  # 已见过的最新 posted_at
+    last_source_id = Column(String(255), nullable=True)  # 该岗位的来源ID
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ScrapeCursor(source='{self.source}', last_posted_at='{self.last_posted_at}')>"
@@ -2,6 +2,9 @@
 这个模块集中管理所有用于与 OpenAI API 交互的 Prompt 模板。
 """
 
+# 修改 MATCH_ANALYSIS_PROMPT 或其输出约定时递增版本号，使已缓存的分析失效
+MATCH_ANALYSIS_PROMPT_VERSION = "v1"
+
 MATCH_ANALYSIS_PROMPT = """
 请根据以下简历内容和职位描述，分析这位候选人为什么适合这个职位。
 你的分析应该简明扼要，控制在2-3句话，重点突出候选人的关键技能和经验与职位要求的契合点。
@@ -13,4 +16,41 @@ MATCH_ANALYSIS_PROMPT = """
 {job_description}
 
 --- 分析结果 (2-3句话) ---
-"""
\ No newline at end of file
+"""
+
+# 一次调用分析多个岗位 (multi 模式)。简历放在最前面且逐字不变，
+# 同一用户的多次调用共享相同前缀，可以命中服务端的 prompt 缓存。
+MULTI_MATCH_ANALYSIS_SYSTEM_PROMPT = """
+你是一位专业的HR专家，擅长精准地分析候选人与岗位的匹配度。
+用户会先给出一份简历，然后给出若干个带编号的职位描述。
+请针对每个职位，分析这位候选人为什么适合这个职位。每条分析应该简明扼要，控制在2-3句话，
+重点突出候选人的关键技能和经验与该职位要求的契合点。
+只输出一个 JSON 对象，格式为 {"analyses": [{"job": 职位编号, "analysis": "分析结果"}, ...]}，每个职位对应一条。
+"""
+
+MULTI_MATCH_ANALYSIS_RESUME_PROMPT = """
+--- 简历核心内容 ---
+{resume_content}
+"""
+
+MULTI_MATCH_ANALYSIS_JOB_PROMPT = """
+--- 职位 {job_number} ---
+{job_description}
+"""
+
+# 修改 JOB_DIGEST_PROMPT 时递增版本号，旧摘要会在下次摘要任务中重新生成
+JOB_DIGEST_PROMPT_VERSION = "v1"
+
+JOB_DIGEST_PROMPT = """
+请把以下职位描述压缩成一份简洁的岗位要求摘要，供后续与大量候选人简历逐一比对使用。
+只保留与候选人匹配相关的信息：职位名称与级别、核心职责、必备技能与经验年限、加分项、工作地点/远程要求。
+去掉公司介绍、福利待遇、招聘流程等无关内容，使用要点列表，总长度不超过150词。
+
+--- 职位名称 ---
+{title}
+
+--- 职位描述 ---
+{job_description}
+
+--- 岗位要求摘要 ---
+"""
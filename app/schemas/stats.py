@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+# Schema for the cached embedding coverage of a job window
+class EmbeddingCoverageResponse(BaseModel):
+    window_days: int
+    window_start: datetime
+    total_jobs: int
+    jobs_with_embedding: int
+    jobs_missing_embedding: int
+    coverage: float
+    computed_at: datetime
+
+# Schema for the match analysis cache counters
+class AnalysisCacheStatsResponse(BaseModel):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
+    max_entries: int
+    prompt_version: str
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
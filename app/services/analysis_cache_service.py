@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+import redis
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.prompts import MATCH_ANALYSIS_PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class MatchAnalysisCache:
+    """
+    以内容寻址的匹配分析缓存 (Redis)。
+    键为 (提示词版本, 完整的 chat.completions 请求参数) 的 SHA-256，请求参数已包含模型名、
+    截断后的简历内容与岗位描述，因此任何影响输出的改动都会落到新的键上。
+
+    每条缓存带 TTL；另有一个按写入时间排序的索引有序集合，条目数超过
+    MATCH_ANALYSIS_CACHE_MAX_ENTRIES 时淘汰最早写入的条目。
+    命中/未命中次数记录在 Redis 计数器中，由所有 worker 共享。
+
+    缓存只是优化：Redis 不可用时记录警告并按未命中处理，不影响分析生成。
+    """
+
+    ENTRY_KEY = "match_analysis:{digest}"
+    INDEX_KEY = "match_analysis:index"
+    HITS_KEY = "match_analysis:stats:hits"
+    MISSES_KEY = "match_analysis:stats:misses"
+
+    @classmethod
+    def cache_key(cls, request: dict) -> str:
+        payload = json.dumps(
+            {"prompt_version": MATCH_ANALYSIS_PROMPT_VERSION, "request": request},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return cls.ENTRY_KEY.format(digest=hashlib.sha256(payload.encode("utf-8")).hexdigest())
+
+    @classmethod
+    def get_many(cls, keys: List[str]) -> List[Optional[str]]:
+        """
+        批量读取缓存，返回与 keys 顺序一致的分析内容 (未命中为 None)，并累加命中/未命中计数
+        """
+        if not keys or not settings.MATCH_ANALYSIS_CACHE_ENABLED:
+            return [None] * len(keys)
+
+        try:
+            redis_client = get_redis_client()
+            values = redis_client.mget(keys)
+            hits = sum(1 for value in values if value is not None)
+            pipeline = redis_client.pipeline(transaction=False)
+            if hits:
+                pipeline.incrby(cls.HITS_KEY, hits)
+            if len(keys) - hits:
+                pipeline.incrby(cls.MISSES_KEY, len(keys) - hits)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"读取匹配分析缓存失败，按未命中处理: {e}")
+            return [None] * len(keys)
+
+        if hits:
+            logger.info(f"匹配分析缓存命中 {hits}/{len(keys)}。")
+        return values
+
+    @classmethod
+    def set_many(cls, entries: Dict[str, str]):
+        """
+        写入一批分析结果，并按写入时间淘汰超出容量上限的旧条目
+        """
+        if not entries or not settings.MATCH_ANALYSIS_CACHE_ENABLED:
+            return
+
+        now = time.time()
+        try:
+            redis_client = get_redis_client()
+            pipeline = redis_client.pipeline(transaction=False)
+            for key, analysis in entries.items():
+                pipeline.set(key, analysis, ex=settings.MATCH_ANALYSIS_CACHE_TTL_SECONDS)
+            pipeline.zadd(cls.INDEX_KEY, {key: now for key in entries})
+            # 索引中早于 TTL 的条目已自然过期，直接移除
+            pipeline.zremrangebyscore(cls.INDEX_KEY, "-inf", now - settings.MATCH_ANALYSIS_CACHE_TTL_SECONDS)
+            pipeline.zcard(cls.INDEX_KEY)
+            size = pipeline.execute()[-1]
+
+            overflow = size - settings.MATCH_ANALYSIS_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                evicted = [key for key, _ in redis_client.zpopmin(cls.INDEX_KEY, overflow)]
+                if evicted:
+                    redis_client.delete(*evicted)
+                    logger.info(f"匹配分析缓存超过容量上限，淘汰了 {len(evicted)} 条最早的记录。")
+        except redis.RedisError as e:
+            logger.warning(f"写入匹配分析缓存失败: {e}")
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        返回缓存的命中/未命中计数与当前条目数
+        """
+        redis_client = get_redis_client()
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.get(cls.HITS_KEY)
+        pipeline.get(cls.MISSES_KEY)
+        pipeline.zcount(cls.INDEX_KEY, time.time() - settings.MATCH_ANALYSIS_CACHE_TTL_SECONDS, "+inf")
+        hits, misses, entries = pipeline.execute()
+
+        hits, misses = int(hits or 0), int(misses or 0)
+        return {
+            "enabled": settings.MATCH_ANALYSIS_CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "max_entries": settings.MATCH_ANALYSIS_CACHE_MAX_ENTRIES,
+            "prompt_version": MATCH_ANALYSIS_PROMPT_VERSION,
+        }
@@ -0,0 +1,217 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+import openai
+import redis
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.models.embedding_cache import EmbeddingCache
+from app.services.openai_service import get_openai_client
+from app.services.openai_rate_limiter import OpenAIRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingError(Exception):
+    """
+    Raised when an embedding could not be generated for a text.
+    """
+
+
+class EmbeddingService:
+    """
+    Generates embeddings in as few requests as possible.
+
+    Texts are packed in order into requests of at most EMBEDDING_BATCH_MAX_INPUTS inputs
+    and an estimated EMBEDDING_BATCH_MAX_TOKENS tokens, and the returned vectors are
+    mapped back by their index. If a request is rejected because of its input (400, e.g. a
+    text over the per-input token limit), it is split in halves and each half is retried,
+    recursively, so one bad input only fails itself. Any other failure (auth, quota, rate-limit
+    wait timeout, open circuit, persistent 5xx) would fail the halves just the same, so the
+    remaining texts of the call are left unembedded for the backfill task instead.
+
+    When a database session is passed, vectors are first looked up in the embedding_cache
+    table by (SHA-256 of the exact input text, model), in bulk for the whole batch, and only
+    missing texts are sent to OpenAI. Newly generated vectors are added to the cache in the
+    caller's transaction. Hit/miss counters are kept in Redis.
+    """
+
+    DEFAULT_MODEL = "text-embedding-3-small"
+
+    # Hashes per cache lookup query
+    CACHE_LOOKUP_CHUNK_SIZE = 1000
+
+    HITS_KEY = "embedding_cache:stats:hits"
+    MISSES_KEY = "embedding_cache:stats:misses"
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        return len(text) // OpenAIRateLimiter.CHARS_PER_TOKEN + 1
+
+    @classmethod
+    def _pack(cls, texts: List[str]) -> List[List[int]]:
+        """
+        Groups text indices into request-sized batches.
+        """
+        max_inputs = settings.EMBEDDING_BATCH_MAX_INPUTS
+        max_tokens = settings.EMBEDDING_BATCH_MAX_TOKENS
+
+        batches = []
+        current, current_tokens = [], 0
+        for index, text in enumerate(texts):
+            tokens = cls._estimate_tokens(text)
+            if current and (len(current) >= max_inputs or current_tokens + tokens > max_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _request_embeddings(texts: List[str], model: str) -> List[List[float]]:
+        client = get_openai_client()
+        request = {"input": texts, "model": model}
+        response = OpenAIRateLimiter.call(model, request, lambda: client.embeddings.create(**request))
+        embeddings = [None] * len(texts)
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        return embeddings
+
+    @classmethod
+    def embed_texts(cls, texts: List[str], model: str = DEFAULT_MODEL, db: Optional[Session] = None) -> List[Optional[List[float]]]:
+        """
+        Returns one embedding per text, in input order. Texts that could not be embedded get None.
+        With a session, cached vectors are reused and new ones are cached (not committed).
+        """
+        if not texts:
+            return []
+        if db is None or not settings.EMBEDDING_CACHE_ENABLED:
+            return cls._embed_uncached(texts, model)
+
+        hashes = [cls.content_hash(text) for text in texts]
+        embeddings = cls._lookup_cached(db, hashes, model)
+
+        # Identical texts within the batch are embedded once
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in embeddings:
+                missing.setdefault(content_hash, text)
+
+        hits = sum(1 for content_hash in hashes if content_hash in embeddings)
+        cls._record_cache_stats(hits, len(texts) - hits)
+        logger.info(f"Embedding cache: {hits}/{len(texts)} hits ({hits / len(texts):.0%}) for {model}.")
+
+        if missing:
+            generated = cls._embed_uncached(list(missing.values()), model)
+            new_embeddings = {
+                content_hash: embedding
+                for content_hash, embedding in zip(missing.keys(), generated)
+                if embedding is not None
+            }
+            cls._store_cached(db, new_embeddings, model)
+            embeddings.update(new_embeddings)
+
+        return [embeddings.get(content_hash) for content_hash in hashes]
+
+    @classmethod
+    def _embed_uncached(cls, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        embeddings = [None] * len(texts)
+        batches = cls._pack(texts)
+        for number, batch in enumerate(batches):
+            try:
+                cls._embed_batch(texts, batch, model, embeddings)
+            except Exception as e:
+                remaining = sum(1 for pending in batches[number:] for index in pending if embeddings[index] is None)
+                logger.error(f"Embedding request failed ({e}). Leaving {remaining} texts unembedded.")
+                break
+
+        embedded_count = sum(1 for embedding in embeddings if embedding is not None)
+        logger.info(f"Embedded {embedded_count}/{len(texts)} texts in {len(batches)} request(s).")
+        return embeddings
+
+    @classmethod
+    def _embed_batch(cls, texts: List[str], batch: List[int], model: str, embeddings: List[Optional[List[float]]]):
+        """
+        Embeds the texts at the given indices into `embeddings`. A request rejected for its
+        input is split in halves until the bad inputs are isolated; other errors are raised.
+        """
+        try:
+            results = cls._request_embeddings([texts[index] for index in batch], model)
+        except openai.BadRequestError as e:
+            if len(batch) == 1:
+                logger.error(f"Embedding failed for text #{batch[0]}: {e}")
+                return
+            logger.warning(f"Embedding request for {len(batch)} texts failed ({e}). Retrying each half separately.")
+            middle = len(batch) // 2
+            cls._embed_batch(texts, batch[:middle], model, embeddings)
+            cls._embed_batch(texts, batch[middle:], model, embeddings)
+            return
+
+        for index, embedding in zip(batch, results):
+            embeddings[index] = embedding
+
+    @classmethod
+    def embed_text(cls, text: str, model: str = DEFAULT_MODEL, db: Optional[Session] = None) -> List[float]:
+        """
+        Embeds a single text, raising EmbeddingError on failure.
+        """
+        embedding = cls.embed_texts([text], model, db)[0]
+        if embedding is None:
+            raise EmbeddingError("Failed to generate embedding.")
+        return embedding
+
+    @classmethod
+    def _lookup_cached(cls, db: Session, hashes: List[str], model: str) -> Dict[str, List[float]]:
+        unique_hashes = list(dict.fromkeys(hashes))
+        cached = {}
+        for start in range(0, len(unique_hashes), cls.CACHE_LOOKUP_CHUNK_SIZE):
+            rows = db.query(EmbeddingCache.content_hash, EmbeddingCache.embedding).filter(
+                EmbeddingCache.model == model,
+                EmbeddingCache.content_hash.in_(unique_hashes[start:start + cls.CACHE_LOOKUP_CHUNK_SIZE])
+            ).all()
+            cached.update((content_hash, embedding.tolist()) for content_hash, embedding in rows)
+        return cached
+
+    @staticmethod
+    def _store_cached(db: Session, embeddings: Dict[str, List[float]], model: str):
+        if not embeddings:
+            return
+        rows = [{"content_hash": content_hash, "model": model, "embedding": embedding}
+                for content_hash, embedding in embeddings.items()]
+        db.execute(insert(EmbeddingCache).values(rows).on_conflict_do_nothing())
+
+    @classmethod
+    def _record_cache_stats(cls, hits: int, misses: int):
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            if hits:
+                pipeline.incrby(cls.HITS_KEY, hits)
+            if misses:
+                pipeline.incrby(cls.MISSES_KEY, misses)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record embedding cache stats: {e}")
+
+    @classmethod
+    def get_cache_stats(cls, db: Session) -> dict:
+        """
+        Returns cumulative hit/miss counters and the number of cached vectors.
+        """
+        hits, misses = get_redis_client().mget(cls.HITS_KEY, cls.MISSES_KEY)
+        hits, misses = int(hits or 0), int(misses or 0)
+        return {
+            "enabled": settings.EMBEDDING_CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": db.query(func.count()).select_from(EmbeddingCache).scalar(),
+        }
@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+import lxml.html
+from lxml.etree import ParserError
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.job import Job
+from app.services.openai_service import create_chat_completions
+from app.prompts import JOB_DIGEST_PROMPT, JOB_DIGEST_PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+class JobDigestService:
+    """
+    Generates a compact requirements digest for each job once, right after scraping.
+    Match analysis prompts use the digest instead of the raw (often HTML-heavy)
+    description, so the per-pair prompt stays small no matter how many users a job is matched with.
+    """
+
+    # Characters of plain-text description sent to the digest model
+    MAX_DESCRIPTION_CHARS = 12000
+
+    # Jobs digested per round of concurrent requests (bounds memory and transaction size)
+    DIGEST_BATCH_SIZE = 200
+
+    @staticmethod
+    def _to_plain_text(description: str) -> str:
+        """
+        Strips HTML markup and collapses whitespace.
+        """
+        try:
+            text = lxml.html.fromstring(description).text_content()
+        except (ParserError, ValueError):
+            text = description
+        return " ".join(text.split())
+
+    @classmethod
+    def _build_digest_request(cls, job: Job) -> dict:
+        prompt = JOB_DIGEST_PROMPT.format(
+            title=job.title,
+            job_description=cls._to_plain_text(job.description)[:cls.MAX_DESCRIPTION_CHARS]
+        )
+        return {
+            "model": settings.JOB_DIGEST_MODEL,
+            "messages": [
+                {"role": "system", "content": "你是一位专业的HR专家，擅长提炼职位的核心要求。"},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.0,
+            "max_tokens": 300,
+        }
+
+    @classmethod
+    def digest_pending_jobs(cls, db: Session) -> int:
+        """
+        Digests every job in the JOB_DIGEST_DAYS window that has no digest for the
+        current prompt version. Commits after each round and returns the number of jobs digested.
+        Jobs whose digest request fails keep their previous state and are retried on the next run.
+        """
+        window_start = datetime.now(timezone.utc) - timedelta(days=settings.JOB_DIGEST_DAYS)
+        pending_ids = [row[0] for row in db.query(Job.id).filter(
+            Job.created_at >= window_start,
+            or_(Job.digest.is_(None), Job.digest_version != JOB_DIGEST_PROMPT_VERSION)
+        ).order_by(Job.created_at).all()]
+
+        if not pending_ids:
+            logger.info("No jobs pending digest.")
+            return 0
+
+        logger.info(f"Generating digests for {len(pending_ids)} jobs...")
+        digested_count = 0
+        for start in range(0, len(pending_ids), cls.DIGEST_BATCH_SIZE):
+            digested_count += cls._digest_jobs(db, pending_ids[start:start + cls.DIGEST_BATCH_SIZE])
+
+        logger.info(f"Generated digests for {digested_count}/{len(pending_ids)} jobs.")
+        return digested_count
+
+    @classmethod
+    def _digest_jobs(cls, db: Session, job_ids: List) -> int:
+        jobs = db.query(Job.id, Job.title, Job.description).filter(Job.id.in_(job_ids)).all()
+        digests = create_chat_completions(
+            [cls._build_digest_request(job) for job in jobs],
+            concurrency=settings.MATCH_ANALYSIS_CONCURRENCY,
+            timeout=settings.MATCH_ANALYSIS_TIMEOUT_SECONDS
+        )
+
+        rows = [
+            {"id": job.id, "digest": digest, "digest_version": JOB_DIGEST_PROMPT_VERSION}
+            for job, digest in zip(jobs, digests)
+            if digest
+        ]
+        if rows:
+            db.execute(update(Job), rows)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def prompt_text(job: Job) -> str:
+        """
+        Job text used in match analysis prompts: the digest when available, otherwise the raw description.
+        """
+        if settings.JOB_DIGEST_ENABLED and job.digest:
+            return job.digest
+        return job.description
@@ -1,16 +1,33 @@
+import json
 import logging
-from sqlalchemy.orm import Session
+from contextlib import contextmanager
+from sqlalchemy.orm import Session, joinedload
 from app.models.user import User
 from app.models.resume import Resume
 from app.models.job import Job
 from app.models.job_match import JobMatch
-from app.services.openai_service import get_openai_client
-from typing import List
-import openai
-from sqlalchemy import func
-from pgvector.sqlalchemy import Vector as PgVector
+from app.services.openai_service import create_chat_completions
+from typing import List, Optional
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import func, text, cast, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from pgvector.sqlalchemy import Vector as PgVector, HALFVEC
 from datetime import datetime, timedelta, timezone
-from app.prompts import MATCH_ANALYSIS_PROMPT 
+from app.core.config import settings
+from app.services.matching_engine import JobEmbeddingMatrix
+from app.services.job_snapshot_service import JobSnapshotService
+from app.services.job_processing_service import JobProcessingService
+from app.services.push_matching_service import PushMatchingService
+from app.services.job_stats_service import JobStatsService
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.job_digest_service import JobDigestService
+from app.prompts import (
+    MATCH_ANALYSIS_PROMPT,
+    MULTI_MATCH_ANALYSIS_SYSTEM_PROMPT,
+    MULTI_MATCH_ANALYSIS_RESUME_PROMPT,
+    MULTI_MATCH_ANALYSIS_JOB_PROMPT,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +36,28 @@ class JobMatchingService:
     核心服务，用于根据用户简历匹配最合适的岗位
     """
 
+    # 批量写入匹配记录时每条 INSERT 语句包含的行数
+    MATCH_INSERT_BATCH_SIZE = 1000
+
+    # pgvector 版本与可用索引，见 _vector_search_support
+    _vector_support = None
+
+    # 所有活跃用户最新的、已生成向量的简历 (集合式匹配使用)
+    _LATEST_RESUMES_SQL = """
+        SELECT DISTINCT ON (r.user_id) r.id AS resume_id, r.user_id, r.embedding, r.matched_until
+        FROM resumes r
+        JOIN users u ON u.id = r.user_id
+        WHERE u.is_active AND r.embedding IS NOT NULL AND r.status = 'parsed'
+        ORDER BY r.user_id, r.created_at DESC
+    """
+
     @classmethod
     def find_and_analyze_matches_for_user(cls, db: Session, user: User, top_k: int = 3, days: int = 1):
         """
         为单个用户查找并分析最匹配的top_k个岗位
         """
         # 1. 获取用户最新的、已生成向量的简历
-        latest_resume = db.query(Resume).filter(
-            Resume.user_id == user.id,
-            Resume.embedding.isnot(None),
-            Resume.status == 'parsed'
-        ).order_by(Resume.created_at.desc()).first()
+        latest_resume = cls._get_latest_resumes(db, [user.id]).get(user.id)
 
         if not latest_resume:
             logger.info(f"用户 {user.username} (ID: {user.id}) 没有可用于匹配的简历。")
@@ -42,124 +70,825 @@ class JobMatchingService:
         now_utc = datetime.now(timezone.utc) # 获取今天的日期
         start_datetime = now_utc - timedelta(days=days) # 计算起始日期，days默认为1天
         
-        # -- 新增诊断日志 --
-        # 检查在指定时间范围内，有多少岗位以及多少岗位有向量
-        total_jobs_in_range = db.query(Job).filter(Job.created_at >= start_datetime).count()
-        jobs_with_embedding_in_range = db.query(Job).filter(
-            Job.created_at >= start_datetime,
-            Job.embedding.isnot(None)
-        ).count()
+        cls._log_job_window_diagnostics(db, start_datetime, days)
+
+        # 3. 清理该简历之前的匹配记录
+        # db.query(JobMatch).filter(JobMatch.resume_id == latest_resume.id).delete()
+        # db.commit()
+        # logger.info(f"已清理用户 {user.username} 简历 {latest_resume.id} 的旧匹配记录。")
+
+        # 4. 为每个匹配的岗位生成AI分析并存储
+        created_count = cls._match_resumes(db, [(user, latest_resume)], start_datetime, top_k, days)
         
-        jobs_missing_embedding = total_jobs_in_range - jobs_with_embedding_in_range
+        db.commit()
+        if created_count == 0:
+            logger.info(f"没有找到与用户 {user.username} 的简历匹配的新岗位。")
+            return
+        logger.info(f"成功为用户 {user.username} 生成了 {created_count} 条新的岗位匹配。")
+
+    @classmethod
+    def find_and_analyze_matches_for_users(cls, db: Session, user_ids: List, top_k: int = 3, days: int = 1) -> int:
+        """
+        为一批用户查找并分析最匹配的top_k个岗位:
+        一次查询取出这批用户的最新简历，整批计算候选岗位，所有匹配记录在同一个事务中写入
+        """
+        users = db.query(User).filter(User.id.in_(user_ids)).all()
+        if not users:
+            logger.info("这批用户均不存在，跳过岗位匹配。")
+            return 0
+
+        latest_resumes = cls._get_latest_resumes(db, [user.id for user in users])
+        if not latest_resumes:
+            logger.info(f"这批 {len(users)} 位用户都没有可用于匹配的简历。")
+            return 0
+
+        start_datetime = datetime.now(timezone.utc) - timedelta(days=days)
+        cls._log_job_window_diagnostics(db, start_datetime, days)
+
+        user_resumes = [(user, latest_resumes[user.id]) for user in users if user.id in latest_resumes]
+        created_count = cls._match_resumes(db, user_resumes, start_datetime, top_k, days)
+
+        db.commit()
+        logger.info(f"成功为 {len(latest_resumes)} 位用户生成了 {created_count} 条新的岗位匹配。")
+        return created_count
+
+    @classmethod
+    def _match_resumes(cls, db: Session, user_resumes: list, start_datetime: datetime, top_k: int, days: int) -> int:
+        """
+        为一批 (User, Resume) 计算候选岗位并写入匹配记录 (不提交事务)，返回新建的匹配数量。
+        MATCHING_INCREMENTAL 开启时只为每份简历水位线 (matched_until) 之后的新岗位打分，
+        再与该简历在时间窗口内已有的匹配合并取 top_k，每晚的计算量只随新岗位数量增长
+        """
+        resumes = [resume for _, resume in user_resumes]
+
+        # 在检索之前确定本次覆盖到的岗位时间，作为新的水位线
+        scored_until = cls._get_scored_until(
+            db, start_datetime, days, use_job_matrix=settings.MATCHING_BACKEND == "numpy"
+        )
+
+        similar_jobs_by_resume = cls._find_similar_jobs_for_resumes(db, resumes, start_datetime, top_k, days)
+        if settings.MATCHING_INCREMENTAL:
+            similar_jobs_by_resume = cls._merge_with_existing_matches(db, similar_jobs_by_resume, start_datetime, top_k)
+
+        candidates = [
+            (user, resume, similar_jobs_by_resume.get(resume.id, []))
+            for user, resume in user_resumes
+        ]
+        created_count, oldest_failed_by_resume = cls._create_matches(db, candidates)
+
+        if scored_until is not None:
+            for resume in resumes:
+                resume.matched_until = cls._capped_watermark(scored_until, oldest_failed_by_resume.get(resume.id))
+        return created_count
+
+    @staticmethod
+    def _capped_watermark(scored_until: datetime, oldest_failed_created_at: Optional[datetime]) -> datetime:
+        """
+        简历的新水位线。有候选岗位因AI分析失败未写入时，水位线停在其中最早岗位之前，
+        下次匹配会重新为这些岗位打分，而不是永久跳过它们
+        """
+        if oldest_failed_created_at is None:
+            return scored_until
+        return min(scored_until, oldest_failed_created_at - timedelta(microseconds=1))
+
+    @staticmethod
+    def _resume_search_start(resume: Resume, start_datetime: datetime) -> datetime:
+        """
+        增量匹配时从简历的水位线开始检索，否则检索整个时间窗口
+        """
+        if settings.MATCHING_INCREMENTAL and resume.matched_until and resume.matched_until > start_datetime:
+            return resume.matched_until
+        return start_datetime
+
+    @classmethod
+    def _get_scored_until(cls, db: Session, start_datetime: datetime, days: int, use_job_matrix: bool = False):
+        """
+        本次匹配能覆盖到的最新岗位创建时间，即新的简历水位线。
+        水位线不会越过时间窗口内最早一个仍在等待向量的岗位，避免这些岗位补齐向量后被跳过；
+        已达到补齐重试上限的岗位不再参与匹配，不阻挡水位线
+        """
+        newest_embedded, oldest_missing = db.query(
+            func.max(Job.created_at).filter(Job.embedding.isnot(None)),
+            func.min(Job.created_at).filter(JobProcessingService.awaiting_embedding())
+        ).filter(Job.created_at >= start_datetime).one()
+
+        if newest_embedded is None:
+            return None
+
+        if use_job_matrix:
+            # 矩阵/快照可能比数据库旧，水位线以实际参与计算的岗位为准：
+            # 加载之后才补齐向量的岗位不在矩阵中，水位线停在加载时最早的待补齐岗位之前
+            job_matrix = cls._get_job_matrix(db, start_datetime, days)
+            matrix_latest = job_matrix.latest_created_at()
+            if matrix_latest is None:
+                return None
+            newest_embedded = min(newest_embedded, matrix_latest)
+            if job_matrix.pending_since is not None:
+                oldest_missing = min(oldest_missing, job_matrix.pending_since) if oldest_missing else job_matrix.pending_since
+
+        if oldest_missing is not None and oldest_missing <= newest_embedded:
+            return oldest_missing - timedelta(microseconds=1)
+        return newest_embedded
+
+    @staticmethod
+    def _merge_with_existing_matches(db: Session, similar_jobs_by_resume: dict, start_datetime: datetime, top_k: int) -> dict:
+        """
+        将新打分的岗位与简历在时间窗口内已有的匹配合并，只保留能进入合并后 top_k 的新岗位
+        """
+        existing = db.query(JobMatch.resume_id, JobMatch.job_id, JobMatch.similarity_score).join(
+            Job, Job.id == JobMatch.job_id
+        ).filter(
+            JobMatch.resume_id.in_(list(similar_jobs_by_resume.keys())),
+            Job.created_at >= start_datetime
+        ).all()
+
+        existing_by_resume = defaultdict(dict)
+        for resume_id, job_id, similarity_score in existing:
+            existing_by_resume[resume_id][job_id] = similarity_score
+
+        merged = {}
+        for resume_id, similar_jobs in similar_jobs_by_resume.items():
+            existing_scores = existing_by_resume.get(resume_id, {})
+            new_jobs = [(job, distance) for job, distance in similar_jobs if job.id not in existing_scores]
+            merged[resume_id] = [
+                (job, distance)
+                for rank, (job, distance) in enumerate(new_jobs)
+                if rank + sum(1 for score in existing_scores.values() if score > 1 - distance) < top_k
+            ]
+        return merged
+
+    @staticmethod
+    def _log_job_window_diagnostics(db: Session, start_datetime: datetime, days: int):
+        """
+        诊断日志：检查在指定时间范围内，有多少岗位以及多少岗位有向量
+        统计结果每次爬取后计算一次并缓存在 job_window_stats 表中，这里只读取缓存
+        """
+        stats = JobStatsService.get_window_stats(db, days)
+        total_jobs_in_range = stats.total_jobs
+        jobs_with_embedding_in_range = stats.jobs_with_embedding
+        
+        jobs_missing_embedding = stats.jobs_missing_embedding
 
         logger.info(f"诊断信息：在过去 {days} 天内，总共找到 {total_jobs_in_range} 个岗位。其中 {jobs_with_embedding_in_range} 个有向量。")
 
         if jobs_missing_embedding > 0:
-            logger.warning(f"发现 {jobs_missing_embedding} 个岗位在时间范围内缺失向量，这可能影响匹配结果的完整性。")
-        # -- 诊断日志结束 --
-        
-        similar_jobs = db.query(
-            Job,
-            Job.embedding.cosine_distance(latest_resume.embedding).label('distance')
-        ).filter(
-            Job.embedding.isnot(None),
-            Job.created_at >= start_datetime ## 只匹配当天创建的岗位
-        ).order_by('distance').limit(top_k).all()
+            logger.warning(f"发现 {jobs_missing_embedding} 个岗位在时间范围内缺失向量，将由向量补齐任务重试；补齐前它们不参与匹配。")
 
-        if not similar_jobs:
-            logger.info(f"没有找到与用户 {user.username} 的简历匹配的岗位。")
-            return
+    @staticmethod
+    def _get_latest_resumes(db: Session, user_ids: List) -> dict:
+        """
+        一次查询获取每个用户最新的、已生成向量的简历，返回 {user_id: Resume}
+        """
+        resumes = db.query(Resume).filter(
+            Resume.user_id.in_(user_ids),
+            Resume.embedding.isnot(None),
+            Resume.status == 'parsed'
+        ).distinct(Resume.user_id).order_by(Resume.user_id, Resume.created_at.desc()).all()
 
-        # 3. 清理该简历之前的匹配记录
-        # db.query(JobMatch).filter(JobMatch.resume_id == latest_resume.id).delete()
-        # db.commit()
-        # logger.info(f"已清理用户 {user.username} 简历 {latest_resume.id} 的旧匹配记录。")
+        return {resume.user_id: resume for resume in resumes}
 
-        # 4. 为每个匹配的岗位生成AI分析并存储
-        for job, distance in similar_jobs:
-            try:
-                # 检查是否已存在该用户和该职位的匹配记录
-                existing_match = db.query(JobMatch).filter_by(user_id=user.id, job_id=job.id).first()
-                if existing_match:
+    @classmethod
+    def _find_similar_jobs_for_resumes(cls, db: Session, resumes: List[Resume], start_datetime: datetime, top_k: int, days: int) -> dict:
+        """
+        为一批简历查找最相似的 top_k 个岗位，返回 {resume_id: [(Job, distance), ...]}
+        MATCHING_BACKEND=numpy 时把时间窗口内的岗位向量加载成矩阵，一次矩阵乘法完成整批计算；
+        否则逐份简历执行 pgvector 查询
+        """
+        if settings.MATCHING_BACKEND == "push":
+            return cls._find_similar_jobs_from_push(db, resumes, start_datetime, top_k)
+
+        if settings.MATCHING_BACKEND != "numpy":
+            return {
+                resume.id: cls._search_similar_jobs(
+                    db, resume.embedding, cls._resume_search_start(resume, start_datetime), top_k
+                )
+                for resume in resumes
+            }
+
+        job_matrix = cls._get_job_matrix(db, start_datetime, days)
+        if not resumes or len(job_matrix) == 0:
+            return {}
+
+        indices, distances = job_matrix.top_k(
+            [resume.embedding for resume in resumes],
+            top_k,
+            since=[cls._resume_search_start(resume, start_datetime) for resume in resumes]
+        )
+
+        matched_job_ids = {
+            job_matrix.job_id(index)
+            for index, distance in zip(indices.ravel(), distances.ravel())
+            if np.isfinite(distance)
+        }
+        jobs_by_id = {job.id: job for job in db.query(Job).filter(Job.id.in_(matched_job_ids)).all()}
+
+        similar_jobs_by_resume = {}
+        for row, resume in enumerate(resumes):
+            similar_jobs_by_resume[resume.id] = [
+                (jobs_by_id[job_matrix.job_id(index)], float(distance))
+                for index, distance in zip(indices[row], distances[row])
+                if np.isfinite(distance) and job_matrix.job_id(index) in jobs_by_id
+            ]
+        return similar_jobs_by_resume
+
+    @classmethod
+    def _find_similar_jobs_from_push(cls, db: Session, resumes: List[Resume], start_datetime: datetime, top_k: int) -> dict:
+        """
+        推送式匹配：直接读取岗位生成向量时已写入 Redis 的候选岗位。
+        从未匹配过的简历 (水位线为空，如新上传的简历) 还没有覆盖整个时间窗口的候选，改用 pgvector 检索
+        """
+        similar_jobs_by_resume = {
+            resume.id: cls._search_similar_jobs(db, resume.embedding, start_datetime, top_k)
+            for resume in resumes
+            if resume.matched_until is None
+        }
+
+        pushed_resumes = [resume for resume in resumes if resume.matched_until is not None]
+        if not pushed_resumes:
+            return similar_jobs_by_resume
+
+        candidates = PushMatchingService.get_candidates([resume.id for resume in pushed_resumes], start_datetime, top_k)
+        candidate_job_ids = {job_id for items in candidates.values() for job_id, _ in items}
+        jobs_by_id = {}
+        if candidate_job_ids:
+            jobs_by_id = {
+                job.id: job
+                for job in db.query(Job).filter(Job.id.in_(candidate_job_ids), Job.embedding.isnot(None)).all()
+            }
+
+        for resume in pushed_resumes:
+            since = cls._resume_search_start(resume, start_datetime)
+            similar_jobs = [
+                (jobs_by_id[job_id], 1 - similarity)
+                for job_id, similarity in candidates.get(resume.id, [])
+                if job_id in jobs_by_id and jobs_by_id[job_id].created_at >= since
+            ]
+            similar_jobs_by_resume[resume.id] = similar_jobs[:top_k]
+        return similar_jobs_by_resume
+
+    @staticmethod
+    def _get_job_matrix(db: Session, start_datetime: datetime, days: int) -> JobEmbeddingMatrix:
+        """
+        优先使用已发布的 mmap 岗位快照 (多个 worker 共享)，快照不可用或不覆盖时间窗口时从数据库加载
+        """
+        if settings.JOB_SNAPSHOT_ENABLED:
+            snapshot = JobSnapshotService.load_current_snapshot()
+            if snapshot is not None and snapshot.covers(start_datetime):
+                return JobEmbeddingMatrix.from_snapshot(snapshot, start_datetime)
+            logger.info("岗位向量快照不可用或不覆盖当前时间窗口，改为从数据库加载。")
+
+        return JobEmbeddingMatrix.get_cached(db, start_datetime, days, settings.MATCHING_MATRIX_CACHE_SECONDS)
+
+    @classmethod
+    def _create_matches(cls, db: Session, candidates: list) -> tuple:
+        """
+        为候选岗位生成AI分析并批量写入匹配记录 (不提交事务)。
+        返回 (新建的匹配数量, {resume_id: 因分析失败未写入的最早岗位的 created_at})
+        candidates: [(User, Resume, [(Job, distance), ...]), ...]
+        """
+        pairs = [(user.id, job.id) for user, _, similar_jobs in candidates for job, _ in similar_jobs]
+        if not pairs:
+            return 0, {}
+
+        # 一次查询找出已存在的 (user_id, job_id) 匹配，替代逐岗位的 existing_match 查询
+        existing_pairs = cls._get_existing_match_pairs(db, pairs)
+
+        pending = []
+        for user, resume, similar_jobs in candidates:
+            for job, distance in similar_jobs:
+                if (user.id, job.id) in existing_pairs:
                     logger.info(f"用户 {user.username} 与岗位 {job.title} (Job ID: {job.id}) 的匹配已存在，跳过。")
                     continue
+                pending.append((user, resume, job, distance))
 
-                analysis = cls._generate_match_analysis(
-                    resume_content=latest_resume.parsed_content,
-                    job_description=job.description
-                )
-                
-                new_match = JobMatch(
-                    user_id=user.id,
-                    resume_id=latest_resume.id,
-                    job_id=job.id,
-                    similarity_score=1 - distance,  # 将距离转换为相似度 (1-cos距离)
-                    analysis=analysis
+        deferred = settings.MATCH_ANALYSIS_MODE in ("batch", "lazy")
+        if deferred:
+            # batch 模式：分析由匹配结束后提交的 Batch API 任务统一生成
+            # lazy 模式：分析在用户第一次查看匹配时生成
+            analyses = [None] * len(pending)
+        else:
+            # 并发生成整批的AI分析，生成失败的岗位不写入匹配记录
+            analyses = cls._generate_match_analyses(
+                [(resume.parsed_content, JobDigestService.prompt_text(job)) for _, resume, job, _ in pending]
+            )
+
+        new_rows = []
+        oldest_failed_by_resume = {}
+        for (user, resume, job, distance), analysis in zip(pending, analyses):
+            if analysis is None and not deferred:
+                logger.error(f"为岗位 {job.id} 生成AI分析时失败，跳过该匹配，下次匹配时重试。")
+                if resume.id not in oldest_failed_by_resume or job.created_at < oldest_failed_by_resume[resume.id]:
+                    oldest_failed_by_resume[resume.id] = job.created_at
+                continue
+
+            new_rows.append({
+                "user_id": user.id,
+                "resume_id": resume.id,
+                "job_id": job.id,
+                "similarity_score": 1 - distance,  # 将距离转换为相似度 (1-cos距离)
+                "analysis": analysis,
+            })
+            logger.info(f"为用户 {user.username} 创建了新的岗位匹配: {job.title} (Job ID: {job.id})")
+
+        return cls._bulk_insert_matches(db, new_rows), oldest_failed_by_resume
+
+    @staticmethod
+    def _get_existing_match_pairs(db: Session, pairs: List[tuple]) -> set:
+        """
+        返回 pairs 中已经存在匹配记录的 (user_id, job_id) 集合
+        """
+        existing = db.query(JobMatch.user_id, JobMatch.job_id).filter(
+            tuple_(JobMatch.user_id, JobMatch.job_id).in_(pairs)
+        ).all()
+        return {(user_id, job_id) for user_id, job_id in existing}
+
+    @classmethod
+    def _bulk_insert_matches(cls, db: Session, rows: List[dict]) -> int:
+        """
+        分批 INSERT ... ON CONFLICT (user_id, job_id) DO NOTHING 写入匹配记录 (不提交事务)，
+        与手动触发的匹配流程并发时也不会产生重复记录。返回实际插入的行数
+        """
+        inserted_count = 0
+        for start in range(0, len(rows), cls.MATCH_INSERT_BATCH_SIZE):
+            batch = rows[start:start + cls.MATCH_INSERT_BATCH_SIZE]
+            statement = insert(JobMatch).values(batch).on_conflict_do_nothing(
+                index_elements=['user_id', 'job_id']
+            ).returning(JobMatch.id)
+            inserted_count += len(db.execute(statement).all())
+        return inserted_count
+
+    @classmethod
+    def _vector_search_support(cls, db: Session) -> dict:
+        """
+        查询当前数据库的 pgvector 版本与 jobs.embedding 上已有的 HNSW 索引 (每个进程只查一次)：
+        iterative_scan 需要 pgvector >= 0.8；float32 索引在启用量化检索后已被 halfvec 索引取代
+        """
+        if cls._vector_support is None:
+            version = db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar() or "0"
+            index_defs = db.execute(text(
+                "SELECT indexdef FROM pg_indexes WHERE tablename = 'jobs' AND indexdef ILIKE '%USING hnsw%'"
+            )).scalars().all()
+            cls._vector_support = {
+                "iterative_scan": tuple(int(part) for part in version.split(".")[:2] if part.isdigit()) >= (0, 8),
+                "float32_index": any("vector_cosine_ops" in index_def for index_def in index_defs),
+                "halfvec_index": any("halfvec_cosine_ops" in index_def for index_def in index_defs),
+            }
+            logger.info(f"pgvector {version}，向量检索能力: {cls._vector_support}")
+            index_key = "halfvec_index" if settings.MATCHING_QUANTIZED_SEARCH else "float32_index"
+            if not cls._vector_support[index_key]:
+                logger.warning(
+                    f"jobs.embedding 上没有 MATCHING_QUANTIZED_SEARCH={settings.MATCHING_QUANTIZED_SEARCH} 所需的 "
+                    f"{'halfvec' if settings.MATCHING_QUANTIZED_SEARCH else 'float32'} HNSW 索引，向量检索将退回精确的顺序扫描。"
                 )
-                db.add(new_match)
-                logger.info(f"为用户 {user.username} 创建了新的岗位匹配: {job.title} (Job ID: {job.id})")
+        return cls._vector_support
 
-            except Exception as e:
-                logger.error(f"为岗位 {job.id} 生成AI分析或创建匹配记录时失败: {e}")
+    @classmethod
+    @contextmanager
+    def _vector_search_settings(cls, db: Session, exact: bool = False, ef_search: int = None, quantized: bool = True):
+        """
+        在 with 块内为向量检索设置参数。HNSW 参数为事务级 (SET LOCAL 语义)，只影响向量检索。
+        exact=True 时禁用索引扫描，走精确的顺序扫描，用于兜底或校验召回率；
+        enable_indexscan 会影响事务内的所有查询，因此块结束后立即恢复原值。
+        quantized 表示查询走 halfvec 索引还是 float32 索引；对应索引不存在时显式退回精确检索
+        """
+        support = cls._vector_search_support(db)
+        if not support["halfvec_index" if quantized else "float32_index"]:
+            exact = True
+
+        if exact:
+            previous = db.execute(text("SELECT current_setting('enable_indexscan')")).scalar()
+            db.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+            yield
+            # 查询出错时整个事务回滚，设置随之失效，只需在正常结束时恢复
+            db.execute(text("SELECT set_config('enable_indexscan', :value, true)"), {"value": previous})
+            return
+
+        db.execute(
+            text("SELECT set_config('hnsw.ef_search', :value, true)"),
+            {"value": str(ef_search or settings.VECTOR_HNSW_EF_SEARCH)}
+        )
+        if settings.VECTOR_HNSW_ITERATIVE_SCAN != "off" and support["iterative_scan"]:
+            # 带时间窗口过滤的 ANN 查询需要迭代扫描，否则可能返回不足 top_k 条
+            db.execute(
+                text("SELECT set_config('hnsw.iterative_scan', :value, true)"),
+                {"value": settings.VECTOR_HNSW_ITERATIVE_SCAN}
+            )
+        yield
+
+    @classmethod
+    def _search_similar_jobs(cls, db: Session, embedding, start_datetime: datetime, top_k: int, exact: bool = None):
+        """
+        在时间窗口内按 cosine 距离查找最相似的 top_k 个岗位，返回 [(Job, distance), ...]
+        """
+        if exact is None:
+            exact = settings.MATCHING_EXACT_SEARCH
+
+        if not exact and settings.MATCHING_QUANTIZED_SEARCH:
+            return cls._search_similar_jobs_quantized(db, embedding, start_datetime, top_k)
+
+        with cls._vector_search_settings(db, exact=exact, quantized=False):
+            return db.query(
+                Job,
+                Job.embedding.cosine_distance(embedding).label('distance')
+            ).filter(
+                Job.embedding.isnot(None),
+                Job.created_at >= start_datetime ## 只匹配当天创建的岗位
+            ).order_by('distance').limit(top_k).all()
+
+    @classmethod
+    def _search_similar_jobs_quantized(cls, db: Session, embedding, start_datetime: datetime, top_k: int):
+        """
+        两阶段检索：先在 halfvec (float16) HNSW 索引上取 MATCHING_RERANK_CANDIDATES 个候选，
+        再用原始 float32 向量计算精确 cosine 距离重排，取前 top_k 个
+        """
+        candidate_count = max(settings.MATCHING_RERANK_CANDIDATES, top_k)
+        halfvec_type = HALFVEC(Job.embedding.type.dim)
+        candidates = db.query(Job.id).filter(
+            Job.embedding.isnot(None),
+            Job.created_at >= start_datetime
+        ).order_by(
+            cast(Job.embedding, halfvec_type).cosine_distance(cast(embedding, halfvec_type))
+        ).limit(candidate_count).subquery()
+
+        # ef_search 决定 HNSW 单次返回的候选数量上限，需不小于候选数
+        with cls._vector_search_settings(db, ef_search=max(settings.VECTOR_HNSW_EF_SEARCH, candidate_count)):
+            return db.query(
+                Job,
+                Job.embedding.cosine_distance(embedding).label('distance')
+            ).join(
+                candidates, Job.id == candidates.c.id
+            ).order_by('distance').limit(top_k).all()
+
+    @classmethod
+    def evaluate_search_recall(cls, db: Session, top_k: int = 10, days: int = 1, sample_size: int = 20) -> dict:
+        """
+        抽样若干份最新简历，对比 ANN 索引检索与精确检索的结果，计算 recall@top_k
+        """
+        start_datetime = datetime.now(timezone.utc) - timedelta(days=days)
+        resumes = db.query(Resume).filter(
+            Resume.embedding.isnot(None),
+            Resume.status == 'parsed'
+        ).order_by(Resume.created_at.desc()).limit(sample_size).all()
+
+        embeddings = [resume.embedding for resume in resumes]
+        db.rollback()
+
+        recalls = []
+        identical_count = 0
+        for embedding in embeddings:
+            # 每次检索使用独立事务，避免 SET LOCAL 的设置互相影响
+            exact_ids = [job.id for job, _ in cls._search_similar_jobs(db, embedding, start_datetime, top_k, exact=True)]
+            db.rollback()
+            if not exact_ids:
                 continue
-        
-        db.commit()
-        logger.info(f"成功为用户 {user.username} 生成了 {len(similar_jobs)} 条新的岗位匹配。")
+            ann_ids = [job.id for job, _ in cls._search_similar_jobs(db, embedding, start_datetime, top_k, exact=False)]
+            db.rollback()
+            recalls.append(len(set(ann_ids) & set(exact_ids)) / len(exact_ids))
+            # 最终 top_k (含顺序) 与精确检索完全一致
+            if ann_ids == exact_ids:
+                identical_count += 1
+
+        report = {
+            "top_k": top_k,
+            "days": days,
+            "sampled_resumes": len(recalls),
+            "ef_search": settings.VECTOR_HNSW_EF_SEARCH,
+            "quantized": settings.MATCHING_QUANTIZED_SEARCH,
+            "rerank_candidates": settings.MATCHING_RERANK_CANDIDATES,
+            "mean_recall": sum(recalls) / len(recalls) if recalls else None,
+            "min_recall": min(recalls) if recalls else None,
+            "identical_top_k_ratio": identical_count / len(recalls) if recalls else None,
+        }
+        logger.info(f"向量检索召回率评估结果: {report}")
+        return report
 
     @staticmethod
-    def _generate_match_analysis(resume_content: str, job_description: str) -> str:
+    def build_analysis_request(resume_content: str, job_description: str) -> dict:
         """
-        使用OpenAI生成简历与岗位JD的匹配分析
+        构造单个 (简历, 岗位) 匹配分析的 chat.completions 请求参数。
+        sync 模式、batch 模式与 lazy 模式共用，三者的缓存键因此一致
         """
         prompt = MATCH_ANALYSIS_PROMPT.format(
             resume_content=resume_content[:4000],
             job_description=job_description[:4000]
         )
-        try:
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
-                    {"role": "system", "content": "你是一位专业的HR专家，擅长精准地分析候选人与岗位的匹配度。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=200,
+        return {
+            "model": "gpt-4-turbo",
+            "messages": [
+                {"role": "system", "content": "你是一位专业的HR专家，擅长精准地分析候选人与岗位的匹配度。"},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 200,
+        }
+
+    @classmethod
+    def _generate_match_analyses(cls, pairs: List[tuple]) -> List[Optional[str]]:
+        """
+        并发生成一批 (resume_content, job_description) 的匹配分析，结果与输入顺序一致。
+        先查内容寻址缓存，只有未命中的请求 (同批内相同请求只调用一次) 才会调用OpenAI。
+        单个调用失败或超时时对应位置为 None，不影响同批其他分析。
+        multi 模式下同一份简历的多个岗位合并在一次调用中分析。
+        """
+        if not pairs:
+            return []
+        if settings.MATCH_ANALYSIS_MODE == "multi":
+            return cls._generate_multi_job_analyses(pairs)
+        return cls._generate_single_job_analyses(pairs)
+
+    @classmethod
+    def _generate_single_job_analyses(cls, pairs: List[tuple]) -> List[Optional[str]]:
+        """
+        每个 (简历, 岗位) 对单独调用一次OpenAI
+        """
+        requests = [cls.build_analysis_request(resume, job) for resume, job in pairs]
+        keys = [MatchAnalysisCache.cache_key(request) for request in requests]
+        analyses = MatchAnalysisCache.get_many(keys)
+
+        missing = {}
+        for key, request, analysis in zip(keys, requests, analyses):
+            if analysis is None:
+                missing.setdefault(key, request)
+
+        if missing:
+            generated = create_chat_completions(
+                list(missing.values()),
+                concurrency=settings.MATCH_ANALYSIS_CONCURRENCY,
+                timeout=settings.MATCH_ANALYSIS_TIMEOUT_SECONDS
             )
-            analysis = response.choices[0].message.content.strip()
-            return analysis
-        except openai.APIError as e:
-            logger.error(f"OpenAI API 调用失败: {e}")
-            raise  # 重新抛出异常，让上层调用者处理
-        except Exception as e:
-            logger.error(f"生成AI分析时发生未知错误: {e}")
-            raise
+            generated = dict(zip(missing.keys(), generated))
+            MatchAnalysisCache.set_many({key: analysis for key, analysis in generated.items() if analysis is not None})
+            analyses = [analysis if analysis is not None else generated[key] for key, analysis in zip(keys, analyses)]
+        return analyses
+
+    @staticmethod
+    def _build_multi_job_analysis_request(resume_content: str, job_descriptions: List[str]) -> dict:
+        """
+        构造一次分析多个岗位的请求。system 提示词和简历在前且内容固定，岗位列表在后，
+        同一用户的多次调用共享相同的前缀，能命中服务端的 prompt 缓存。
+        """
+        content = MULTI_MATCH_ANALYSIS_RESUME_PROMPT.format(resume_content=resume_content[:4000])
+        content += "".join(
+            MULTI_MATCH_ANALYSIS_JOB_PROMPT.format(job_number=number, job_description=job_description[:4000])
+            for number, job_description in enumerate(job_descriptions, start=1)
+        )
+        return {
+            "model": "gpt-4-turbo",
+            "messages": [
+                {"role": "system", "content": MULTI_MATCH_ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": content}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3,
+            "max_tokens": 200 * len(job_descriptions) + 50,
+        }
+
+    @staticmethod
+    def _parse_multi_job_analyses(content: Optional[str], job_count: int) -> List[Optional[str]]:
+        """
+        解析 {"analyses": [{"job": 编号, "analysis": "..."}]}，返回按岗位编号排列的分析，缺失或无法解析的为 None
+        """
+        analyses = [None] * job_count
+        if not content:
+            return analyses
+        try:
+            items = json.loads(content).get("analyses") or []
+        except (ValueError, AttributeError) as e:
+            logger.error(f"无法解析多岗位分析结果: {e}")
+            return analyses
+
+        for item in items:
+            try:
+                number = int(item["job"])
+                analysis = str(item["analysis"]).strip()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 1 <= number <= job_count and analysis:
+                analyses[number - 1] = analysis
+        return analyses
 
     @classmethod
-    def run_matching_for_all_users(cls, db: Session):
+    def _generate_multi_job_analyses(cls, pairs: List[tuple]) -> List[Optional[str]]:
         """
-        dddddd
-        为所有活跃用户执行岗位匹配流程(目前应该没有调用这个方法，在tasks.py里用celery并行跑)
+        同一份简历的多个岗位在一次调用中分析 (每次最多 MATCH_MULTI_ANALYSIS_MAX_JOBS 个)，
+        简历只发送一次。结果按单岗位请求的缓存键写入缓存，与 sync/batch/lazy 模式共享。
+        多岗位调用中失败或缺失的岗位回退到单岗位调用。
+        """
+        keys = [MatchAnalysisCache.cache_key(cls.build_analysis_request(resume, job)) for resume, job in pairs]
+        analyses = MatchAnalysisCache.get_many(keys)
+
+        # {简历内容: {缓存键: 岗位描述}}，同批内相同的 (简历, 岗位) 只分析一次
+        jobs_by_resume = defaultdict(dict)
+        for key, (resume, job), analysis in zip(keys, pairs, analyses):
+            if analysis is None:
+                jobs_by_resume[resume].setdefault(key, job)
+
+        if not jobs_by_resume:
+            return analyses
+
+        max_jobs = settings.MATCH_MULTI_ANALYSIS_MAX_JOBS
+        groups = []
+        for resume, jobs in jobs_by_resume.items():
+            items = list(jobs.items())
+            for start in range(0, len(items), max_jobs):
+                groups.append((resume, items[start:start + max_jobs]))
+
+        responses = create_chat_completions(
+            [cls._build_multi_job_analysis_request(resume, [job for _, job in items]) for resume, items in groups],
+            concurrency=settings.MATCH_ANALYSIS_CONCURRENCY,
+            timeout=settings.MATCH_ANALYSIS_TIMEOUT_SECONDS
+        )
+
+        generated = {}
+        fallback = {}
+        for (resume, items), response in zip(groups, responses):
+            for (key, job), analysis in zip(items, cls._parse_multi_job_analyses(response, len(items))):
+                if analysis is not None:
+                    generated[key] = analysis
+                else:
+                    fallback[key] = (resume, job)
+
+        MatchAnalysisCache.set_many(generated)
+        logger.info(f"多岗位分析: {len(groups)} 次调用生成了 {len(generated)} 条分析。")
+
+        if fallback:
+            logger.warning(f"{len(fallback)} 个岗位未在多岗位分析结果中，改为逐个分析。")
+            generated.update(zip(fallback.keys(), cls._generate_single_job_analyses(list(fallback.values()))))
+
+        return [analysis if analysis is not None else generated.get(key) for key, analysis in zip(keys, analyses)]
+
+    @classmethod
+    def run_matching_for_all_users(cls, db: Session, top_k: int = 3, days: int = 1):
+        """
+        为所有活跃用户执行岗位匹配流程(目前应该没有调用这个方法，在tasks.py里用celery按批次并行跑)
+        按 MATCHING_CHUNK_SIZE 分批，每批用户一起计算候选岗位并在一个事务中写入
         """
         logger.info("开始为所有活跃用户执行每日岗位匹配...")
-        active_users = db.query(User).filter(User.is_active == True).all()
+        active_user_ids = [row[0] for row in db.query(User.id).filter(User.is_active == True).all()]
         
-        if not active_users:
+        if not active_user_ids:
             logger.info("没有活跃用户，跳过岗位匹配。")
             return
 
-        logger.info(f"找到了 {len(active_users)} 位活跃用户。")
-        
-        for user in active_users:
+        logger.info(f"找到了 {len(active_user_ids)} 位活跃用户。")
+
+        chunk_size = settings.MATCHING_CHUNK_SIZE
+        for start in range(0, len(active_user_ids), chunk_size):
+            chunk = active_user_ids[start:start + chunk_size]
             try:
-                cls.find_and_analyze_matches_for_user(db, user)
+                cls.find_and_analyze_matches_for_users(db, chunk, top_k, days)
             except Exception as e:
-                logger.error(f"为用户 {user.username} (ID: {user.id}) 匹配岗位时发生严重错误: {e}")
-                # 即使单个用户失败，也继续为其他用户匹配
+                db.rollback()
+                logger.error(f"为第 {start // chunk_size + 1} 批用户 ({len(chunk)} 位) 匹配岗位时发生严重错误: {e}")
+                # 即使单个批次失败，也继续为其他用户匹配
                 continue
         
         logger.info("所有活跃用户的岗位匹配流程执行完毕。")
 
+    @classmethod
+    def match_all_users_set_based(cls, db: Session, top_k: int = 3, days: int = 1) -> int:
+        """
+        用一条 SQL 为所有活跃用户完成匹配：
+        每个用户的最新简历通过 LATERAL 子查询在时间窗口内取 top_k 个最近岗位，
+        结果直接 INSERT ... ON CONFLICT DO NOTHING 写入 job_matches。
+        向量计算全部在 Postgres 内完成，没有逐用户的 Python 往返和逐岗位的 existing_match 查询。
+        写入后再为尚无分析的匹配 (含上次中断遗留的) 生成AI分析。
+        """
+        start_datetime = datetime.now(timezone.utc) - timedelta(days=days)
+        cls._log_job_window_diagnostics(db, start_datetime, days)
+        scored_until = cls._get_scored_until(db, start_datetime, days)
+
+        params = {"start_datetime": start_datetime, "top_k": top_k}
+
+        # 增量匹配：每份简历只检索水位线之后的岗位，且新岗位需能进入与已有匹配合并后的 top_k
+        if settings.MATCHING_INCREMENTAL:
+            job_window_sql = "j.created_at >= GREATEST(:start_datetime, COALESCE(lr.matched_until, :start_datetime))"
+            merge_sql = """
+                AND (top_jobs.rank - 1) + (
+                    SELECT count(*) FROM job_matches em
+                    JOIN jobs ej ON ej.id = em.job_id
+                    WHERE em.resume_id = lr.resume_id
+                      AND ej.created_at >= :start_datetime
+                      AND em.similarity_score > 1 - top_jobs.distance
+                ) < :top_k
+            """
+        else:
+            job_window_sql = "j.created_at >= :start_datetime"
+            merge_sql = ""
+
+        if settings.MATCHING_QUANTIZED_SEARCH:
+            # 先在 halfvec 索引上取候选，再按 float32 精确距离重排；维度与表达式索引一致，取自模型定义
+            halfvec_type = f"halfvec({Job.embedding.type.dim})"
+            candidate_count = max(settings.MATCHING_RERANK_CANDIDATES, top_k)
+            vector_search = cls._vector_search_settings(db, ef_search=max(settings.VECTOR_HNSW_EF_SEARCH, candidate_count))
+            params["candidate_count"] = candidate_count
+            top_jobs_sql = f"""
+                SELECT c.id, c.embedding <=> lr.embedding AS distance
+                FROM (
+                    SELECT j.id, j.embedding
+                    FROM jobs j
+                    WHERE j.embedding IS NOT NULL AND {job_window_sql}
+                    ORDER BY j.embedding::{halfvec_type} <=> lr.embedding::{halfvec_type}
+                    LIMIT :candidate_count
+                ) c
+                ORDER BY distance
+                LIMIT :top_k
+            """
+        else:
+            vector_search = cls._vector_search_settings(db, exact=settings.MATCHING_EXACT_SEARCH, quantized=False)
+            top_jobs_sql = f"""
+                SELECT j.id, j.embedding <=> lr.embedding AS distance
+                FROM jobs j
+                WHERE j.embedding IS NOT NULL AND {job_window_sql}
+                ORDER BY distance
+                LIMIT :top_k
+            """
+
+        statement = text(f"""
+            WITH latest_resumes AS ({cls._LATEST_RESUMES_SQL})
+            INSERT INTO job_matches (id, user_id, resume_id, job_id, similarity_score, analysis, is_viewed, created_at)
+            SELECT gen_random_uuid(), lr.user_id, lr.resume_id, top_jobs.id, 1 - top_jobs.distance, NULL, false, now()
+            FROM latest_resumes lr
+            CROSS JOIN LATERAL (
+                SELECT t.id, t.distance, row_number() OVER (ORDER BY t.distance) AS rank
+                FROM ({top_jobs_sql}) t
+            ) AS top_jobs
+            WHERE NOT EXISTS (
+                SELECT 1 FROM job_matches jm
+                WHERE jm.user_id = lr.user_id AND jm.job_id = top_jobs.id
+            )
+            {merge_sql}
+            ON CONFLICT (user_id, job_id) DO NOTHING
+            RETURNING id
+        """)
+
+        with vector_search:
+            new_match_ids = [row[0] for row in db.execute(statement, params)]
+        db.commit()
+        logger.info(f"集合式匹配完成，共写入 {len(new_match_ids)} 条新的岗位匹配。")
+
+        # batch 模式下分析由 Batch API 任务统一生成，lazy 模式下在查看时生成。
+        # 匹配先于分析提交，上次运行中断后留下的无分析匹配也在这里一并补齐
+        failed_matches = []
+        if settings.MATCH_ANALYSIS_MODE in ("sync", "multi"):
+            failed_matches = cls._fill_missing_analyses(db, start_datetime)
+
+        oldest_failed_by_resume = {}
+        if failed_matches:
+            # 与逐批匹配一致：分析失败的匹配不保留，下次匹配时重新打分
+            db.query(JobMatch).filter(
+                JobMatch.id.in_([match_id for match_id, _, _ in failed_matches])
+            ).delete(synchronize_session=False)
+            for _, resume_id, created_at in failed_matches:
+                if resume_id not in oldest_failed_by_resume or created_at < oldest_failed_by_resume[resume_id]:
+                    oldest_failed_by_resume[resume_id] = created_at
+
+        if scored_until is not None:
+            db.execute(text(f"""
+                WITH latest_resumes AS ({cls._LATEST_RESUMES_SQL})
+                UPDATE resumes SET matched_until = :scored_until
+                WHERE id IN (SELECT resume_id FROM latest_resumes)
+            """), {"scored_until": scored_until})
+            if oldest_failed_by_resume:
+                db.execute(update(Resume), [
+                    {"id": resume_id, "matched_until": cls._capped_watermark(scored_until, oldest_failed)}
+                    for resume_id, oldest_failed in oldest_failed_by_resume.items()
+                ])
+
+        db.commit()
+        failed_ids = {match_id for match_id, _, _ in failed_matches}
+        return sum(1 for match_id in new_match_ids if match_id not in failed_ids)
+
+    @classmethod
+    def _fill_missing_analyses(cls, db: Session, start_datetime: datetime) -> List[tuple]:
+        """
+        为时间窗口内已写入但尚无分析内容的匹配记录生成AI分析，
+        包括本次新写入的匹配和此前运行中断时遗留的匹配 (已提交给 Batch API 的除外)。
+        返回生成失败的匹配 [(match_id, resume_id, 岗位 created_at), ...]
+        """
+        matches = db.query(JobMatch).options(
+            joinedload(JobMatch.job), joinedload(JobMatch.resume)
+        ).filter(
+            JobMatch.analysis.is_(None),
+            JobMatch.analysis_batch_id.is_(None),
+            JobMatch.job.has(Job.created_at >= start_datetime)
+        ).all()
+
+        analyses = cls._generate_match_analyses(
+            [(match.resume.parsed_content, JobDigestService.prompt_text(match.job)) for match in matches]
+        )
+        failed_matches = []
+        for match, analysis in zip(matches, analyses):
+            if analysis is None:
+                logger.error(f"为匹配记录 {match.id} 生成AI分析时失败。")
+                failed_matches.append((match.id, match.resume_id, match.job.created_at))
+                continue
+            match.analysis = analysis
+
+        db.commit()
+        logger.info(f"已为 {len(matches) - len(failed_matches)}/{len(matches)} 条匹配记录生成AI分析。")
+        return failed_matches
+
     @classmethod
     def get_matches_for_user(cls, db: Session, user_id: str, skip: int = 0, limit: int = 10) -> tuple[List[JobMatch], int]:
         """
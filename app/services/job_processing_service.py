@@ -1,55 +1,149 @@
-import os
-from uuid import UUID
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.models.job import Job
-from app.services.openai_service import get_openai_client
+from app.services.embedding_service import EmbeddingService
+
+logger = logging.getLogger(__name__)
 
 class JobProcessingService:
     """
     A service class for processing jobs, specifically for generating embeddings.
+
+    Jobs without a vector form a durable backlog (embedding IS NULL). Every failed
+    attempt is recorded on the job (embedding_attempts, embedding_last_attempt_at), and
+    backfill_missing_embeddings retries them with exponential backoff until
+    EMBEDDING_BACKFILL_MAX_ATTEMPTS is reached.
     """
 
     @staticmethod
-    def _get_embedding(text: str, model="text-embedding-3-small") -> list[float]:
+    def _build_embedding_content(job: Job) -> str:
         """
-        Generates an embedding for the given text using OpenAI's API.
+        Concatenates the relevant fields of a job into the text that is embedded.
         """
-        client = get_openai_client()
-        text = text.replace("\n", " ")
-        response = client.embeddings.create(input=[text], model=model)
-        return response.data[0].embedding
+        content_to_embed = f"Title: {job.title}\n"
+        if job.tags:
+            content_to_embed += f"Tags: {', '.join(job.tags)}\n"
+        content_to_embed += f"Description: {job.description}"
+        return content_to_embed.replace("\n", " ")
+
+    @classmethod
+    def process_job_embeddings(cls, db: Session, jobs: List[Job]) -> int:
+        """
+        Generates and stores embeddings for a batch of jobs.
+
+        Jobs that already have an embedding are skipped. Text already embedded before
+        (e.g. the same posting from another source) reuses the cached vector, and all
+        remaining jobs are embedded with as few API requests as possible (see EmbeddingService).
+        Jobs that could not be embedded get the failed attempt recorded for the backfill task.
+        It does not commit the transaction, allowing it to be part of a larger one.
+        Returns the number of jobs that received an embedding.
+        """
+        pending = [job for job in jobs if job is not None and job.embedding is None]
+        if not pending:
+            return 0
+
+        embeddings = EmbeddingService.embed_texts([cls._build_embedding_content(job) for job in pending], db=db)
+
+        attempted_at = datetime.now(timezone.utc)
+        embedded_count = 0
+        for job, embedding in zip(pending, embeddings):
+            if embedding is None:
+                job.embedding_attempts = (job.embedding_attempts or 0) + 1
+                job.embedding_last_attempt_at = attempted_at
+                logger.warning(f"Failed to generate embedding for job {job.id} (attempt {job.embedding_attempts}).")
+                continue
+            job.embedding = embedding
+            embedded_count += 1
+
+        logger.info(f"Generated embeddings for {embedded_count}/{len(pending)} jobs.")
+        return embedded_count
 
     @classmethod
     def process_job_embedding(cls, db: Session, job: Job):
         """
         Processes a single job to generate and store its embedding.
-
-        This method retrieves a job, checks if an embedding already exists,
-        generates a new one if it doesn't, and updates the job record.
         It does not commit the transaction, allowing it to be part of a larger one.
         """
         if not job:
             # Or raise an exception, depending on desired error handling
-            print("Received an invalid job object.")
+            logger.warning("Received an invalid job object.")
             return
 
         if job.embedding is not None:
-            print(f"Embedding for job {job.id} already exists. Skipping.")
+            logger.info(f"Embedding for job {job.id} already exists. Skipping.")
             return
 
-        # Concatenate relevant fields to create the content for embedding
-        content_to_embed = f"Title: {job.title}\n"
-        if job.tags:
-            content_to_embed += f"Tags: {', '.join(job.tags)}\n"
-        content_to_embed += f"Description: {job.description}"
+        cls.process_job_embeddings(db, [job])
 
-        # Generate and save the embedding
-        try:
-            embedding = cls._get_embedding(content_to_embed)
-            job.embedding = embedding
-            print(f"Successfully generated embedding for job {job.id}.")
-        except Exception as e:
-            print(f"Failed to generate embedding for job {job.id}: {e}")
-            # Optionally, re-raise the exception or handle it
-            # For now, we just log and continue
-            pass
+    @staticmethod
+    def awaiting_embedding():
+        """
+        SQL condition for jobs that still may receive an embedding: no vector yet and
+        fewer than EMBEDDING_BACKFILL_MAX_ATTEMPTS failed attempts. Jobs past the limit are
+        permanently excluded from matching.
+        """
+        return Job.embedding.is_(None) & (Job.embedding_attempts < settings.EMBEDDING_BACKFILL_MAX_ATTEMPTS)
+
+    @classmethod
+    def oldest_awaiting_embedding(cls, db: Session, start_datetime: datetime) -> Optional[datetime]:
+        """
+        Creation time of the oldest job in the window that may still receive an embedding.
+        """
+        return db.query(func.min(Job.created_at)).filter(
+            cls.awaiting_embedding(),
+            Job.created_at >= start_datetime
+        ).scalar()
+
+    @staticmethod
+    def _retry_due():
+        """
+        SQL condition for jobs whose backoff has elapsed:
+        last attempt + min(base * 2^(attempts - 1), max) <= now.
+        """
+        backoff_seconds = func.least(
+            settings.EMBEDDING_BACKFILL_BACKOFF_MAX_SECONDS,
+            settings.EMBEDDING_BACKFILL_BACKOFF_SECONDS * func.power(2, func.greatest(Job.embedding_attempts - 1, 0))
+        )
+        return (Job.embedding_last_attempt_at.is_(None)) | (
+            Job.embedding_last_attempt_at + func.make_interval(0, 0, 0, 0, 0, 0, backoff_seconds) <= func.now()
+        )
+
+    @classmethod
+    def backfill_missing_embeddings(cls, db: Session) -> List[Job]:
+        """
+        Drains the backlog of jobs without an embedding.
+
+        Each round claims up to EMBEDDING_BACKFILL_BATCH_SIZE due jobs with
+        FOR UPDATE SKIP LOCKED (so concurrent workers never embed the same job),
+        embeds them and commits. Jobs that fail again are not due until their backoff
+        has elapsed, so the loop ends once every due job has been tried.
+        Returns the jobs that received an embedding.
+        """
+        embedded_jobs = []
+        while True:
+            jobs = db.query(Job).filter(
+                cls.awaiting_embedding(),
+                cls._retry_due()
+            ).order_by(Job.created_at).limit(settings.EMBEDDING_BACKFILL_BATCH_SIZE).with_for_update(skip_locked=True).all()
+
+            if not jobs:
+                break
+
+            cls.process_job_embeddings(db, jobs)
+            embedded_jobs.extend(job for job in jobs if job.embedding is not None)
+            db.commit()
+
+        exhausted_count = db.query(func.count(Job.id)).filter(
+            Job.embedding.is_(None),
+            Job.embedding_attempts >= settings.EMBEDDING_BACKFILL_MAX_ATTEMPTS
+        ).scalar()
+        if exhausted_count:
+            logger.error(f"{exhausted_count} jobs reached {settings.EMBEDDING_BACKFILL_MAX_ATTEMPTS} failed embedding attempts "
+                         f"and are excluded from matching. Reset embedding_attempts to retry them.")
+
+        logger.info(f"Embedding backfill finished. Embedded {len(embedded_jobs)} jobs.")
+        return embedded_jobs
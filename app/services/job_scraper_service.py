@@ -1,80 +1,317 @@
+import asyncio
 import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
 from app.models.job import Job
+from app.models.scrape_cursor import ScrapeCursor
+from app.services.job_scrapers.base import BaseScraper, create_http_client
 from app.services.job_scrapers.remoteok import RemoteOkScraper
 from app.services.job_scrapers.arbeitnow import ArbeitnowScraper
+from app.services.job_scrapers.hn_algolia import HnAlgoliaScraper
 from app.services.job_processing_service import JobProcessingService
+from app.services.job_snapshot_service import JobSnapshotService
+from app.services.push_matching_service import PushMatchingService
+from app.services.job_stats_service import JobStatsService
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a pipeline queue
+_DONE = object()
+
 class JobScraperService:
     """
     A service to orchestrate various job scrapers and save data to the database.
+
+    Scraping runs as a staged streaming pipeline connected by bounded queues
+    (SCRAPE_PIPELINE_QUEUE_SIZE), so a slow stage applies backpressure to the
+    ones before it and memory stays flat regardless of feed size:
+
+        fetch (one async producer per source, concurrently, sharing one HTTP client)
+          -> dedupe (one INSERT ... ON CONFLICT DO NOTHING RETURNING id per batch, committed)
+          -> embed (batched embeddings, own session; skipped if EMBEDDING_ON_SCRAPE is off)
+
+    Each stage flushes a partial batch after SCRAPE_PIPELINE_FLUSH_SECONDS without
+    new input, so embedding starts while sources are still being fetched.
+
+    With SCRAPE_INCREMENTAL, each source keeps a cursor (newest posted_at ingested, see
+    ScrapeCursor) and scrapers only return newer postings. A cursor advances after the
+    run, and only if every batch of that source was stored.
     """
     
     # A list of all scraper instances to be run.
     SCRAPERS = [
         RemoteOkScraper(),
-        ArbeitnowScraper()
+        ArbeitnowScraper(),
+        HnAlgoliaScraper()
     ]
 
     @classmethod
     def run_all_scrapers(cls, db: Session, limit_per_source: int = None):
         """
-        Iterates through all registered scrapers, fetches data, saves new
-        job postings, and generates embeddings for them.
+        Runs all registered scrapers through the pipeline, saves new job
+        postings and generates embeddings for them.
         """
-        total_new_jobs = 0
-        for scraper in cls.SCRAPERS:
-            source_name = scraper.get_source_name()
-            logger.info(f"Starting to scrape jobs from {source_name}...")
-            
-            new_jobs_to_process = []
+        cursors = cls._load_cursors(db) if settings.SCRAPE_INCREMENTAL else {}
+        total_new_jobs, newest = asyncio.run(cls._run_pipeline(db, limit_per_source, cursors))
+        
+        logger.info(f"Scraping finished. Total new jobs added: {total_new_jobs}.")
+
+        if settings.SCRAPE_INCREMENTAL:
             try:
-                normalized_jobs = scraper.fetch_and_normalize()
-                if not normalized_jobs:
-                    logger.info(f"No jobs found from {source_name}.")
-                    continue
-                
-                # 根据 limit_per_source 参数决定要处理的JD数量
-                if limit_per_source is not None and limit_per_source > 0:
-                    jobs_to_check = normalized_jobs[:limit_per_source]
-                    logger.info(f"Applying limit: checking the first {len(jobs_to_check)} of {len(normalized_jobs)} jobs found from {source_name}.")
-                else:
-                    jobs_to_check = normalized_jobs
-                    logger.info(f"Checking all {len(normalized_jobs)} jobs found from {source_name}.")
-
-                for job_data in jobs_to_check:
-                    # Check if the job already exists to avoid duplicates
-                    exists = db.query(Job).filter_by(
-                        source=source_name,
-                        source_id=job_data['source_id']
-                    ).first()
-
-                    if not exists:
-                        new_job = Job(**job_data)
-                        db.add(new_job)
-                        new_jobs_to_process.append(new_job)
-                
-                if new_jobs_to_process:
-                    # Flush to assign IDs before processing embeddings
-                    db.flush()
-
-                    logger.info(f"Found {len(new_jobs_to_process)} new jobs from {source_name}. Generating embeddings...")
-                    for job in new_jobs_to_process:
-                        try:
-                            JobProcessingService.process_job_embedding(db, job)
-                        except Exception as e:
-                            logger.error(f"Error processing embedding for job {job.id} from {source_name}: {e}")
-                    
-                    db.commit()
-                    logger.info(f"Successfully added {len(new_jobs_to_process)} new jobs and their embeddings from {source_name}.")
-                    total_new_jobs += len(new_jobs_to_process)
+                cls._advance_cursors(db, newest)
+            except Exception as e:
+                # The next run re-fetches from the old cursors; the insert skips what is already stored
+                logger.error(f"Failed to advance scrape cursors: {e}", exc_info=True)
+                db.rollback()
+
+        try:
+            JobStatsService.refresh_all(db)
+        except Exception as e:
+            logger.error(f"Failed to refresh job window stats: {e}", exc_info=True)
+            db.rollback()
+
+        if settings.JOB_SNAPSHOT_ENABLED:
+            try:
+                JobSnapshotService.publish_snapshot(db)
+            except Exception as e:
+                logger.error(f"Failed to publish job embedding snapshot: {e}", exc_info=True)
+
+    @staticmethod
+    def _load_cursors(db: Session) -> Dict[str, datetime]:
+        return {cursor.source: cursor.last_posted_at for cursor in db.query(ScrapeCursor).all()}
+
+    @staticmethod
+    def _advance_cursors(db: Session, newest: Dict[str, Tuple[datetime, str]]):
+        """
+        Moves each source's cursor to the newest posting of this run. A cursor never moves backwards.
+        """
+        if not newest:
+            return
+        rows = [
+            {"source": source, "last_posted_at": posted_at, "last_source_id": source_id}
+            for source, (posted_at, source_id) in newest.items()
+        ]
+        stmt = insert(ScrapeCursor).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScrapeCursor.source],
+            set_={
+                "last_posted_at": stmt.excluded.last_posted_at,
+                "last_source_id": stmt.excluded.last_source_id,
+                "updated_at": func.now(),
+            },
+            where=ScrapeCursor.last_posted_at < stmt.excluded.last_posted_at
+        )
+        db.execute(stmt)
+        db.commit()
+
+    @classmethod
+    async def _run_pipeline(cls, db: Session, limit_per_source: int = None,
+                            cursors: Dict[str, datetime] = None) -> Tuple[int, Dict[str, Tuple[datetime, str]]]:
+        """
+        Runs the fetch, dedupe and embed stages concurrently. Returns the number of new jobs
+        and, per fully stored source, the (posted_at, source_id) of its newest posting.
+        """
+        cursors = cursors or {}
+        dedupe_queue = asyncio.Queue(maxsize=settings.SCRAPE_PIPELINE_QUEUE_SIZE)
+        embed_queue = asyncio.Queue(maxsize=settings.SCRAPE_PIPELINE_QUEUE_SIZE)
+        newest = {}
+        failed_sources = set()
+
+        async def fetch_all():
+            # Total fetch time is that of the slowest source rather than the sum
+            async with create_http_client() as client:
+                await asyncio.gather(*(
+                    cls._fetch_stage(scraper, client, dedupe_queue, limit_per_source,
+                                     cursors.get(scraper.get_source_name()), newest)
+                    for scraper in cls.SCRAPERS
+                ))
+            await dedupe_queue.put(_DONE)
+
+        _, total_new_jobs, _ = await asyncio.gather(
+            fetch_all(),
+            cls._dedupe_stage(db, dedupe_queue, embed_queue, failed_sources),
+            cls._embed_stage(embed_queue)
+        )
+        return total_new_jobs, {source: item for source, item in newest.items() if source not in failed_sources}
+
+    @staticmethod
+    async def _fetch_stage(scraper: BaseScraper, client: httpx.AsyncClient, queue: asyncio.Queue, limit_per_source: int = None,
+                           since: Optional[datetime] = None, newest: Dict[str, Tuple[datetime, str]] = None):
+        """
+        Fetches one source (only postings newer than `since`) and streams its normalized jobs
+        into the queue page by page, waiting while it is full, so downstream stages start while
+        later pages are still being fetched. Records the source's newest posting in `newest`.
+
+        limit_per_source only caps a source's first run (no cursor yet): that run keeps the newest
+        postings and starts the cursor at the newest one ingested. Once a cursor exists, a run
+        fetches everything newer than it; a capped head-first slice would leave the cursor
+        stuck and refetch the same head every day.
+        """
+        source_name = scraper.get_source_name()
+        if since is not None:
+            limit_per_source = None
+        queued_count = 0
+        complete = True
+        truncated = False
+        latest = None
+        try:
+            logger.info(f"Starting to scrape jobs from {source_name}" + (f" (newer than {since.isoformat()})..." if since else "..."))
+            pages = scraper.fetch_and_normalize(client, since)
+            try:
+                async for page in pages:
+                    complete = complete and page.complete
+                    for job_data in page.jobs:
+                        # 根据 limit_per_source 参数决定要处理的JD数量
+                        if limit_per_source is not None and 0 < limit_per_source <= queued_count:
+                            truncated = True
+                            break
+                        await queue.put(job_data)
+                        queued_count += 1
+                        if latest is None or job_data['posted_at'] > latest['posted_at']:
+                            latest = job_data
+                    if truncated:
+                        break
+            finally:
+                await pages.aclose()
+
+            if not queued_count:
+                logger.info(f"No new jobs found from {source_name}.")
+                return
+            if truncated:
+                # Only on a first run; the cursor starts at the newest posting ingested
+                logger.info(f"Applying limit: checked the first {limit_per_source} jobs found from {source_name}.")
+            else:
+                logger.info(f"Checked all {queued_count} jobs found from {source_name}.")
+
+            if newest is not None and complete:
+                newest[source_name] = (latest['posted_at'], latest['source_id'])
+            elif newest is not None:
+                logger.warning(f"Jobs from {source_name} were fetched only partly; its scrape cursor is not advanced.")
+        except Exception as e:
+            logger.error(f"Failed to scrape from {source_name}: {e}")
+
+    @staticmethod
+    async def _next_batch(queue: asyncio.Queue, batch_size: int) -> Tuple[List[Any], bool]:
+        """
+        Collects up to batch_size items. Returns (batch, done); a partial batch is returned
+        once the queue stays empty for SCRAPE_PIPELINE_FLUSH_SECONDS or upstream is done.
+        """
+        batch = []
+        while len(batch) < batch_size:
+            try:
+                if batch:
+                    item = await asyncio.wait_for(queue.get(), timeout=settings.SCRAPE_PIPELINE_FLUSH_SECONDS)
                 else:
-                    logger.info(f"No new jobs to add from {source_name}.")
+                    item = await queue.get()
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
 
+    @classmethod
+    async def _dedupe_stage(cls, db: Session, in_queue: asyncio.Queue, out_queue: asyncio.Queue, failed_sources: set = None) -> int:
+        """
+        Inserts the jobs not seen before and passes the IDs of the truly new rows on to the embed stage.
+        Sources of batches that could not be stored are added to `failed_sources`.
+        """
+        seen = set()
+        total_new_jobs = 0
+        done = False
+        while not done:
+            batch, done = await cls._next_batch(in_queue, settings.SCRAPE_PIPELINE_DEDUPE_BATCH_SIZE)
+            # Drop duplicates within this run (e.g. a job listed twice in a feed)
+            new_batch = []
+            for job_data in batch:
+                key = (job_data['source'], job_data['source_id'])
+                if key not in seen:
+                    seen.add(key)
+                    new_batch.append(job_data)
+            if not new_batch:
+                continue
+
+            try:
+                new_job_ids = await asyncio.to_thread(cls._insert_new_jobs, db, new_batch)
             except Exception as e:
-                logger.error(f"Failed to scrape from {source_name}: {e}")
+                logger.error(f"Failed to save a batch of {len(new_batch)} scraped jobs: {e}")
                 db.rollback()
-        
-        logger.info(f"Scraping finished. Total new jobs added: {total_new_jobs}.")
+                if failed_sources is not None:
+                    # Their cursors must not skip past the lost jobs
+                    failed_sources.update(job_data['source'] for job_data in new_batch)
+                continue
+
+            total_new_jobs += len(new_job_ids)
+            for job_id in new_job_ids:
+                await out_queue.put(job_id)
+
+        await out_queue.put(_DONE)
+        return total_new_jobs
+
+    @staticmethod
+    def _insert_new_jobs(db: Session, jobs_data: List[Dict[str, Any]]) -> List:
+        """
+        Inserts a batch with a single INSERT ... ON CONFLICT DO NOTHING RETURNING id and commits.
+        Postings that already exist are skipped by the database, so only the IDs of
+        the truly new rows are returned.
+        """
+        # A multi-row VALUES needs the same columns in every row; sources fill different optional fields
+        columns = set().union(*jobs_data)
+        rows = [{column: job_data.get(column) for column in columns} for job_data in jobs_data]
+
+        # No conflict target: skips duplicates on (source, source_id) as well as on the unique source_id index
+        new_job_ids = db.execute(
+            insert(Job).values(rows).on_conflict_do_nothing().returning(Job.id)
+        ).scalars().all()
+        db.commit()
+
+        if new_job_ids:
+            logger.info(f"Successfully added {len(new_job_ids)} new jobs ({len(rows) - len(new_job_ids)} already existed).")
+        return new_job_ids
+
+    @classmethod
+    async def _embed_stage(cls, queue: asyncio.Queue):
+        """
+        Embeds newly inserted jobs in batches. Jobs left without a vector are picked up by the backfill task.
+        """
+        done = False
+        while not done:
+            job_ids, done = await cls._next_batch(queue, settings.SCRAPE_PIPELINE_EMBED_BATCH_SIZE)
+            if job_ids and settings.EMBEDDING_ON_SCRAPE:
+                await asyncio.to_thread(cls._embed_new_jobs, job_ids)
+
+    @staticmethod
+    def _embed_new_jobs(job_ids: List):
+        # Runs concurrently with the dedupe stage, so it needs its own session
+        db = SessionLocal()
+        try:
+            # Claimed like the backfill task does, so a concurrent backfill run never embeds the same jobs
+            jobs = db.query(Job).filter(
+                Job.id.in_(job_ids),
+                Job.embedding.is_(None)
+            ).with_for_update(skip_locked=True).all()
+            if not jobs:
+                return
+            logger.info(f"Generating embeddings for {len(jobs)} new jobs...")
+            # All jobs of the batch are embedded in as few requests as possible
+            JobProcessingService.process_job_embeddings(db, jobs)
+            db.commit()
+
+            if settings.MATCHING_BACKEND == "push":
+                # Score the new jobs against all resumes right away
+                try:
+                    PushMatchingService.push_jobs(db, jobs)
+                except Exception as e:
+                    logger.error(f"Failed to push {len(jobs)} new jobs to candidate sets: {e}")
+        except Exception as e:
+            # Jobs are already saved; the backfill task embeds them later
+            logger.error(f"Error processing embeddings for {len(job_ids)} new jobs: {e}")
+            db.rollback()
+        finally:
+            db.close()
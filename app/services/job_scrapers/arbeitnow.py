@@ -1,7 +1,8 @@
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
-from app.services.job_scrapers.base import BaseScraper
+from typing import AsyncIterator, List, Dict, Any, Optional
+import httpx
+from datetime import datetime, timezone
+from app.services.job_scrapers.base import BaseScraper, ScrapeResult
 
 logger = logging.getLogger(__name__)
 
@@ -13,23 +14,31 @@ class ArbeitnowScraper(BaseScraper):
     def get_source_name(self) -> str:
         return 'arbeitnow'
 
-    def fetch_and_normalize(self) -> List[Dict[str, Any]]:
+    async def fetch_and_normalize(self, client: httpx.AsyncClient, since: Optional[datetime] = None) -> AsyncIterator[ScrapeResult]:
         """
         Fetches job data from Arbeitnow API and normalizes it.
         """
-        response_data = self._make_request(self.API_URL)
+        response_data = await self._make_request(client, self.API_URL)
         
         if not response_data or 'data' not in response_data or not isinstance(response_data['data'], list):
             logger.warning("Arbeitnow API did not return valid data.")
-            return []
+            yield ScrapeResult([], complete=False)
+            return
             
         jobs_data = response_data['data']
         normalized_jobs = []
+        reached_cursor = False
 
         for job in jobs_data:
             if not job.get('slug'): # Using slug as a unique identifier
                 continue
 
+            posted_at = datetime.fromtimestamp(int(job.get('created_at')), tz=timezone.utc)
+            # The feed is sorted newest first: everything from here on was seen in an earlier run
+            if self._is_older(posted_at, since):
+                reached_cursor = True
+                break
+
             job_types = job.get('job_types', [])
             job_type_str = ", ".join(job_types) if job_types else None
             
@@ -41,7 +50,7 @@ class ArbeitnowScraper(BaseScraper):
                 "tags": job.get('tags', []),
                 "location": job.get('location'),
                 "url": job.get('url'),
-                "posted_at": datetime.fromtimestamp(int(job.get('created_at'))),
+                "posted_at": posted_at,
                 "source": self.get_source_name(),
 
                 "job_type": job_type_str,
@@ -49,4 +58,7 @@ class ArbeitnowScraper(BaseScraper):
             }
             normalized_jobs.append(normalized_job)
             
-        return normalized_jobs
+        # Only the first page is fetched: if it holds no already-seen posting and there is a
+        # next page, newer postings may be missing beyond it. The first run (no cursor) starts from here.
+        complete = since is None or reached_cursor or not (response_data.get('links') or {}).get('next')
+        yield ScrapeResult(normalized_jobs, complete)
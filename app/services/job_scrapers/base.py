@@ -1,16 +1,73 @@
+import asyncio
+import importlib.util
 import logging
+import random
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, NamedTuple, Optional
 import httpx
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Creates the HTTP client shared by all scrapers during a scraping run:
+    pooled keep-alive connections, gzip (httpx default) and HTTP/2 when the
+    optional h2 package is installed (httpx[http2]).
+    """
+    http2 = settings.SCRAPER_HTTP2 and importlib.util.find_spec("h2") is not None
+    if settings.SCRAPER_HTTP2 and not http2:
+        logger.warning("HTTP/2 requested for scrapers but the 'h2' package is not installed. Using HTTP/1.1.")
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        timeout=settings.SCRAPER_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCRAPER_MAX_CONNECTIONS
+        )
+    )
+
+
+class ScrapeResult(NamedTuple):
+    """
+    Normalized jobs of one fetched page. `complete` is False when postings newer than the
+    cursor may be missing (a failed page, a page cap, an unfetched next page); if any page
+    of a run is incomplete, the source's cursor is not advanced.
+    """
+    jobs: List[Dict[str, Any]]
+    complete: bool = True
+
+
 class BaseScraper(ABC):
     """
     Abstract base class for job scrapers.
     Defines the interface for fetching and normalizing job data from a source.
+
+    Scrapers are async generators sharing one httpx.AsyncClient per run: they yield each
+    page as soon as it is normalized, so the pipeline queues it while later pages are still
+    being fetched and never holds a whole feed in memory. Each source
+    has its own request timeout and a limit on concurrent requests (for sources
+    that fetch several pages), and transient failures are retried with jittered
+    exponential backoff.
+
+    Scraping is incremental: `since` is the newest posted_at already ingested from the
+    source (see ScrapeCursor). Scrapers ask the API for newer items only where it
+    supports a filter, and otherwise stop normalizing at the first older item.
     """
 
+    # Per-source overrides; None falls back to SCRAPER_TIMEOUT_SECONDS / SCRAPER_CONCURRENCY_PER_SOURCE
+    TIMEOUT_SECONDS: Optional[float] = None
+    MAX_CONCURRENCY: Optional[int] = None
+
+    def __init__(self):
+        self._semaphore = None
+
     @abstractmethod
     def get_source_name(self) -> str:
         """
@@ -20,28 +77,72 @@ class BaseScraper(ABC):
         pass
 
     @abstractmethod
-    def fetch_and_normalize(self) -> List[Dict[str, Any]]:
+    def fetch_and_normalize(self, client: httpx.AsyncClient, since: Optional[datetime] = None) -> AsyncIterator[ScrapeResult]:
         """
-        Fetches raw data from the source API and normalizes it into a list
-        of standardized dictionaries.
+        Fetches raw data from the source API and yields it page by page, normalized
+        into standardized dictionaries, newest first. With `since`, only jobs
+        posted at or after it are returned.
         """
         pass
 
-    def _make_request(self, url: str) -> Optional[Any]:
+    @staticmethod
+    def _is_older(posted_at: datetime, since: Optional[datetime]) -> bool:
+        """
+        True for items older than the cursor. Items posted in the same instant are kept
+        (the insert skips the ones already stored).
+        """
+        return since is not None and posted_at < since
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the event loop of the run that first uses them
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.MAX_CONCURRENCY or settings.SCRAPER_CONCURRENCY_PER_SOURCE))
+        return self._semaphore[1]
+
+    @staticmethod
+    def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Full-jitter exponential backoff, or the server's Retry-After if it is longer.
+        """
+        delay = random.uniform(0, settings.SCRAPER_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def _make_request(self, client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
         """
         A helper method to perform a GET request and handle common errors.
+        Retries connection errors, timeouts, 429 and 5xx responses up to SCRAPER_MAX_RETRIES times.
         """
-        try:
-            # Using httpx for modern, async-capable HTTP requests
-            with httpx.Client() as client:
-                response = client.get(url, timeout=30.0, follow_redirects=True)
-                response.raise_for_status()  # Raises HTTPStatusError for 4xx/5xx responses
-                return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Network request failed for {self.get_source_name()}: {e}")
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error for {self.get_source_name()}: {e.response.status_code}")
-        except Exception as e:
-            logger.error(f"An unexpected error occurred when fetching from {self.get_source_name()}: {e}")
-        
-        return None
+        source_name = self.get_source_name()
+        timeout = self.TIMEOUT_SECONDS or settings.SCRAPER_TIMEOUT_SECONDS
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._get_semaphore():
+                    response = await client.get(url, params=params, timeout=timeout)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()  # Raises HTTPStatusError for 4xx responses
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            except httpx.HTTPStatusError as e:
+                logger.error(f"HTTP error for {source_name}: {e.response.status_code}")
+                return None
+            except Exception as e:
+                logger.error(f"An unexpected error occurred when fetching from {source_name}: {e}")
+                return None
+
+            if attempt >= settings.SCRAPER_MAX_RETRIES:
+                logger.error(f"Request to {source_name} failed after {attempt + 1} attempts: {error}")
+                return None
+            delay = self._retry_delay(attempt, response)
+            attempt += 1
+            logger.warning(f"Request to {source_name} failed ({error}). Retrying in {delay:.1f}s (attempt {attempt}/{settings.SCRAPER_MAX_RETRIES}).")
+            await asyncio.sleep(delay)
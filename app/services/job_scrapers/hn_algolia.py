@@ -1,49 +1,88 @@
+import asyncio
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
-from app.services.job_scrapers.base import BaseScraper
+from typing import AsyncIterator, List, Dict, Any, Optional
+import httpx
+from datetime import datetime, timezone
+from app.services.job_scrapers.base import BaseScraper, ScrapeResult
 
 logger = logging.getLogger(__name__)
 
 class HnAlgoliaScraper(BaseScraper):
     """Scraper for Hacker News jobs via Algolia API."""
-    
-    API_URL = "http://hn.algolia.com/api/v1/search_by_date?tags=job"
+
+    API_URL = "https://hn.algolia.com/api/v1/search_by_date"
+
+    HITS_PER_PAGE = 100
+    # Upper bound of pages per run (mainly the first run, which has no cursor yet)
+    MAX_PAGES = 5
 
     def get_source_name(self) -> str:
         return 'hn_algolia'
 
-    def fetch_and_normalize(self) -> List[Dict[str, Any]]:
+    def _build_params(self, page: int, since: Optional[datetime]) -> Dict[str, Any]:
+        params = {"tags": "job", "hitsPerPage": self.HITS_PER_PAGE, "page": page}
+        if since is not None:
+            # Only postings newer than the cursor are returned; postings from the cursor's own second are kept
+            params["numericFilters"] = f"created_at_i>={int(since.timestamp())}"
+        return params
+
+    async def fetch_and_normalize(self, client: httpx.AsyncClient, since: Optional[datetime] = None) -> AsyncIterator[ScrapeResult]:
         """
         Fetches job data from HN Algolia API and normalizes it.
+        The first page tells how many pages match; the rest are fetched concurrently
+        and yielded in order as soon as each one arrives.
         """
-        response_data = self._make_request(self.API_URL)
-        
+        response_data = await self._make_request(client, self.API_URL, self._build_params(0, since))
+
         if not response_data or 'hits' not in response_data or not isinstance(response_data['hits'], list):
             logger.warning("HN Algolia API did not return valid data.")
-            return []
-            
-        jobs_data = response_data['hits']
-        normalized_jobs = []
+            yield ScrapeResult([], complete=False)
+            return
 
-        for job in jobs_data:
+        total_pages = int(response_data.get('nbPages') or 1)
+        page_count = min(total_pages, self.MAX_PAGES)
+        # Postings beyond the page cap are newer than the cursor but are not fetched.
+        # The first run (no cursor) simply starts from the newest MAX_PAGES pages.
+        yield self._normalize_page(response_data, complete=since is None or total_pages <= self.MAX_PAGES)
+
+        pending = [
+            asyncio.ensure_future(self._make_request(client, self.API_URL, self._build_params(page, since)))
+            for page in range(1, page_count)
+        ]
+        try:
+            for request in pending:
+                page_data = await request
+                if not page_data or not isinstance(page_data.get('hits'), list):
+                    logger.warning("An HN Algolia page could not be fetched; the cursor will not advance.")
+                    yield ScrapeResult([], complete=False)
+                    continue
+                yield self._normalize_page(page_data)
+        finally:
+            # The consumer may stop early (e.g. limit_per_source reached)
+            for request in pending:
+                request.cancel()
+
+    def _normalize_page(self, page_data: Dict[str, Any], complete: bool = True) -> ScrapeResult:
+        normalized_jobs = [
+            self._normalize(job)
+            for job in page_data['hits']
             # Ensure the item has a unique ID and a title
-            if not job.get('objectID') or not job.get('title'):
-                continue
-
-            # HN API doesn't provide a company name. We use the author as a substitute.
-            # Description is also often missing, so we can use the title.
-            normalized_job = {
-                "source_id": str(job.get('objectID')),
-                "title": job.get('title'),
-                "company": job.get('author'),
-                "description": job.get('story_text') or job.get('title'),
-                "tags": job.get('_tags', []),
-                "location": None,  # HN jobs are often remote, but location is not specified
-                "url": job.get('url'),
-                "posted_at": datetime.fromtimestamp(int(job.get('created_at_i'))),
-                "source": self.get_source_name()
-            }
-            normalized_jobs.append(normalized_job)
-            
-        return normalized_jobs
\ No newline at end of file
+            if job.get('objectID') and job.get('title')
+        ]
+        return ScrapeResult(normalized_jobs, complete)
+
+    def _normalize(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        # HN API doesn't provide a company name. We use the author as a substitute.
+        # Description is also often missing, so we can use the title.
+        return {
+            "source_id": str(job.get('objectID')),
+            "title": job.get('title'),
+            "company": job.get('author'),
+            "description": job.get('story_text') or job.get('title'),
+            "tags": job.get('_tags', []),
+            "location": None,  # HN jobs are often remote, but location is not specified
+            # Text-only postings have no external URL; link to the HN item instead
+            "url": job.get('url') or f"https://news.ycombinator.com/item?id={job.get('objectID')}",
+            "posted_at": datetime.fromtimestamp(int(job.get('created_at_i')), tz=timezone.utc),
+            "source": self.get_source_name()
+        }
@@ -1,7 +1,8 @@
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
-from app.services.job_scrapers.base import BaseScraper
+from typing import AsyncIterator, List, Dict, Any, Optional
+import httpx
+from datetime import datetime, timezone
+from app.services.job_scrapers.base import BaseScraper, ScrapeResult
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +14,16 @@ class RemoteOkScraper(BaseScraper):
     def get_source_name(self) -> str:
         return 'remoteok'
 
-    def fetch_and_normalize(self) -> List[Dict[str, Any]]:
+    async def fetch_and_normalize(self, client: httpx.AsyncClient, since: Optional[datetime] = None) -> AsyncIterator[ScrapeResult]:
         """
         Fetches job data from RemoteOK API and normalizes it.
         """
-        raw_data = self._make_request(self.API_URL)
+        raw_data = await self._make_request(client, self.API_URL)
         
         if not raw_data or not isinstance(raw_data, list) or len(raw_data) < 2:
             logger.warning("RemoteOK API did not return valid data.")
-            return []
+            yield ScrapeResult([], complete=False)
+            return
             
         # The first item is a legal notice, skip it.
         jobs_data = raw_data[1:]
@@ -30,6 +32,11 @@ class RemoteOkScraper(BaseScraper):
         for job in jobs_data:
             if not job.get('id'):
                 continue
+
+            posted_at = datetime.fromtimestamp(int(job.get('epoch')), tz=timezone.utc)
+            # The feed is sorted newest first: everything from here on was seen in an earlier run
+            if self._is_older(posted_at, since):
+                break
             
             salary_currency = 'USD' if job.get('salary_min') or job.get('salary_max') else None
 
@@ -41,7 +48,7 @@ class RemoteOkScraper(BaseScraper):
                 "tags": job.get('tags', []),
                 "location": job.get('location'),
                 "url": job.get('url'),
-                "posted_at": datetime.fromtimestamp(int(job.get('epoch'))),
+                "posted_at": posted_at,
                 "source": self.get_source_name(),
 
                 "is_remote": True, # All jobs on RemoteOK are remote
@@ -55,4 +62,5 @@ class RemoteOkScraper(BaseScraper):
             }
             normalized_jobs.append(normalized_job)
             
-        return normalized_jobs
+        # The API returns the whole current feed in one response
+        yield ScrapeResult(normalized_jobs)
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.job import Job
+from app.services.job_processing_service import JobProcessingService
+from app.services.matching_engine import normalize_rows, to_datetime64
+
+logger = logging.getLogger(__name__)
+
+
+class JobEmbeddingSnapshot:
+    """
+    一个已发布的岗位向量快照，数组均以只读 mmap 方式打开。
+    岗位按 created_at 升序存储，时间窗口对应矩阵末尾的连续切片 (视图，不拷贝)。
+    """
+
+    def __init__(self, version: str, window_start: datetime, embeddings: np.ndarray, job_ids: np.ndarray, created_at: np.ndarray,
+                 pending_since: Optional[datetime] = None):
+        self.version = version
+        self.window_start = window_start
+        self.embeddings = embeddings
+        self.job_ids = job_ids
+        self.created_at = created_at
+        # 导出时仍在等待向量的最早岗位的创建时间
+        self.pending_since = pending_since
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    def covers(self, start_datetime: datetime) -> bool:
+        return self.window_start <= start_datetime
+
+    def window_offset(self, start_datetime: datetime) -> int:
+        """
+        返回时间窗口在快照中的起始行号
+        """
+        return int(np.searchsorted(self.created_at, to_datetime64(start_datetime), side='left'))
+
+
+class JobSnapshotService:
+    """
+    将当前时间窗口内的岗位向量写成版本化的磁盘快照:
+    embeddings.npy (归一化后的 float32 矩阵)、job_ids.npy、created_at.npy。
+    每个 prefork 的 Celery worker 以只读 mmap 打开同一份文件，共享操作系统的页缓存，
+    不必各自从 Postgres 拉取 1536 维向量。
+    发布时先写临时目录再 rename，最后原子替换 CURRENT 指针文件，worker 读到的总是完整的版本。
+    """
+
+    CURRENT_POINTER = "CURRENT"
+
+    # 当前 worker 进程已打开的快照
+    _loaded: Optional[JobEmbeddingSnapshot] = None
+
+    @staticmethod
+    def _snapshot_root() -> Path:
+        return Path(settings.JOB_SNAPSHOT_DIR)
+
+    @classmethod
+    def publish_snapshot(cls, db: Session) -> Optional[str]:
+        """
+        导出最近 JOB_SNAPSHOT_DAYS 天内已生成向量的岗位并发布为新版本，返回版本号
+        """
+        now_utc = datetime.now(timezone.utc)
+        window_start = now_utc - timedelta(days=settings.JOB_SNAPSHOT_DAYS)
+
+        # 先于向量导出查询，之后才生成向量的岗位由 pending_since 挡在匹配水位线之外
+        pending_since = JobProcessingService.oldest_awaiting_embedding(db, window_start)
+        rows = db.query(Job.id, Job.embedding, Job.created_at).filter(
+            Job.embedding.isnot(None),
+            Job.created_at >= window_start
+        ).order_by(Job.created_at).all()
+
+        if not rows:
+            logger.info("No embedded jobs in the snapshot window. Skipping snapshot publish.")
+            return None
+
+        root = cls._snapshot_root()
+        root.mkdir(parents=True, exist_ok=True)
+
+        version = now_utc.strftime("%Y%m%dT%H%M%S%f")
+        tmp_dir = root / f".{version}.tmp"
+        tmp_dir.mkdir()
+
+        embeddings = normalize_rows(np.vstack([row[1] for row in rows]))
+        job_ids = np.array([str(row[0]) for row in rows], dtype='U36')
+        created_at = np.array([to_datetime64(row[2]) for row in rows], dtype='datetime64[us]')
+
+        np.save(tmp_dir / "embeddings.npy", embeddings)
+        np.save(tmp_dir / "job_ids.npy", job_ids)
+        np.save(tmp_dir / "created_at.npy", created_at)
+        with open(tmp_dir / "meta.json", "w") as f:
+            json.dump({
+                "version": version,
+                "window_start": window_start.isoformat(),
+                "jobs": len(rows),
+                "pending_since": pending_since.isoformat() if pending_since else None,
+            }, f)
+
+        os.rename(tmp_dir, root / version)
+
+        pointer_tmp = root / f".{cls.CURRENT_POINTER}.{version}.tmp"
+        pointer_tmp.write_text(version)
+        os.replace(pointer_tmp, root / cls.CURRENT_POINTER)
+
+        logger.info(f"Published job embedding snapshot {version} with {len(rows)} jobs ({embeddings.nbytes / 1024 / 1024:.1f} MB).")
+        cls._prune_old_versions(root, keep=settings.JOB_SNAPSHOT_KEEP_VERSIONS)
+        return version
+
+    @staticmethod
+    def _prune_old_versions(root: Path, keep: int):
+        """
+        删除旧版本快照。仍在 mmap 旧文件的 worker 不受影响 (文件在解除映射前不会被真正释放)。
+        """
+        versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+        for old in versions[:-keep]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load_current_snapshot(cls) -> Optional[JobEmbeddingSnapshot]:
+        """
+        返回当前发布的快照。CURRENT 指针变化时重新 mmap 新版本，否则复用已打开的快照。
+        """
+        root = cls._snapshot_root()
+        try:
+            version = (root / cls.CURRENT_POINTER).read_text().strip()
+        except FileNotFoundError:
+            return None
+
+        if cls._loaded is not None and cls._loaded.version == version:
+            return cls._loaded
+
+        snapshot_dir = root / version
+        try:
+            with open(snapshot_dir / "meta.json") as f:
+                meta = json.load(f)
+            snapshot = JobEmbeddingSnapshot(
+                version=version,
+                window_start=datetime.fromisoformat(meta["window_start"]),
+                embeddings=np.load(snapshot_dir / "embeddings.npy", mmap_mode='r'),
+                job_ids=np.load(snapshot_dir / "job_ids.npy", mmap_mode='r'),
+                created_at=np.load(snapshot_dir / "created_at.npy", mmap_mode='r'),
+                pending_since=datetime.fromisoformat(meta["pending_since"]) if meta.get("pending_since") else None,
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to open job embedding snapshot {version}: {e}")
+            return cls._loaded
+
+        logger.info(f"Mapped job embedding snapshot {version} ({len(snapshot)} jobs).")
+        cls._loaded = snapshot
+        return snapshot
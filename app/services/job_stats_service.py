@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.job import Job
+from app.models.job_window_stats import JobWindowStats
+
+logger = logging.getLogger(__name__)
+
+class JobStatsService:
+    """
+    Computes job-window statistics (total jobs / jobs with embeddings) once per scrape
+    and stores them in the job_window_stats table for the matcher and operators.
+    """
+
+    @staticmethod
+    def _compute_window_values(db: Session, days: int) -> dict:
+        """
+        Computes the statistics for a window of `days` days with a single query.
+        """
+        now_utc = datetime.now(timezone.utc)
+        window_start = now_utc - timedelta(days=days)
+
+        total_jobs, jobs_with_embedding = db.query(
+            func.count(Job.id),
+            func.count(Job.id).filter(Job.embedding.isnot(None))
+        ).filter(Job.created_at >= window_start).one()
+
+        return {
+            "window_days": days,
+            "window_start": window_start,
+            "total_jobs": total_jobs,
+            "jobs_with_embedding": jobs_with_embedding,
+            "computed_at": now_utc,
+        }
+
+    @classmethod
+    def refresh_window_stats(cls, db: Session, days: int) -> JobWindowStats:
+        """
+        Recomputes the statistics for a window of `days` days and upserts them.
+        The caller is responsible for committing.
+        """
+        values = cls._compute_window_values(db, days)
+        statement = insert(JobWindowStats).values(**values).on_conflict_do_update(
+            index_elements=['window_days'],
+            set_={key: value for key, value in values.items() if key != "window_days"}
+        )
+        db.execute(statement)
+
+        logger.info(f"Refreshed job stats for the last {days} day(s): {values['jobs_with_embedding']}/{values['total_jobs']} jobs have embeddings.")
+        return db.get(JobWindowStats, days, populate_existing=True)
+
+    @classmethod
+    def refresh_all(cls, db: Session):
+        """
+        Refreshes every configured window and commits.
+        """
+        for days in settings.JOB_STATS_WINDOWS:
+            cls.refresh_window_stats(db, days)
+        db.commit()
+
+    @classmethod
+    def get_window_stats(cls, db: Session, days: int) -> JobWindowStats:
+        """
+        Returns the stored statistics for the window, or freshly computed ones (not persisted)
+        if the row is missing, older than JOB_STATS_MAX_AGE_MINUTES or the window is not in
+        JOB_STATS_WINDOWS. Read-only, so it is safe inside long matching transactions:
+        rows are only written by refresh_all after a scrape or backfill.
+        """
+        stats = db.get(JobWindowStats, days) if days in settings.JOB_STATS_WINDOWS else None
+        max_age = timedelta(minutes=settings.JOB_STATS_MAX_AGE_MINUTES)
+        if stats is None or stats.computed_at < datetime.now(timezone.utc) - max_age:
+            stats = JobWindowStats(**cls._compute_window_values(db, days))
+        return stats
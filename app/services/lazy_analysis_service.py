@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import uuid
+from typing import AsyncIterator
+import openai
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import create_async_redis_client
+from app.models.job_match import JobMatch
+from app.services.openai_service import create_async_openai_client
+from app.services.openai_rate_limiter import OpenAIRateLimiter
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.job_digest_service import JobDigestService
+from app.services.job_matching_service import JobMatchingService
+
+logger = logging.getLogger(__name__)
+
+
+class MatchAnalysisGenerationError(Exception):
+    """
+    按需生成匹配分析失败 (OpenAI 调用失败或等待其他请求的生成超时)
+    """
+
+
+class LazyMatchAnalysisService:
+    """
+    lazy 模式：匹配写入时不生成分析，用户第一次查看某条匹配时再生成，并以流的方式返回。
+
+    同一条匹配的并发请求只触发一次生成：
+    - 拿到 Redis 锁 match_analysis:lock:{match_id} 的请求负责调用 OpenAI (stream=True)，
+      每收到一段文本就追加到 Redis Stream match_analysis:stream:{match_id}，
+      生成结束后写回 job_matches.analysis 与匹配分析缓存，再追加一条 done 记录；
+    - 其他请求从头读取这个 Stream，拿到与生成者完全相同的文本片段，直到 done/error。
+    Stream 在生成结束后保留一段时间，晚到的请求也能直接回放。
+
+    持锁者的每条退出路径都会向 Stream 写入 done 或 error，跟随者不会空等到超时。
+    锁在生成期间定期续期 (等待限流额度可能长达 OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS)，
+    只有持锁者本人 (按 token 校验) 才能续期或释放锁。
+    """
+
+    LOCK_KEY = "match_analysis:lock:{match_id}"
+    STREAM_KEY = "match_analysis:stream:{match_id}"
+
+    # 生成结束后 Stream 的保留时间 (秒)
+    STREAM_RETENTION_SECONDS = 300
+
+    # 锁的 TTL (秒)；持锁期间每 TTL/3 续期一次，持锁进程崩溃时锁最多保留这么久
+    LOCK_TTL_SECONDS = 30
+
+    # 拿锁 (SET NX) 的同时清掉上一次生成留下的 Stream：两步之间到达的跟随者
+    # 否则会读到上一次的 done/error 记录
+    ACQUIRE_LOCK_SCRIPT = """
+    if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+        redis.call('del', KEYS[2])
+        return 1
+    end
+    return 0
+    """
+    # 仅当锁仍属于自己时续期/释放
+    RENEW_LOCK_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('expire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    @classmethod
+    async def stream_analysis(cls, match: JobMatch) -> AsyncIterator[str]:
+        """
+        逐段返回匹配分析文本。已有分析时一次性返回；否则生成或等待其他请求的生成。
+        失败时抛出 MatchAnalysisGenerationError。
+        """
+        if match.analysis:
+            yield match.analysis
+            return
+
+        request = JobMatchingService.build_analysis_request(
+            match.resume.parsed_content, JobDigestService.prompt_text(match.job)
+        )
+        cache_key = MatchAnalysisCache.cache_key(request)
+        # 缓存 (同步 Redis) 与数据库访问都放到线程池执行，不阻塞事件循环
+        cached = (await asyncio.to_thread(MatchAnalysisCache.get_many, [cache_key]))[0]
+        if cached is not None:
+            await asyncio.to_thread(cls._save_analysis, match.id, cached)
+            yield cached
+            return
+
+        lock_key = cls.LOCK_KEY.format(match_id=match.id)
+        stream_key = cls.STREAM_KEY.format(match_id=match.id)
+        lock_token = uuid.uuid4().hex
+
+        async with create_async_redis_client() as redis_client:
+            if await redis_client.eval(cls.ACQUIRE_LOCK_SCRIPT, 2, lock_key, stream_key, lock_token, cls.LOCK_TTL_SECONDS):
+                renewal = asyncio.create_task(cls._renew_lock(redis_client, lock_key, lock_token))
+                try:
+                    async for chunk in cls._generate(redis_client, match.id, request, cache_key, stream_key):
+                        yield chunk
+                finally:
+                    renewal.cancel()
+                    await redis_client.eval(cls.RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+            else:
+                logger.info(f"匹配 {match.id} 的分析正在由其他请求生成，等待其结果。")
+                async for chunk in cls._follow(redis_client, stream_key):
+                    yield chunk
+
+    @classmethod
+    async def _generate(cls, redis_client, match_id, request: dict, cache_key: str, stream_key: str) -> AsyncIterator[str]:
+        parts = []
+        completed = False
+        try:
+            # 拿到锁之前，上一个生成者可能刚刚完成并释放了锁
+            analysis = await asyncio.to_thread(cls._load_analysis, match_id)
+            if analysis:
+                await redis_client.xadd(stream_key, {"type": "delta", "text": analysis})
+                await redis_client.xadd(stream_key, {"type": "done", "text": ""})
+                completed = True
+                yield analysis
+                return
+
+            async with create_async_openai_client() as client:
+                stream = await OpenAIRateLimiter.acall(
+                    request["model"], request,
+                    lambda: client.chat.completions.create(
+                        **request, stream=True, timeout=settings.MATCH_ANALYSIS_TIMEOUT_SECONDS
+                    )
+                )
+                async for event in stream:
+                    if not event.choices or not event.choices[0].delta.content:
+                        continue
+                    text = event.choices[0].delta.content
+                    parts.append(text)
+                    await redis_client.xadd(stream_key, {"type": "delta", "text": text})
+                    yield text
+
+            analysis = "".join(parts).strip()
+            await asyncio.to_thread(cls._save_analysis, match_id, analysis)
+            await asyncio.to_thread(MatchAnalysisCache.set_many, {cache_key: analysis})
+            await redis_client.xadd(stream_key, {"type": "done", "text": ""})
+            completed = True
+            logger.info(f"已为匹配 {match_id} 按需生成AI分析。")
+        except openai.APIError as e:
+            logger.error(f"为匹配 {match_id} 流式生成AI分析失败: {e}")
+            raise MatchAnalysisGenerationError("生成AI分析失败") from e
+        finally:
+            if not completed:
+                # 生成失败或客户端中途断开，通知正在等待的请求
+                await redis_client.xadd(stream_key, {"type": "error", "text": ""})
+            await redis_client.expire(stream_key, cls.STREAM_RETENTION_SECONDS)
+
+    @classmethod
+    async def _renew_lock(cls, redis_client, lock_key: str, lock_token: str):
+        while True:
+            await asyncio.sleep(cls.LOCK_TTL_SECONDS / 3)
+            if not await redis_client.eval(cls.RENEW_LOCK_SCRIPT, 1, lock_key, lock_token, cls.LOCK_TTL_SECONDS):
+                logger.warning(f"匹配分析锁 {lock_key} 已丢失，无法续期。")
+                return
+
+    @classmethod
+    async def _follow(cls, redis_client, stream_key: str) -> AsyncIterator[str]:
+        last_id = "0"
+        # 生成者可能先要等待限流额度，再等待 OpenAI 的首个片段
+        block_ms = int((settings.OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS + settings.MATCH_ANALYSIS_TIMEOUT_SECONDS) * 1000)
+        while True:
+            response = await redis_client.xread({stream_key: last_id}, block=block_ms)
+            if not response:
+                raise MatchAnalysisGenerationError("等待AI分析生成超时")
+
+            for entry_id, fields in response[0][1]:
+                last_id = entry_id
+                if fields["type"] == "done":
+                    return
+                if fields["type"] == "error":
+                    raise MatchAnalysisGenerationError("生成AI分析失败")
+                yield fields["text"]
+
+    @staticmethod
+    def _load_analysis(match_id):
+        db = SessionLocal()
+        try:
+            return db.query(JobMatch.analysis).filter(JobMatch.id == match_id).scalar()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_analysis(match_id, analysis: str):
+        """
+        用独立的 session 写回分析：流式响应期间请求的 session 可能已经关闭
+        """
+        db = SessionLocal()
+        try:
+            db.query(JobMatch).filter(
+                JobMatch.id == match_id,
+                JobMatch.analysis.is_(None)
+            ).update({JobMatch.analysis: analysis}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
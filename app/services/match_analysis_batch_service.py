@@ -0,0 +1,264 @@
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
+from app.models.job_match import JobMatch
+from app.services.openai_service import get_openai_client
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.job_matching_service import JobMatchingService
+from app.services.job_digest_service import JobDigestService
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Batch 仍在处理中的状态，其余状态 (completed / failed / expired / cancelled) 均为终态
+IN_PROGRESS_STATUSES = {"validating", "in_progress", "finalizing", "cancelling"}
+
+
+class OpenAIBatchAPI:
+    """
+    OpenAI Batch API 的薄封装：上传 JSONL 输入文件、创建 batch、查询状态、下载输出文件
+    """
+
+    def __init__(self):
+        self.client = get_openai_client()
+
+    def upload_file(self, path: Path) -> str:
+        with open(path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create_batch(self, input_file_id: str, metadata: dict) -> SimpleNamespace:
+        return self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata=metadata,
+        )
+
+    def retrieve_batch(self, batch_id: str) -> SimpleNamespace:
+        return self.client.batches.retrieve(batch_id)
+
+    def read_file(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchAPI:
+    """
+    基于本地文件的 Batch API 替身，接口与 OpenAIBatchAPI 一致，用于离线运行和测试。
+    文件与 batch 状态保存在 MATCH_ANALYSIS_BATCH_DIR/local 下；
+    第一次查询状态时同步"处理"整个 batch，按 OpenAI 的输出格式为每行请求写出一条确定性的占位分析。
+    占位分析只写回 job_matches，不写入匹配分析缓存。
+    """
+
+    def __init__(self):
+        self.root = Path(settings.MATCH_ANALYSIS_BATCH_DIR) / "local"
+        (self.root / "files").mkdir(parents=True, exist_ok=True)
+        (self.root / "batches").mkdir(parents=True, exist_ok=True)
+
+    def _file_path(self, file_id: str) -> Path:
+        return self.root / "files" / f"{file_id}.jsonl"
+
+    def _batch_path(self, batch_id: str) -> Path:
+        return self.root / "batches" / f"{batch_id}.json"
+
+    def _save_batch(self, batch: dict):
+        self._batch_path(batch["id"]).write_text(json.dumps(batch))
+
+    def upload_file(self, path: Path) -> str:
+        file_id = f"file-local-{uuid.uuid4().hex}"
+        self._file_path(file_id).write_bytes(Path(path).read_bytes())
+        return file_id
+
+    def create_batch(self, input_file_id: str, metadata: dict) -> SimpleNamespace:
+        batch = {
+            "id": f"batch-local-{uuid.uuid4().hex}",
+            "status": "validating",
+            "input_file_id": input_file_id,
+            "output_file_id": None,
+            "error_file_id": None,
+            "metadata": metadata,
+        }
+        self._save_batch(batch)
+        return SimpleNamespace(**batch)
+
+    def retrieve_batch(self, batch_id: str) -> SimpleNamespace:
+        batch = json.loads(self._batch_path(batch_id).read_text())
+        if batch["status"] in IN_PROGRESS_STATUSES:
+            batch["output_file_id"] = self._process(batch["input_file_id"])
+            batch["status"] = "completed"
+            self._save_batch(batch)
+        return SimpleNamespace(**batch)
+
+    def read_file(self, file_id: str) -> str:
+        return self._file_path(file_id).read_text()
+
+    def _process(self, input_file_id: str) -> str:
+        output_file_id = f"file-local-{uuid.uuid4().hex}"
+        with open(self._file_path(input_file_id)) as source, open(self._file_path(output_file_id), "w") as output:
+            for line in source:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                content = f"[local batch] {request['body']['model']} analysis for {request['custom_id']}"
+                output.write(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+                    },
+                    "error": None,
+                }) + "\n")
+        return output_file_id
+
+
+class MatchAnalysisBatchService:
+    """
+    batch 模式下的离线匹配分析：
+    1. submit_pending_analyses: 把所有尚无分析、也未提交过的匹配写成 JSONL，通过 Batch API 提交；
+    2. collect_batch_results: 轮询 batch 状态，完成后把结果批量写回 job_matches.analysis。
+    提交时先查匹配分析缓存，命中的直接写回，不进入 batch。
+    失败的请求记入 analysis_attempts，达到 MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS 次后不再提交。
+    """
+
+    @staticmethod
+    def _get_batch_api():
+        if settings.MATCH_ANALYSIS_BATCH_BACKEND == "local":
+            return LocalBatchAPI()
+        return OpenAIBatchAPI()
+
+    @classmethod
+    def submit_pending_analyses(cls, db: Session) -> Optional[str]:
+        """
+        提交待生成分析的匹配，返回 batch ID (没有待处理的匹配时返回 None)
+        """
+        matches = db.query(JobMatch).options(
+            joinedload(JobMatch.job), joinedload(JobMatch.resume)
+        ).filter(
+            JobMatch.analysis.is_(None),
+            JobMatch.analysis_batch_id.is_(None),
+            JobMatch.analysis_attempts < settings.MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS
+        ).order_by(JobMatch.created_at).limit(settings.MATCH_ANALYSIS_BATCH_MAX_REQUESTS).all()
+
+        if not matches:
+            logger.info("No match analyses pending. Skipping batch submission.")
+            return None
+
+        requests = [
+            JobMatchingService.build_analysis_request(match.resume.parsed_content, JobDigestService.prompt_text(match.job))
+            for match in matches
+        ]
+        cached = MatchAnalysisCache.get_many([MatchAnalysisCache.cache_key(request) for request in requests])
+
+        cached_rows = []
+        pending = []
+        for match, request, analysis in zip(matches, requests, cached):
+            if analysis is not None:
+                cached_rows.append({"id": match.id, "analysis": analysis})
+            else:
+                pending.append((match, request))
+
+        if cached_rows:
+            db.execute(update(JobMatch), cached_rows)
+            logger.info(f"Filled {len(cached_rows)} match analyses from the cache.")
+
+        if not pending:
+            db.commit()
+            return None
+
+        batch_dir = Path(settings.MATCH_ANALYSIS_BATCH_DIR)
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        input_path = batch_dir / f"match_analysis_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.jsonl"
+        with open(input_path, "w") as f:
+            for match, request in pending:
+                f.write(json.dumps({
+                    "custom_id": str(match.id),
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": request,
+                }, ensure_ascii=False) + "\n")
+
+        api = cls._get_batch_api()
+        input_file_id = api.upload_file(input_path)
+        batch = api.create_batch(input_file_id, metadata={"purpose": "match_analysis"})
+
+        db.execute(update(JobMatch), [{"id": match.id, "analysis_batch_id": batch.id} for match, _ in pending])
+        db.commit()
+
+        logger.info(f"Submitted match analysis batch {batch.id} with {len(pending)} requests ({input_path}).")
+        return batch.id
+
+    @classmethod
+    def collect_batch_results(cls, db: Session, batch_id: str) -> Optional[int]:
+        """
+        查询 batch 状态。仍在处理中时返回 None；
+        进入终态后写回成功的分析，并释放失败的匹配以便下次重新提交 (记一次失败)，返回写回的分析数量。
+        """
+        api = cls._get_batch_api()
+        batch = api.retrieve_batch(batch_id)
+        if batch.status in IN_PROGRESS_STATUSES:
+            logger.info(f"Match analysis batch {batch_id} is still {batch.status}.")
+            return None
+
+        results = cls._parse_output(api.read_file(batch.output_file_id)) if batch.output_file_id else {}
+        if batch.status != "completed":
+            logger.error(f"Match analysis batch {batch_id} ended with status {batch.status}.")
+
+        matches = db.query(JobMatch).options(
+            joinedload(JobMatch.job), joinedload(JobMatch.resume)
+        ).filter(JobMatch.analysis_batch_id == batch_id).all()
+
+        rows = []
+        cache_entries = {}
+        exhausted = 0
+        for match in matches:
+            analysis = results.get(str(match.id))
+            if analysis is None:
+                # 失败的请求清空 batch ID，下次提交时重新生成，直到达到重试上限
+                attempts = (match.analysis_attempts or 0) + 1
+                exhausted += attempts >= settings.MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS
+                rows.append({"id": match.id, "analysis_batch_id": None, "analysis_attempts": attempts})
+                continue
+            rows.append({"id": match.id, "analysis": analysis, "analysis_batch_id": None})
+            request = JobMatchingService.build_analysis_request(match.resume.parsed_content, JobDigestService.prompt_text(match.job))
+            cache_entries[MatchAnalysisCache.cache_key(request)] = analysis
+
+        if rows:
+            db.execute(update(JobMatch), rows)
+        db.commit()
+        # 本地替身写出的是占位分析，不能进入与其他模式共享的匹配分析缓存
+        if settings.MATCH_ANALYSIS_BATCH_BACKEND != "local":
+            MatchAnalysisCache.set_many(cache_entries)
+
+        failed = len(rows) - len(cache_entries)
+        logger.info(f"Collected match analysis batch {batch_id}: wrote {len(cache_entries)} analyses, {failed} failed.")
+        if exhausted:
+            logger.error(f"{exhausted} matches reached {settings.MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS} failed batch attempts "
+                         f"and will not be resubmitted. Reset analysis_attempts to retry them.")
+        return len(cache_entries)
+
+    @staticmethod
+    def _parse_output(content: str) -> Dict[str, str]:
+        """
+        解析 Batch API 输出文件，返回 {custom_id: analysis}，只保留成功的请求
+        """
+        results = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.warning(f"Batch request {item.get('custom_id')} failed: {item.get('error') or response.get('status_code')}")
+                continue
+            content_text = response["body"]["choices"][0]["message"]["content"]
+            if content_text:
+                results[item["custom_id"]] = content_text.strip()
+        return results
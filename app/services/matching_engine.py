@@ -0,0 +1,165 @@
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Tuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models.job import Job
+from app.services.job_processing_service import JobProcessingService
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    按行做 L2 归一化，使点积等于 cosine 相似度。零向量保持为零。
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def to_datetime64(value: datetime) -> np.datetime64:
+    """
+    将带时区的 datetime 转成 UTC 的 datetime64[us]，与快照中 created_at 的存储格式一致
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, 'us')
+
+
+class JobEmbeddingMatrix:
+    """
+    时间窗口内岗位向量的内存矩阵 (连续的 float32, 已按行归一化)。
+    一次矩阵乘法即可算出一批简历与所有岗位的 cosine 相似度，
+    替代逐个用户向数据库发起的向量查询。
+    """
+
+    # 每次参与矩阵乘法的简历数量，限制相似度矩阵的峰值内存
+    QUERY_BLOCK_SIZE = 256
+
+    # 进程内缓存：{days: (loaded_at, matrix)}
+    _cache = {}
+
+    def __init__(self, job_ids: Sequence, matrix: np.ndarray, created_at: Optional[np.ndarray] = None,
+                 pending_since: Optional[datetime] = None):
+        self.job_ids = job_ids
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        # 各行岗位的创建时间 (UTC, datetime64[us])，按升序排列
+        self.created_at = created_at
+        # 加载时仍在等待向量的最早岗位的创建时间：此后才生成向量的岗位不在矩阵中
+        self.pending_since = pending_since
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    def job_id(self, index: int) -> UUID:
+        """
+        返回矩阵第 index 行对应的岗位 ID (快照中以字符串存储)
+        """
+        job_id = self.job_ids[index]
+        return job_id if isinstance(job_id, UUID) else UUID(str(job_id))
+
+    def offset_for(self, since: datetime) -> int:
+        """
+        返回第一个创建时间不早于 since 的行号
+        """
+        if self.created_at is None:
+            return 0
+        return int(np.searchsorted(self.created_at, to_datetime64(since), side='left'))
+
+    def latest_created_at(self) -> Optional[datetime]:
+        """
+        矩阵中最新岗位的创建时间
+        """
+        if self.created_at is None or len(self.created_at) == 0:
+            return None
+        return self.created_at[-1].astype('datetime64[us]').astype(datetime).replace(tzinfo=timezone.utc)
+
+    @classmethod
+    def load_from_db(cls, db: Session, start_datetime: datetime) -> 'JobEmbeddingMatrix':
+        """
+        从数据库加载时间窗口内所有已生成向量的岗位。
+        先记录仍在等待向量的最早岗位，再加载向量，两次查询之间生成的向量只会让矩阵多覆盖，不会漏记。
+        """
+        pending_since = JobProcessingService.oldest_awaiting_embedding(db, start_datetime)
+        rows = db.query(Job.id, Job.embedding, Job.created_at).filter(
+            Job.embedding.isnot(None),
+            Job.created_at >= start_datetime
+        ).order_by(Job.created_at).all()
+
+        if not rows:
+            return cls([], np.empty((0, 0), dtype=np.float32), pending_since=pending_since)
+
+        job_ids = [row[0] for row in rows]
+        matrix = normalize_rows(np.vstack([row[1] for row in rows]))
+        created_at = np.array([to_datetime64(row[2]) for row in rows], dtype='datetime64[us]')
+        logger.info(f"Loaded {len(job_ids)} job embeddings into matching matrix ({matrix.nbytes / 1024 / 1024:.1f} MB).")
+        return cls(job_ids, matrix, created_at, pending_since)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, start_datetime: datetime) -> 'JobEmbeddingMatrix':
+        """
+        基于 mmap 的岗位快照构建矩阵。快照按 created_at 升序存储，
+        时间窗口是末尾的连续切片，矩阵直接引用共享页，不产生拷贝。
+        """
+        offset = snapshot.window_offset(start_datetime)
+        return cls(snapshot.job_ids[offset:], snapshot.embeddings[offset:], snapshot.created_at[offset:],
+                   snapshot.pending_since)
+
+    @classmethod
+    def get_cached(cls, db: Session, start_datetime: datetime, days: int, max_age_seconds: int) -> 'JobEmbeddingMatrix':
+        """
+        返回进程内缓存的岗位矩阵，超过 max_age_seconds 后重新加载。
+        用于逐用户的匹配任务，避免每个任务都重新加载同一个时间窗口。
+        """
+        cached = cls._cache.get(days)
+        if cached and time.monotonic() - cached[0] < max_age_seconds:
+            return cached[1]
+
+        job_matrix = cls.load_from_db(db, start_datetime)
+        cls._cache[days] = (time.monotonic(), job_matrix)
+        return job_matrix
+
+    def top_k(self, query_embeddings, k: int, since: Optional[Sequence[datetime]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        为每个查询向量返回最相似的 k 个岗位。
+        since 可为每个查询指定岗位创建时间下限 (增量匹配)，更早的岗位不参与排序。
+
+        返回 (indices, distances)，形状均为 (n_queries, k)，按距离升序排列；
+        distance = 1 - cosine 相似度，与 pgvector 的 cosine_distance 一致。
+        可用岗位不足 k 个时，多出的位置 distance 为 inf。
+        """
+        queries = normalize_rows(np.vstack(query_embeddings))
+        offsets = [self.offset_for(value) for value in since] if since is not None else None
+        n_queries = queries.shape[0]
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.empty((n_queries, 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        indices = np.empty((n_queries, k), dtype=np.int64)
+        similarities = np.empty((n_queries, k), dtype=np.float32)
+
+        for start in range(0, n_queries, self.QUERY_BLOCK_SIZE):
+            block = queries[start:start + self.QUERY_BLOCK_SIZE]
+            scores = block @ self.matrix.T
+            if offsets is not None:
+                # 矩阵按创建时间升序，屏蔽每个查询下限之前的所有行
+                for row, offset in enumerate(offsets[start:start + block.shape[0]]):
+                    scores[row, :offset] = -np.inf
+
+            # argpartition 只做 O(n) 的部分排序，再对选出的 k 个结果排序
+            if k < scores.shape[1]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(scores.shape[1]), (block.shape[0], 1))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+
+            indices[start:start + block.shape[0]] = np.take_along_axis(top, order, axis=1)
+            similarities[start:start + block.shape[0]] = np.take_along_axis(top_scores, order, axis=1)
+
+        return indices, 1.0 - similarities
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, TypeVar
+import openai
+import redis
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Two token buckets (requests and tokens per minute) refilled continuously, checked and debited atomically.
+# KEYS[1]: bucket state hash, KEYS[2]: pause key (set while backing off or while the circuit is open)
+# ARGV[1]: requests per minute, ARGV[2]: tokens per minute, ARGV[3]: estimated tokens of this request
+# Returns {1, "0"} when the request may proceed, otherwise {0, seconds to wait}.
+_ACQUIRE_SCRIPT = """
+local pause_ms = redis.call('PTTL', KEYS[2])
+if pause_ms > 0 then
+    return {0, tostring(pause_ms / 1000)}
+end
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), tpm)
+
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60 / rpm)
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+
+redis.call('HSET', KEYS[1], 'requests', tostring(requests), 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 120)
+if wait == 0 then
+    return {1, '0'}
+end
+return {0, tostring(wait)}
+"""
+
+
+class RateLimitWaitTimeout(Exception):
+    """
+    Raised when a call could not obtain rate-limit capacity within OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS.
+    """
+
+
+class OpenAIRateLimiter:
+    """
+    A rate limiter for OpenAI calls shared by every API and Celery process through Redis.
+
+    - Token buckets: one bucket per model tracks requests and tokens per minute
+      (OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT). Callers wait until both buckets have capacity.
+    - Adaptive backoff: a 429 pauses the whole model bucket for an exponentially growing
+      interval (or the server's Retry-After, if longer) and drains the bucket, so all
+      workers slow down together instead of each retrying on its own.
+    - Circuit breaker: after OPENAI_CIRCUIT_BREAKER_THRESHOLD consecutive failures
+      (429, 5xx, connection errors) the bucket is paused for OPENAI_CIRCUIT_BREAKER_RESET_SECONDS.
+      Afterwards calls are let through again at the bucket rate; one success closes
+      the circuit, another failure reopens it immediately.
+
+    Transient failures are retried up to OPENAI_RATE_LIMIT_MAX_RETRIES times, so tasks wait
+    instead of failing. If Redis is unavailable, calls are not limited.
+    """
+
+    BUCKET_KEY = "openai_rate:{bucket}"
+    PAUSE_KEY = "openai_rate:{bucket}:pause"
+    STRIKES_KEY = "openai_rate:{bucket}:strikes"
+    FAILURES_KEY = "openai_rate:{bucket}:failures"
+
+    # Exponential backoff after a 429: BACKOFF_BASE_SECONDS * 2^(strikes - 1), capped
+    BACKOFF_BASE_SECONDS = 1.0
+    BACKOFF_MAX_SECONDS = 60.0
+
+    # Characters per token used to estimate the token cost of a request
+    CHARS_PER_TOKEN = 4
+
+    _acquire_script = None
+
+    @classmethod
+    def estimate_tokens(cls, request: dict) -> int:
+        """
+        Rough token estimate for a chat.completions or embeddings request:
+        prompt characters / CHARS_PER_TOKEN plus the completion budget.
+        """
+        if "messages" in request:
+            prompt_chars = sum(len(message.get("content") or "") for message in request["messages"])
+            completion_tokens = request.get("max_tokens") or 512
+        else:
+            inputs = request.get("input") or []
+            prompt_chars = sum(len(item) for item in ([inputs] if isinstance(inputs, str) else inputs))
+            completion_tokens = 0
+        return prompt_chars // cls.CHARS_PER_TOKEN + completion_tokens + 1
+
+    @classmethod
+    def _try_acquire(cls, bucket: str, tokens: int) -> float:
+        """
+        Attempts to take capacity for one request. Returns 0 on success, otherwise the seconds to wait.
+        """
+        try:
+            if cls._acquire_script is None:
+                cls._acquire_script = get_redis_client().register_script(_ACQUIRE_SCRIPT)
+            allowed, wait = cls._acquire_script(
+                keys=[cls.BUCKET_KEY.format(bucket=bucket), cls.PAUSE_KEY.format(bucket=bucket)],
+                args=[settings.OPENAI_RPM_LIMIT, settings.OPENAI_TPM_LIMIT, tokens]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Rate limiter unavailable, proceeding without limiting: {e}")
+            return 0.0
+        return 0.0 if int(allowed) else float(wait)
+
+    @classmethod
+    def _record_success(cls, bucket: str):
+        try:
+            get_redis_client().delete(cls.STRIKES_KEY.format(bucket=bucket), cls.FAILURES_KEY.format(bucket=bucket))
+        except redis.RedisError:
+            pass
+
+    @classmethod
+    def _record_failure(cls, bucket: str, error: Exception):
+        """
+        Records a transient failure: backs off on 429 and opens the circuit after repeated failures.
+        """
+        try:
+            redis_client = get_redis_client()
+            pause_key = cls.PAUSE_KEY.format(bucket=bucket)
+            pause_seconds = 0.0
+
+            if isinstance(error, openai.RateLimitError):
+                strikes_key = cls.STRIKES_KEY.format(bucket=bucket)
+                strikes = redis_client.incr(strikes_key)
+                redis_client.expire(strikes_key, 300)
+                pause_seconds = min(cls.BACKOFF_MAX_SECONDS, cls.BACKOFF_BASE_SECONDS * 2 ** (strikes - 1))
+                pause_seconds = max(pause_seconds, cls._retry_after(error))
+                # Nobody may burst right after the pause
+                seconds, microseconds = redis_client.time()
+                redis_client.hset(cls.BUCKET_KEY.format(bucket=bucket), mapping={
+                    "requests": 0, "tokens": 0, "ts": seconds + microseconds / 1000000
+                })
+                logger.warning(f"OpenAI rate limit hit for {bucket} (strike {strikes}). Pausing for {pause_seconds:.1f}s.")
+
+            failures_key = cls.FAILURES_KEY.format(bucket=bucket)
+            failures = redis_client.incr(failures_key)
+            redis_client.expire(failures_key, settings.OPENAI_CIRCUIT_BREAKER_RESET_SECONDS * 4)
+            if failures >= settings.OPENAI_CIRCUIT_BREAKER_THRESHOLD:
+                pause_seconds = max(pause_seconds, settings.OPENAI_CIRCUIT_BREAKER_RESET_SECONDS)
+                logger.error(f"OpenAI circuit opened for {bucket} after {failures} consecutive failures. "
+                             f"Pausing for {pause_seconds:.1f}s.")
+
+            if pause_seconds > 0:
+                pause_ms = int(pause_seconds * 1000)
+                # Never shorten a longer pause set by another worker
+                if (redis_client.pttl(pause_key) or 0) < pause_ms:
+                    redis_client.set(pause_key, "1", px=pause_ms)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record OpenAI failure in the rate limiter: {e}")
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        response = getattr(error, "response", None)
+        try:
+            return float(response.headers.get("retry-after", 0)) if response is not None else 0.0
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, openai.RateLimitError):
+            # Exhausted quota will not recover by waiting
+            return getattr(error, "code", None) != "insufficient_quota"
+        return isinstance(error, (openai.APIConnectionError, openai.InternalServerError))
+
+    @classmethod
+    def _retry_delay(cls, error: Exception, attempt: int) -> float:
+        """
+        Local delay before retrying. 429s are already paced by the shared pause, other
+        transient errors (5xx, connection) back off exponentially per caller.
+        """
+        if isinstance(error, openai.RateLimitError):
+            return 0.0
+        return min(cls.BACKOFF_MAX_SECONDS, cls.BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+
+    @classmethod
+    def _deadline(cls) -> float:
+        return time.monotonic() + settings.OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS
+
+    @staticmethod
+    def _check_deadline(deadline: float, wait: float, bucket: str):
+        if time.monotonic() + wait > deadline:
+            raise RateLimitWaitTimeout(f"Timed out waiting for OpenAI rate limit capacity for {bucket}.")
+
+    @classmethod
+    def call(cls, model: str, request: dict, func: Callable[[], T]) -> T:
+        """
+        Runs a synchronous OpenAI call under the shared limit, retrying transient failures.
+        """
+        if not settings.OPENAI_RATE_LIMIT_ENABLED:
+            return func()
+
+        tokens = cls.estimate_tokens(request)
+        deadline = cls._deadline()
+        attempt = 0
+        while True:
+            wait = cls._try_acquire(model, tokens)
+            if wait > 0:
+                cls._check_deadline(deadline, wait, model)
+                time.sleep(wait)
+                continue
+            try:
+                result = func()
+            except openai.APIError as e:
+                attempt += 1
+                if not cls._is_transient(e) or attempt > settings.OPENAI_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                cls._record_failure(model, e)
+                time.sleep(cls._retry_delay(e, attempt))
+                continue
+            cls._record_success(model)
+            return result
+
+    @classmethod
+    async def acall(cls, model: str, request: dict, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async variant of call(). Redis round-trips run in a thread so the event loop is never blocked.
+        """
+        if not settings.OPENAI_RATE_LIMIT_ENABLED:
+            return await func()
+
+        tokens = cls.estimate_tokens(request)
+        deadline = cls._deadline()
+        attempt = 0
+        while True:
+            wait = await asyncio.to_thread(cls._try_acquire, model, tokens)
+            if wait > 0:
+                cls._check_deadline(deadline, wait, model)
+                await asyncio.sleep(wait)
+                continue
+            try:
+                result = await func()
+            except openai.APIError as e:
+                attempt += 1
+                if not cls._is_transient(e) or attempt > settings.OPENAI_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                await asyncio.to_thread(cls._record_failure, model, e)
+                await asyncio.sleep(cls._retry_delay(e, attempt))
+                continue
+            await asyncio.to_thread(cls._record_success, model)
+            return result
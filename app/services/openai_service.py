@@ -1,16 +1,25 @@
+import asyncio
 import openai
 import logging
+from typing import List, Optional
 from functools import lru_cache
 from app.core.config import settings
+from app.services.openai_rate_limiter import OpenAIRateLimiter
 
 logger = logging.getLogger(__name__)
 
+def _sdk_max_retries() -> int:
+    return 0 if settings.OPENAI_RATE_LIMIT_ENABLED else openai.DEFAULT_MAX_RETRIES
+
+
 @lru_cache(maxsize=1)
 def get_openai_client() -> openai.OpenAI:
     """
     Initializes and returns the OpenAI client.
     It uses the OPENAI_API_KEY from the unified config.
     The client is cached to avoid re-initialization on every call.
+    SDK-level retries are disabled while the shared rate limiter is on,
+    so 429s are retried by OpenAIRateLimiter instead of by each process independently.
     """
     api_key = settings.OPENAI_API_KEY
     if not api_key:
@@ -18,11 +27,66 @@ def get_openai_client() -> openai.OpenAI:
         raise ValueError("OPENAI_API_KEY not set in configuration.")
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        # Test the client by making a simple call
-        client.models.list()
+        client = openai.OpenAI(api_key=api_key, base_url=settings.OPENAI_BASE_URL, max_retries=_sdk_max_retries())
+        if settings.OPENAI_VERIFY_ON_INIT:
+            # Test the client by making a simple call
+            client.models.list()
         logger.info("OpenAI client initialized successfully.")
         return client
     except Exception as e:
         logger.error(f"Failed to initialize OpenAI client: {e}")
         raise
+
+
+def create_async_openai_client() -> openai.AsyncOpenAI:
+    """
+    Returns a new AsyncOpenAI client.
+    Not cached: an async client is bound to the event loop it is used in,
+    so each asyncio.run() batch creates (and closes) its own client.
+    """
+    api_key = settings.OPENAI_API_KEY
+    if not api_key:
+        logger.error("OPENAI_API_KEY not set in configuration.")
+        raise ValueError("OPENAI_API_KEY not set in configuration.")
+    return openai.AsyncOpenAI(api_key=api_key, base_url=settings.OPENAI_BASE_URL, max_retries=_sdk_max_retries())
+
+
+def create_chat_completions(requests: List[dict], concurrency: int, timeout: float) -> List[Optional[str]]:
+    """
+    Runs a batch of chat.completions requests concurrently and returns the
+    stripped message contents in input order.
+    At most `concurrency` requests are in flight at once and each one is bounded
+    by `timeout` seconds. A failed or timed-out request yields None without
+    affecting the rest of the batch.
+    """
+    if not requests:
+        return []
+    return asyncio.run(_create_chat_completions_async(requests, concurrency, timeout))
+
+
+async def _create_chat_completions_async(requests: List[dict], concurrency: int, timeout: float) -> List[Optional[str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with create_async_openai_client() as client:
+        async def complete(request: dict) -> Optional[str]:
+            async with semaphore:
+                try:
+                    response = await OpenAIRateLimiter.acall(
+                        request["model"], request,
+                        lambda: asyncio.wait_for(client.chat.completions.create(**request), timeout=timeout)
+                    )
+                    return response.choices[0].message.content.strip()
+                except asyncio.TimeoutError:
+                    logger.error(f"Chat completion timed out after {timeout} seconds.")
+                except openai.APIError as e:
+                    logger.error(f"OpenAI API call failed: {e}")
+                except Exception as e:
+                    logger.error(f"Unexpected error during chat completion: {e}")
+                return None
+
+        results = await asyncio.gather(*(complete(request) for request in requests))
+
+    failed = sum(1 for result in results if result is None)
+    if failed:
+        logger.warning(f"{failed} of {len(requests)} chat completions failed.")
+    return list(results)
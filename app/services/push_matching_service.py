@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.models.job import Job
+from app.models.resume import Resume
+from app.models.user import User
+from app.services.matching_engine import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class PushMatchingService:
+    """
+    推送式匹配：岗位向量生成后立即与所有活跃用户的最新简历向量打分，
+    而不是每天由每个用户去岗位表里检索一次。
+
+    每份简历的候选岗位按岗位创建日期分桶，存放在 Redis 有序集合
+    match_candidates:{resume_id}:{YYYYMMDD} 中 (score 为 cosine 相似度)，每个桶只保留前
+    PUSH_MATCHING_CANDIDATES 个。匹配任务读取时间窗口覆盖的桶即可得到候选，
+    桶随时间窗口一起过期，旧岗位不会长期占据名额。
+    """
+
+    CANDIDATES_KEY = "match_candidates:{resume_id}:{day}"
+
+    # 进程内缓存：(loaded_at, user_ids, resume_ids, matrix)
+    _resume_matrix_cache = None
+
+    @classmethod
+    def _candidates_key(cls, resume_id, day: datetime) -> str:
+        return cls.CANDIDATES_KEY.format(resume_id=resume_id, day=day.strftime("%Y%m%d"))
+
+    @classmethod
+    def _load_resume_matrix(cls, db: Session) -> Tuple[List[UUID], List[UUID], np.ndarray]:
+        """
+        加载所有活跃用户最新简历的向量矩阵 (已归一化)，在 MATCHING_MATRIX_CACHE_SECONDS 内复用
+        """
+        cached = cls._resume_matrix_cache
+        if cached and time.monotonic() - cached[0] < settings.MATCHING_MATRIX_CACHE_SECONDS:
+            return cached[1], cached[2], cached[3]
+
+        rows = db.query(Resume.user_id, Resume.id, Resume.embedding).join(
+            User, User.id == Resume.user_id
+        ).filter(
+            User.is_active == True,
+            Resume.embedding.isnot(None),
+            Resume.status == 'parsed'
+        ).distinct(Resume.user_id).order_by(Resume.user_id, Resume.created_at.desc()).all()
+
+        user_ids = [row[0] for row in rows]
+        resume_ids = [row[1] for row in rows]
+        matrix = normalize_rows(np.vstack([row[2] for row in rows])) if rows else np.empty((0, 0), dtype=np.float32)
+
+        cls._resume_matrix_cache = (time.monotonic(), user_ids, resume_ids, matrix)
+        logger.info(f"Loaded {len(resume_ids)} resume embeddings for push matching.")
+        return user_ids, resume_ids, matrix
+
+    @classmethod
+    def push_jobs(cls, db: Session, jobs: List[Job]) -> int:
+        """
+        将一批刚生成向量的岗位与所有最新简历打分，并更新每份简历的候选有序集合。
+        返回候选集合发生更新的简历数量。
+        """
+        jobs = [job for job in jobs if job.embedding is not None]
+        if not jobs:
+            return 0
+
+        _, resume_ids, resume_matrix = cls._load_resume_matrix(db)
+        if not resume_ids:
+            return 0
+
+        job_matrix = normalize_rows(np.vstack([job.embedding for job in jobs]))
+        similarities = resume_matrix @ job_matrix.T  # (简历数, 岗位数)
+
+        # 同一批岗位按创建日期分桶
+        jobs_by_day = defaultdict(list)
+        for column, job in enumerate(jobs):
+            created_at = (job.created_at or datetime.now(timezone.utc)).astimezone(timezone.utc)
+            jobs_by_day[created_at.date()].append(column)
+
+        keep = settings.PUSH_MATCHING_CANDIDATES
+        ttl_seconds = int(timedelta(days=settings.PUSH_MATCHING_RETENTION_DAYS).total_seconds())
+
+        redis_client = get_redis_client()
+        pipeline = redis_client.pipeline(transaction=False)
+        for day, columns in jobs_by_day.items():
+            day_scores = similarities[:, columns]
+            # 每份简历在本批中只需推送本批的前 keep 个岗位
+            top_count = min(keep, len(columns))
+            if top_count < len(columns):
+                top = np.argpartition(-day_scores, top_count - 1, axis=1)[:, :top_count]
+            else:
+                top = np.tile(np.arange(len(columns)), (len(resume_ids), 1))
+
+            for row, resume_id in enumerate(resume_ids):
+                key = cls._candidates_key(resume_id, day)
+                pipeline.zadd(key, {str(jobs[columns[c]].id): float(day_scores[row, c]) for c in top[row]})
+                # 只保留分数最高的 keep 个
+                pipeline.zremrangebyrank(key, 0, -(keep + 1))
+                pipeline.expire(key, ttl_seconds)
+        pipeline.execute()
+
+        logger.info(f"Pushed {len(jobs)} newly embedded jobs to candidate sets of {len(resume_ids)} resumes.")
+        return len(resume_ids)
+
+    @classmethod
+    def get_candidates(cls, resume_ids: List[UUID], start_datetime: datetime, top_k: int) -> Dict[UUID, List[Tuple[UUID, float]]]:
+        """
+        读取每份简历在时间窗口内的候选岗位，返回 {resume_id: [(job_id, similarity), ...]}，按相似度降序。
+        调用方需再按岗位创建时间精确过滤，因此这里多取一些候选。
+        """
+        now_utc = datetime.now(timezone.utc)
+        days = []
+        day = start_datetime.astimezone(timezone.utc).date()
+        while day <= now_utc.date():
+            days.append(day)
+            day += timedelta(days=1)
+
+        fetch_count = max(top_k * 2, top_k + 10)
+        redis_client = get_redis_client()
+        pipeline = redis_client.pipeline(transaction=False)
+        for resume_id in resume_ids:
+            for day in days:
+                pipeline.zrevrange(cls._candidates_key(resume_id, day), 0, fetch_count - 1, withscores=True)
+        results = pipeline.execute()
+
+        candidates = {}
+        for index, resume_id in enumerate(resume_ids):
+            merged = []
+            for day_result in results[index * len(days):(index + 1) * len(days)]:
+                merged.extend((UUID(job_id), score) for job_id, score in day_result)
+            merged.sort(key=lambda item: item[1], reverse=True)
+            candidates[resume_id] = merged[:fetch_count]
+        return candidates
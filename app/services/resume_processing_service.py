@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 from app.models.resume import Resume
 from app.services.s3_service import s3_service
 from app.services.openai_service import get_openai_client
+from app.services.openai_rate_limiter import OpenAIRateLimiter
+from app.services.embedding_service import EmbeddingService
 from uuid import UUID
 from datetime import datetime
 import json
@@ -89,14 +91,17 @@ class ResumeProcessingService:
         '''
         try:
             logger.info("Calling OpenAI ChatCompletion API...")
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
+            request = {
+                "model": "gpt-4o",
+                "messages": [
                     {"role": "system", "content": "You are an expert HR assistant specializing in resume analysis."},
                     {"role": "user", "content": prompt}
                 ],
-                response_format={"type": "json_object"},
-                temperature=0.2,
+                "response_format": {"type": "json_object"},
+                "temperature": 0.2,
+            }
+            response = OpenAIRateLimiter.call(
+                request["model"], request, lambda: client.chat.completions.create(**request)
             )
             
             response_data = json.loads(response.choices[0].message.content)
@@ -113,17 +118,11 @@ class ResumeProcessingService:
             raise
 
     @staticmethod
-    def _get_embedding(content: str) -> Optional[List[float]]:
+    def _get_embedding(content: str, db: Optional[Session] = None) -> Optional[List[float]]:
         """Generates a vector embedding for the resume content."""
-        client = get_openai_client()
-            
         try:
             logger.info("Calling OpenAI Embedding API...")
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=content[:8191] # Respect token limits
-            )
-            embedding = response.data[0].embedding
+            embedding = EmbeddingService.embed_text(content[:8191], db=db) # Respect token limits
             logger.info(f"Successfully generated embedding of dimension {len(embedding)}.")
             return embedding
         except Exception as e:
@@ -172,8 +171,10 @@ class ResumeProcessingService:
                 f"Full Resume Content:\n{parsed_content}"
             )
 
-            embedding = cls._get_embedding(embedding_content)
+            embedding = cls._get_embedding(embedding_content, db)
             resume.embedding = embedding
+            # 向量变化后需要重新与整个时间窗口匹配
+            resume.matched_until = None
 
             # 6. Final update to 'parsed'
             resume.status = 'parsed'
@@ -2,8 +2,15 @@ from app.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.services.job_scraper_service import JobScraperService
 from app.services.job_matching_service import JobMatchingService
+from app.services.match_analysis_batch_service import MatchAnalysisBatchService
+from app.services.job_digest_service import JobDigestService
+from app.services.job_processing_service import JobProcessingService
+from app.services.job_stats_service import JobStatsService
+from app.services.job_snapshot_service import JobSnapshotService
+from app.services.push_matching_service import PushMatchingService
 from app.models.user import User
-from celery import group, chain
+from app.core.config import settings
+from celery import group, chain, chord
 import logging
 from uuid import UUID
 
@@ -31,6 +38,57 @@ def scrape_all_jobs():
     finally:
         db.close()
 
+@celery_app.task(name="app.tasks.backfill_job_embeddings")
+def backfill_job_embeddings(_=None):
+    """
+    Celery task to embed jobs that are still missing a vector (new jobs when
+    EMBEDDING_ON_SCRAPE is off, and earlier failures whose backoff has elapsed).
+    Runs on its own beat schedule and as a step of the daily flow.
+    """
+    logger.info("Starting job embedding backfill task...")
+    db = SessionLocal()
+    try:
+        embedded_jobs = JobProcessingService.backfill_missing_embeddings(db)
+        if embedded_jobs:
+            if settings.MATCHING_BACKEND == "push":
+                PushMatchingService.push_jobs(db, embedded_jobs)
+            JobStatsService.refresh_all(db)
+            if settings.JOB_SNAPSHOT_ENABLED:
+                JobSnapshotService.publish_snapshot(db)
+        logger.info(f"Job embedding backfill task finished successfully. Embedded {len(embedded_jobs)} jobs.")
+        return len(embedded_jobs)
+    except Exception as e:
+        db.rollback()
+        # Not re-raised so the daily chain goes on; the jobs stay in the backlog for the next run
+        logger.error(f"Job embedding backfill task failed: {e}", exc_info=True)
+        return 0
+    finally:
+        db.close()
+
+@celery_app.task(name="app.tasks.digest_new_jobs")
+def digest_new_jobs(_=None):
+    """
+    Celery task to summarize newly scraped jobs into compact requirement digests
+    that replace the raw descriptions in match analysis prompts.
+    """
+    if not settings.JOB_DIGEST_ENABLED:
+        logger.info("Job digests are disabled. Skipping digest task.")
+        return 0
+
+    logger.info("Starting job digest task...")
+    db = SessionLocal()
+    try:
+        digested_count = JobDigestService.digest_pending_jobs(db)
+        logger.info(f"Job digest task finished successfully. Digested {digested_count} jobs.")
+        return digested_count
+    except Exception as e:
+        db.rollback()
+        # Matching still works without digests (it falls back to the raw description)
+        logger.error(f"Job digest task failed: {e}", exc_info=True)
+        return 0
+    finally:
+        db.close()
+
 @celery_app.task(name="app.tasks.match_jobs_for_user")
 def match_jobs_for_user(user_id_str: str):
     """
@@ -52,12 +110,51 @@ def match_jobs_for_user(user_id_str: str):
     finally:
         db.close()
 
+@celery_app.task(name="app.tasks.match_jobs_for_users")
+def match_jobs_for_users(user_id_strs: list):
+    """
+    Celery task to find and analyze job matches for a chunk of users at once.
+    The chunk's resumes are fetched and scored together and all matches are
+    written in a single transaction.
+    """
+    logger.info(f"Starting batched job matching task for {len(user_id_strs)} users.")
+    db = SessionLocal()
+    try:
+        user_ids = [UUID(user_id_str) for user_id_str in user_id_strs]
+        created_count = JobMatchingService.find_and_analyze_matches_for_users(db, user_ids, top_k)
+        logger.info(f"Batched job matching task finished successfully. Created {created_count} matches.")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batched job matching task for {len(user_id_strs)} users failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+@celery_app.task(name="app.tasks.match_all_users_set_based")
+def match_all_users_set_based():
+    """
+    Celery task to match all active users with a single set-based SQL statement.
+    """
+    logger.info("Starting set-based job matching task for all active users...")
+    db = SessionLocal()
+    try:
+        created_count = JobMatchingService.match_all_users_set_based(db, top_k)
+        logger.info(f"Set-based job matching task finished successfully. Created {created_count} matches.")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Set-based job matching task failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
 @celery_app.task(name="app.tasks.run_daily_flow")
 def run_daily_flow():
     """
     Main scheduled Celery task to run the entire daily flow:
     1. Scrape all jobs.
-    2. For each active user, run the job matching task in parallel.
+    2. Embed any jobs that are still missing a vector.
+    3. Summarize the new jobs into digests used by the match analysis prompts.
+    4. For each active user, run the job matching task in parallel.
     """
     logger.info("Starting daily job matching flow...")
     
@@ -67,15 +164,28 @@ def run_daily_flow():
     
     # Note: The logic to get user IDs and create the group of matching tasks
     # needs to be in a separate task to ensure it runs *after* scraping is done.
-    chain(scrape_all_jobs.s(), trigger_matching_for_all_users.s()).apply_async()
+    chain(
+        scrape_all_jobs.s(), backfill_job_embeddings.s(), digest_new_jobs.s(), trigger_matching_for_all_users.s()
+    ).apply_async()
 
 @celery_app.task(name="app.tasks.trigger_matching_for_all_users")
 def trigger_matching_for_all_users(_):
     """
-    This task fetches all active users and creates a parallel matching task for each.
+    This task fetches all active users and creates a parallel matching task for each
+    chunk of MATCHING_CHUNK_SIZE users.
     It's designed to be called after the scraping task is complete.
     """
     logger.info("Scraping finished. Triggering matching for all active users.")
+
+    if settings.MATCHING_SET_BASED:
+        # All users are matched inside Postgres by a single statement
+        if settings.MATCH_ANALYSIS_MODE == "batch":
+            chain(match_all_users_set_based.si(), submit_match_analysis_batch.s()).apply_async()
+        else:
+            match_all_users_set_based.delay()
+        logger.info("Successfully launched set-based matching task.")
+        return
+
     db = SessionLocal()
     try:
         active_user_ids = db.query(User.id).filter(User.is_active == True).all()
@@ -87,12 +197,22 @@ def trigger_matching_for_all_users(_):
         # Convert UUID objects to strings for Celery serialization
         user_id_strs = [str(user_id[0]) for user_id in active_user_ids]
         
-        logger.info(f"Found {len(user_id_strs)} active users. Creating parallel matching tasks.")
+        chunk_size = settings.MATCHING_CHUNK_SIZE
+        user_id_chunks = [user_id_strs[i:i + chunk_size] for i in range(0, len(user_id_strs), chunk_size)]
+        
+        logger.info(f"Found {len(user_id_strs)} active users. Creating {len(user_id_chunks)} parallel matching tasks.")
         
         # Create a group of tasks to run in parallel
-        # This will allow us to match jobs for all active users concurrently
-        matching_tasks = group(match_jobs_for_user.s(user_id_str) for user_id_str in user_id_strs)
-        matching_tasks.apply_async()
+        # Each task scores a whole chunk of users, keeping broker traffic and per-task overhead low
+        matching_tasks = group(match_jobs_for_users.s(chunk) for chunk in user_id_chunks)
+        if settings.MATCH_ANALYSIS_MODE == "batch":
+            # Matches are written without analyses; one batch covers them all once every chunk is done.
+            # If a chunk fails the chord body is not run, so the errback submits what the other chunks wrote.
+            submit_batch = submit_match_analysis_batch.si()
+            submit_batch.link_error(submit_match_analysis_batch.si())
+            chord(matching_tasks)(submit_batch)
+        else:
+            matching_tasks.apply_async()
         
         logger.info("Successfully launched all user matching tasks.")
 
@@ -101,3 +221,60 @@ def trigger_matching_for_all_users(_):
         raise
     finally:
         db.close()
+
+@celery_app.task(name="app.tasks.submit_match_analysis_batch")
+def submit_match_analysis_batch(_=None):
+    """
+    Celery task to submit all pending match analyses as one Batch API job
+    and schedule polling for its results.
+    """
+    logger.info("Submitting pending match analyses to the batch endpoint...")
+    db = SessionLocal()
+    try:
+        batch_id = MatchAnalysisBatchService.submit_pending_analyses(db)
+        if batch_id:
+            poll_match_analysis_batch.apply_async((batch_id,), countdown=settings.MATCH_ANALYSIS_BATCH_POLL_SECONDS)
+        return batch_id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Submitting match analysis batch failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+@celery_app.task(name="app.tasks.poll_match_analysis_batch", bind=True, max_retries=None)
+def poll_match_analysis_batch(self, batch_id: str):
+    """
+    Celery task that polls a match analysis batch and writes its results back
+    into job_matches.analysis once it has finished. Re-schedules itself while
+    the batch is still running (batches expire after 24h at the latest).
+    """
+    db = SessionLocal()
+    try:
+        written_count = MatchAnalysisBatchService.collect_batch_results(db, batch_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Polling match analysis batch {batch_id} failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+    if written_count is None:
+        raise self.retry(countdown=settings.MATCH_ANALYSIS_BATCH_POLL_SECONDS)
+    logger.info(f"Match analysis batch {batch_id} finished. Wrote {written_count} analyses.")
+    return written_count
+
+@celery_app.task(name="app.tasks.evaluate_matching_recall")
+def evaluate_matching_recall(top_k: int = 10, days: int = 1, sample_size: int = 20):
+    """
+    Celery task to compare ANN index results against exact search and report recall.
+    """
+    logger.info("Starting vector search recall evaluation...")
+    db = SessionLocal()
+    try:
+        return JobMatchingService.evaluate_search_recall(db, top_k=top_k, days=days, sample_size=sample_size)
+    except Exception as e:
+        logger.error(f"Vector search recall evaluation failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+"""
+Local deterministic stand-in for the OpenAI API, for load tests and benchmarks.
+
+Serves /v1/models, /v1/embeddings and /v1/chat/completions (including stream=True)
+with deterministic output: the same input always yields the same vector or text.
+Embeddings are feature-hashed bags of words, so texts that share words are
+close in cosine space and vector matching still behaves sensibly.
+
+Point the application at it with:
+    OPENAI_BASE_URL=http://localhost:8001/v1
+    OPENAI_VERIFY_ON_INIT=false
+
+Run:
+    python fake_openai_server.py            (or: uvicorn fake_openai_server:app --port 8001)
+
+Behavior is configured with environment variables:
+    FAKE_OPENAI_PORT                  port when run as a script (default 8001)
+    FAKE_OPENAI_EMBEDDING_LATENCY_MS  median latency of an embeddings request (default 50)
+    FAKE_OPENAI_CHAT_LATENCY_MS       median latency of a chat completion (default 800)
+    FAKE_OPENAI_LATENCY_SIGMA         log-normal shape of the latency distribution, 0 = fixed (default 0.5)
+    FAKE_OPENAI_ERROR_RATE            probability of a 500 response (default 0)
+    FAKE_OPENAI_RPM_LIMIT             requests per minute per model before 429s, 0 = unlimited (default 0)
+    FAKE_OPENAI_SEED                  seed for the latency/error random generator (default 0)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import defaultdict, deque
+from typing import List, Optional, Union
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_OPENAI_EMBEDDING_LATENCY_MS", "50"))
+CHAT_LATENCY_MS = float(os.getenv("FAKE_OPENAI_CHAT_LATENCY_MS", "800"))
+LATENCY_SIGMA = float(os.getenv("FAKE_OPENAI_LATENCY_SIGMA", "0.5"))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+RPM_LIMIT = int(os.getenv("FAKE_OPENAI_RPM_LIMIT", "0"))
+
+EMBEDDING_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+CHAT_MODELS = ["gpt-4-turbo", "gpt-4o", "gpt-4o-mini"]
+
+app = FastAPI(title="Fake OpenAI API")
+
+_random = random.Random(int(os.getenv("FAKE_OPENAI_SEED", "0")))
+# Request timestamps per model within the last minute (rate-limit simulation)
+_recent_requests = defaultdict(deque)
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: Union[str, List[str]]
+    dimensions: Optional[int] = None
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str
+    messages: List[dict]
+    stream: bool = False
+    max_tokens: Optional[int] = None
+    response_format: Optional[dict] = None
+
+    model_config = {"extra": "allow"}
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _error(status_code: int, message: str, error_type: str, code: str, headers: Optional[dict] = None) -> JSONResponse:
+    body = {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+
+async def _simulate(model: str, median_ms: float) -> Optional[JSONResponse]:
+    """
+    Applies the configured rate limit, error rate and latency. Returns an error response or None.
+    """
+    if RPM_LIMIT > 0:
+        now = time.monotonic()
+        recent = _recent_requests[model]
+        while recent and now - recent[0] > 60:
+            recent.popleft()
+        if len(recent) >= RPM_LIMIT:
+            retry_after = max(1, int(60 - (now - recent[0])) + 1)
+            return _error(
+                429, f"Rate limit reached for {model} on requests per min (RPM): Limit {RPM_LIMIT}.",
+                "requests", "rate_limit_exceeded",
+                headers={"retry-after": str(retry_after), "x-ratelimit-remaining-requests": "0"}
+            )
+        recent.append(now)
+
+    if median_ms > 0:
+        latency = median_ms * (_random.lognormvariate(0, LATENCY_SIGMA) if LATENCY_SIGMA > 0 else 1.0)
+        await asyncio.sleep(latency / 1000)
+
+    if ERROR_RATE > 0 and _random.random() < ERROR_RATE:
+        return _error(500, "The server had an error while processing your request.", "server_error", "server_error")
+    return None
+
+
+def _embed(text: str, dimensions: int) -> List[float]:
+    """
+    Feature hashing: each word adds +-1 at a hashed position. Deterministic, and
+    texts sharing vocabulary get a high cosine similarity.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        value = int(_digest(word)[:16], 16)
+        vector[value % dimensions] += 1.0 if (value >> 63) & 1 else -1.0
+    if not vector.any():
+        vector[int(_digest(text)[:16], 16) % dimensions] = 1.0
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _chat_content(request: ChatCompletionRequest) -> str:
+    """
+    Deterministic reply shaped like what each of the application's prompts expects.
+    """
+    prompt = "\n".join(str(message.get("content") or "") for message in request.messages)
+    key = _digest(request.model, prompt)[:8]
+    wants_json = (request.response_format or {}).get("type") == "json_object"
+
+    if wants_json and '"analyses"' in prompt:
+        job_count = len(re.findall(r"--- 职位 \d+ ---", prompt))
+        return json.dumps({"analyses": [
+            {"job": number, "analysis": f"[fake {key}-{number}] The candidate's experience matches job {number}."}
+            for number in range(1, job_count + 1)
+        ]}, ensure_ascii=False)
+    if wants_json and "professional_summary" in prompt:
+        return json.dumps({
+            "professional_summary": f"[fake {key}] Experienced professional.",
+            "skills": ["Python", "SQL", "Communication"],
+            "potential_job_titles": ["Software Engineer", "Data Engineer", "Backend Developer"],
+        })
+    if wants_json:
+        return json.dumps({"result": f"[fake {key}]"})
+    return f"[fake {key}] The candidate's skills and experience align well with the key requirements of this role."
+
+
+@app.get("/v1/models")
+async def list_models():
+    models = list(EMBEDDING_DIMENSIONS) + CHAT_MODELS
+    return {"object": "list", "data": [{"id": model, "object": "model", "created": 0, "owned_by": "fake"} for model in models]}
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(request: EmbeddingRequest):
+    error = await _simulate(request.model, EMBEDDING_LATENCY_MS)
+    if error:
+        return error
+
+    inputs = [request.input] if isinstance(request.input, str) else request.input
+    dimensions = request.dimensions or EMBEDDING_DIMENSIONS.get(request.model, 1536)
+    prompt_tokens = sum(_count_tokens(text) for text in inputs)
+    return {
+        "object": "list",
+        "data": [{"object": "embedding", "index": index, "embedding": _embed(text, dimensions)} for index, text in enumerate(inputs)],
+        "model": request.model,
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def create_chat_completion(request: ChatCompletionRequest, http_request: Request):
+    error = await _simulate(request.model, 0 if request.stream else CHAT_LATENCY_MS)
+    if error:
+        return error
+
+    content = _chat_content(request)
+    completion_id = f"chatcmpl-fake{_digest(content)[:20]}"
+    created = int(time.time())
+    prompt_tokens = sum(_count_tokens(str(message.get("content") or "")) for message in request.messages)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _count_tokens(content),
+             "total_tokens": prompt_tokens + _count_tokens(content)}
+
+    if not request.stream:
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": request.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def event_stream():
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        # Spread the configured latency over the streamed chunks
+        delay = CHAT_LATENCY_MS / 1000 / len(pieces)
+        for index, piece in enumerate(pieces):
+            delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": request.model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if await http_request.is_disconnected():
+                return
+            await asyncio.sleep(delay)
+        final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": request.model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("FAKE_OPENAI_PORT", "8001")))
@@ -0,0 +1,131 @@
+import httpx
+import openai
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+from app.services.openai_rate_limiter import RateLimitWaitTimeout
+
+
+def _api_error(error_class, status_code: int):
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+    return error_class("error", response=response, body=None)
+
+
+class FakeEmbeddings:
+    """
+    Stands in for the embeddings endpoint: texts listed in `bad` get the whole request
+    rejected with a 400, and `error` (if set) fails every request.
+    """
+
+    def __init__(self, bad=(), error=None):
+        self.bad = set(bad)
+        self.error = error
+        self.requests = []
+
+    def __call__(self, texts, model):
+        self.requests.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        if self.bad.intersection(texts):
+            raise _api_error(openai.BadRequestError, 400)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    def install(**kwargs):
+        fake = FakeEmbeddings(**kwargs)
+        monkeypatch.setattr(EmbeddingService, "_request_embeddings", staticmethod(fake))
+        return fake
+    monkeypatch.setattr("app.services.embedding_service.settings.EMBEDDING_BATCH_MAX_INPUTS", 8)
+    return install
+
+
+def test_bad_input_is_isolated_by_halving(fake_embeddings):
+    fake = fake_embeddings(bad={"text 5"})
+    texts = [f"text {number}" for number in range(8)]
+
+    embeddings = EmbeddingService.embed_texts(texts)
+
+    assert [embedding is None for embedding in embeddings] == [number == 5 for number in range(8)]
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1: far fewer requests than one per text after the first failure
+    assert len(fake.requests) == 7
+    assert ["text 5"] in fake.requests
+
+
+@pytest.mark.parametrize("error", [
+    _api_error(openai.AuthenticationError, 401),
+    _api_error(openai.RateLimitError, 429),
+    _api_error(openai.InternalServerError, 500),
+    RateLimitWaitTimeout("no capacity"),
+])
+def test_non_input_errors_make_no_extra_requests(fake_embeddings, error):
+    fake = fake_embeddings(error=error)
+    texts = [f"text {number}" for number in range(20)]  # three requests of at most 8 texts
+
+    embeddings = EmbeddingService.embed_texts(texts)
+
+    assert embeddings == [None] * 20
+    assert len(fake.requests) == 1
+
+
+@pytest.fixture
+def cache_db(monkeypatch):
+    engine = create_engine("sqlite://")
+    EmbeddingCache.__table__.create(engine)
+    stats = []
+    monkeypatch.setattr(EmbeddingService, "_record_cache_stats",
+                        classmethod(lambda cls, hits, misses: stats.append((hits, misses))))
+    monkeypatch.setattr("app.services.embedding_service.settings.EMBEDDING_CACHE_ENABLED", True)
+    with Session(engine) as db:
+        db.stats = stats
+        yield db
+
+
+def test_cache_miss_embeds_and_stores_by_content_hash_and_model(fake_embeddings, cache_db):
+    fake = fake_embeddings()
+
+    embeddings = EmbeddingService.embed_texts(["python", "golang", "python"], db=cache_db)
+
+    assert embeddings == [[6.0, 1.0], [6.0, 1.0], [6.0, 1.0]]
+    # Identical texts are sent once
+    assert fake.requests == [["python", "golang"]]
+    assert cache_db.stats == [(0, 3)]
+    cached = cache_db.query(EmbeddingCache.content_hash, EmbeddingCache.model).all()
+    assert sorted(cached) == sorted([
+        (EmbeddingService.content_hash("python"), EmbeddingService.DEFAULT_MODEL),
+        (EmbeddingService.content_hash("golang"), EmbeddingService.DEFAULT_MODEL),
+    ])
+
+
+def test_cache_hit_makes_no_request(fake_embeddings, cache_db):
+    fake = fake_embeddings()
+    EmbeddingService.embed_texts(["python"], db=cache_db)
+
+    embeddings = EmbeddingService.embed_texts(["python", "rust"], db=cache_db)
+
+    assert embeddings == [[6.0, 1.0], [4.0, 1.0]]
+    assert fake.requests == [["python"], ["rust"]]
+    assert cache_db.stats[-1] == (1, 1)
+
+
+def test_model_change_misses_the_cache(fake_embeddings, cache_db):
+    fake = fake_embeddings()
+    EmbeddingService.embed_texts(["python"], db=cache_db)
+
+    EmbeddingService.embed_texts(["python"], model="text-embedding-3-large", db=cache_db)
+
+    assert fake.requests == [["python"], ["python"]]
+    assert cache_db.stats[-1] == (0, 1)
+    assert cache_db.query(EmbeddingCache).count() == 2
+
+
+def test_failed_texts_are_not_cached(fake_embeddings, cache_db):
+    fake_embeddings(bad={"broken"})
+
+    embeddings = EmbeddingService.embed_texts(["python", "broken"], db=cache_db)
+
+    assert embeddings == [[6.0, 1.0], None]
+    assert [row.content_hash for row in cache_db.query(EmbeddingCache)] == [EmbeddingService.content_hash("python")]
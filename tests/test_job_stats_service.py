@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.core.auth_deps import get_current_admin_user
+from app.models.job_window_stats import JobWindowStats
+from app.services.job_stats_service import JobStatsService
+
+
+class ReadOnlySession:
+    """
+    Serves stored rows by primary key and fails on anything that would write.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get(self, model, key):
+        return self.rows.get(key)
+
+    def execute(self, *args, **kwargs):
+        raise AssertionError("get_window_stats must not write")
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    def compute(db, days):
+        now = datetime.now(timezone.utc)
+        return {"window_days": days, "window_start": now - timedelta(days=days),
+                "total_jobs": 10, "jobs_with_embedding": 7, "computed_at": now}
+    monkeypatch.setattr(JobStatsService, "_compute_window_values", staticmethod(compute))
+    monkeypatch.setattr("app.services.job_stats_service.settings.JOB_STATS_WINDOWS", [1, 7])
+
+
+def _row(days, age_minutes):
+    computed_at = datetime.now(timezone.utc) - timedelta(minutes=age_minutes)
+    return JobWindowStats(window_days=days, window_start=computed_at - timedelta(days=days),
+                          total_jobs=3, jobs_with_embedding=3, computed_at=computed_at)
+
+
+def test_fresh_row_is_returned_as_stored(computed):
+    row = _row(1, age_minutes=5)
+    assert JobStatsService.get_window_stats(ReadOnlySession({1: row}), 1) is row
+
+
+@pytest.mark.parametrize("rows, days", [({}, 1), ({1: _row(1, age_minutes=10 ** 6)}, 1), ({}, 30)])
+def test_missing_stale_or_unconfigured_windows_are_computed_without_writing(computed, rows, days):
+    stats = JobStatsService.get_window_stats(ReadOnlySession(rows), days)
+    assert (stats.window_days, stats.total_jobs, stats.jobs_missing_embedding) == (days, 10, 3)
+
+
+def test_stats_endpoints_require_admin():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_current_admin_user(SimpleNamespace(is_active=True, is_admin=False)))
+    assert error.value.status_code == 403
+
+    admin = SimpleNamespace(is_active=True, is_admin=True)
+    assert asyncio.run(get_current_admin_user(admin)) is admin
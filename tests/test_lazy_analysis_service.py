@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from app.services import lazy_analysis_service
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.lazy_analysis_service import LazyMatchAnalysisService, MatchAnalysisGenerationError
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeCompletions:
+    """
+    Streams `chunks` one event at a time; each chunk waits for `release` so tests can
+    line up concurrent requests. Raises `error` after the chunks, if set.
+    """
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def create(self, **request):
+        self.calls += 1
+
+        async def events():
+            for chunk in self.chunks:
+                await self.release.wait()
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+            if self.error is not None:
+                raise self.error
+        return events()
+
+
+class FakeOpenAI:
+    def __init__(self, completions):
+        self.chat = SimpleNamespace(completions=completions)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def lazy(monkeypatch):
+    server = fakeredis.FakeServer()
+    stored = {}
+    state = SimpleNamespace(server=server, stored=stored, completions=None)
+
+    monkeypatch.setattr(lazy_analysis_service, "create_async_redis_client",
+                        lambda: fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(lazy_analysis_service, "create_async_openai_client", lambda: FakeOpenAI(state.completions))
+    monkeypatch.setattr(lazy_analysis_service.settings, "OPENAI_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(lazy_analysis_service.settings, "OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS", 1)
+    monkeypatch.setattr(lazy_analysis_service.settings, "MATCH_ANALYSIS_TIMEOUT_SECONDS", 1)
+    monkeypatch.setattr(MatchAnalysisCache, "get_many", classmethod(lambda cls, keys: [None] * len(keys)))
+    monkeypatch.setattr(MatchAnalysisCache, "set_many", classmethod(lambda cls, entries: None))
+    monkeypatch.setattr(LazyMatchAnalysisService, "_load_analysis", staticmethod(lambda match_id: stored.get(match_id)))
+    monkeypatch.setattr(LazyMatchAnalysisService, "_save_analysis",
+                        staticmethod(lambda match_id, analysis: stored.setdefault(match_id, analysis)))
+    return state
+
+
+def _match():
+    return SimpleNamespace(
+        id=uuid.uuid4(), analysis=None,
+        resume=SimpleNamespace(parsed_content="python developer"),
+        job=SimpleNamespace(digest=None, description="backend role"),
+    )
+
+
+async def _collect(match):
+    return "".join([chunk async for chunk in LazyMatchAnalysisService.stream_analysis(match)])
+
+
+async def _holder_and_follower(match, completions):
+    holder = asyncio.create_task(_collect(match))
+    # Let the holder take the lock before the follower arrives
+    while completions.calls == 0:
+        await asyncio.sleep(0.01)
+    follower = asyncio.create_task(_collect(match))
+    await asyncio.sleep(0.05)
+    completions.release.set()
+    return await asyncio.gather(holder, follower, return_exceptions=True)
+
+
+def test_concurrent_requests_share_one_generation(lazy):
+    match = _match()
+
+    async def run():
+        lazy.completions = FakeCompletions(["Strong ", "match."])
+        return await _holder_and_follower(match, lazy.completions)
+
+    assert asyncio.run(run()) == ["Strong match.", "Strong match."]
+    assert lazy.completions.calls == 1
+    assert lazy.stored[match.id] == "Strong match."
+
+
+def test_generation_error_reaches_followers(lazy):
+    match = _match()
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    async def run():
+        lazy.completions = FakeCompletions(["Partial"], error=error)
+        return await _holder_and_follower(match, lazy.completions)
+
+    holder_result, follower_result = asyncio.run(run())
+    assert isinstance(holder_result, MatchAnalysisGenerationError)
+    assert isinstance(follower_result, MatchAnalysisGenerationError)
+    assert match.id not in lazy.stored
+
+
+def test_followers_never_read_the_previous_attempts_stream(lazy):
+    match = _match()
+
+    async def run():
+        # A failed earlier attempt left its error record behind
+        redis_client = fakeredis.aioredis.FakeRedis(server=lazy.server, decode_responses=True)
+        await redis_client.xadd(LazyMatchAnalysisService.STREAM_KEY.format(match_id=match.id), {"type": "error", "text": ""})
+        lazy.completions = FakeCompletions(["Retry ", "worked."])
+        return await _holder_and_follower(match, lazy.completions)
+
+    assert asyncio.run(run()) == ["Retry worked.", "Retry worked."]
+
+
+def test_holder_finding_a_stored_analysis_releases_followers(lazy):
+    match = _match()
+
+    async def run():
+        redis_client = fakeredis.aioredis.FakeRedis(server=lazy.server, decode_responses=True)
+        lock_key = LazyMatchAnalysisService.LOCK_KEY.format(match_id=match.id)
+        # The previous holder stored the analysis right before this request took the lock
+        lazy.stored[match.id] = "Already there."
+        holder = LazyMatchAnalysisService.stream_analysis(match)
+        first_chunk = await holder.__anext__()
+        # The holder still holds the lock, so this request follows its stream
+        assert await redis_client.exists(lock_key)
+        follower = await _collect(match)
+        await holder.aclose()
+        return first_chunk, follower, await redis_client.exists(lock_key)
+
+    assert asyncio.run(run()) == ("Already there.", "Already there.", 0)
@@ -0,0 +1,161 @@
+import json
+import logging
+import uuid
+from types import SimpleNamespace
+import pytest
+from app.services import match_analysis_batch_service
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.job_digest_service import JobDigestService
+from app.services.match_analysis_batch_service import LocalBatchAPI, MatchAnalysisBatchService
+
+MODEL = "gpt-4-turbo"
+
+
+class FakeSession:
+    """
+    Returns `matches` for every query and records the bulk updates.
+    """
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.updates = []
+        self.commits = 0
+
+    def query(self, *entities):
+        return self
+
+    def options(self, *options):
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *clauses):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def all(self):
+        return list(self.matches)
+
+    def execute(self, statement, rows):
+        self.updates.extend(rows)
+        for row in rows:
+            match = next(match for match in self.matches if match.id == row["id"])
+            for key, value in row.items():
+                setattr(match, key, value)
+
+    def commit(self):
+        self.commits += 1
+
+
+def _match(attempts=0):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        analysis=None,
+        analysis_batch_id=None,
+        analysis_attempts=attempts,
+        resume=SimpleNamespace(parsed_content="python developer"),
+        job=SimpleNamespace(description=f"job {uuid.uuid4().hex[:6]}"),
+    )
+
+
+@pytest.fixture
+def local_batch(monkeypatch, tmp_path):
+    settings = match_analysis_batch_service.settings
+    monkeypatch.setattr(settings, "MATCH_ANALYSIS_BATCH_BACKEND", "local")
+    monkeypatch.setattr(settings, "MATCH_ANALYSIS_BATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MATCH_ANALYSIS_BATCH_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(JobDigestService, "prompt_text", staticmethod(lambda job: job.description))
+    monkeypatch.setattr(MatchAnalysisCache, "get_many", classmethod(lambda cls, keys: [None] * len(keys)))
+    cached = {}
+    monkeypatch.setattr(MatchAnalysisCache, "set_many", classmethod(lambda cls, entries: cached.update(entries)))
+    return SimpleNamespace(cached=cached)
+
+
+def _output_line(custom_id, content=None, status_code=200, error=None):
+    body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+    return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body}, "error": error})
+
+
+def test_parse_output_keeps_only_successful_requests():
+    content = "\n".join([
+        _output_line("ok", "  good match  "),
+        "",
+        _output_line("server-error", "ignored", status_code=500),
+        _output_line("error", error={"code": "batch_expired"}),
+        _output_line("empty", ""),
+    ])
+
+    assert MatchAnalysisBatchService._parse_output(content) == {"ok": "good match"}
+
+
+def test_local_batch_round_trip(local_batch):
+    matches = [_match(), _match()]
+    db = FakeSession(matches)
+
+    batch_id = MatchAnalysisBatchService.submit_pending_analyses(db)
+
+    assert batch_id.startswith("batch-local-")
+    assert all(match.analysis_batch_id == batch_id for match in matches)
+    assert LocalBatchAPI().retrieve_batch(batch_id).status == "completed"
+
+    written = MatchAnalysisBatchService.collect_batch_results(db, batch_id)
+
+    assert written == 2
+    for match in matches:
+        assert match.analysis == f"[local batch] {MODEL} analysis for {match.id}"
+        assert match.analysis_batch_id is None
+        assert match.analysis_attempts == 0
+    # Placeholder analyses never reach the shared analysis cache
+    assert local_batch.cached == {}
+
+
+def test_failed_requests_are_released_and_counted(local_batch, caplog):
+    matches = [_match(attempts=0), _match(attempts=2)]
+    db = FakeSession(matches)
+    batch_id = MatchAnalysisBatchService.submit_pending_analyses(db)
+
+    # The batch expired before producing any output
+    api = LocalBatchAPI()
+    batch = json.loads(api._batch_path(batch_id).read_text())
+    api._save_batch({**batch, "status": "expired"})
+
+    with caplog.at_level(logging.ERROR):
+        written = MatchAnalysisBatchService.collect_batch_results(db, batch_id)
+
+    assert written == 0
+    assert [match.analysis for match in matches] == [None, None]
+    assert [match.analysis_batch_id for match in matches] == [None, None]
+    assert [match.analysis_attempts for match in matches] == [1, 3]
+    assert "1 matches reached 3 failed batch attempts" in caplog.text
+
+
+def test_partially_failed_batch_writes_successes_and_releases_failures(local_batch):
+    matches = [_match(), _match(attempts=1)]
+    db = FakeSession(matches)
+    batch_id = MatchAnalysisBatchService.submit_pending_analyses(db)
+
+    # The second request failed inside an otherwise completed batch
+    api = LocalBatchAPI()
+    batch = api.retrieve_batch(batch_id)
+    output = api.read_file(batch.output_file_id).splitlines()
+    api._file_path(batch.output_file_id).write_text("\n".join([output[0], _output_line(str(matches[1].id), error={"code": "server_error"})]))
+
+    assert MatchAnalysisBatchService.collect_batch_results(db, batch_id) == 1
+    assert matches[0].analysis is not None and matches[0].analysis_attempts == 0
+    assert matches[1].analysis is None and matches[1].analysis_attempts == 2
+    assert matches[1].analysis_batch_id is None
+
+
+def test_in_progress_batch_is_left_alone(local_batch, monkeypatch):
+    db = FakeSession([_match()])
+    batch_id = MatchAnalysisBatchService.submit_pending_analyses(db)
+    db.updates.clear()
+
+    in_progress = SimpleNamespace(retrieve_batch=lambda _: SimpleNamespace(id=batch_id, status="in_progress", output_file_id=None))
+    monkeypatch.setattr(MatchAnalysisBatchService, "_get_batch_api", staticmethod(lambda: in_progress))
+
+    assert MatchAnalysisBatchService.collect_batch_results(db, batch_id) is None
+    assert db.updates == []
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import uuid
+import numpy as np
+import pytest
+from app.services.job_digest_service import JobDigestService
+from app.services.job_matching_service import JobMatchingService
+from app.services.job_processing_service import JobProcessingService
+from app.services.matching_engine import JobEmbeddingMatrix, to_datetime64
+
+T0 = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def _job(minutes: int):
+    return SimpleNamespace(id=uuid.uuid4(), title=f"job {minutes}", description=f"job {minutes}",
+                           created_at=T0 + timedelta(minutes=minutes))
+
+
+def test_watermark_advances_to_scored_until_without_failures():
+    assert JobMatchingService._capped_watermark(T0, None) == T0
+
+
+def test_watermark_stops_before_oldest_failed_job():
+    failed_at = T0 - timedelta(hours=1)
+    watermark = JobMatchingService._capped_watermark(T0, failed_at)
+    assert watermark < failed_at
+    assert failed_at - watermark == timedelta(microseconds=1)
+
+
+def test_watermark_never_moves_past_scored_until():
+    assert JobMatchingService._capped_watermark(T0, T0 + timedelta(hours=1)) == T0
+
+
+@pytest.fixture
+def sync_matching(monkeypatch):
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCH_ANALYSIS_MODE", "sync")
+    monkeypatch.setattr(JobMatchingService, "_get_existing_match_pairs", classmethod(lambda cls, db, pairs: set()))
+    monkeypatch.setattr(JobMatchingService, "_bulk_insert_matches", classmethod(lambda cls, db, rows: len(rows)))
+    monkeypatch.setattr(JobDigestService, "prompt_text", staticmethod(lambda job: job.description))
+
+
+def test_failed_analyses_hold_the_watermark_before_the_oldest_failed_job(sync_matching, monkeypatch):
+    user = SimpleNamespace(id=uuid.uuid4(), username="alice")
+    resume = SimpleNamespace(id=uuid.uuid4(), parsed_content="python developer")
+    other_resume = SimpleNamespace(id=uuid.uuid4(), parsed_content="data engineer")
+    other_user = SimpleNamespace(id=uuid.uuid4(), username="bob")
+    jobs = [_job(10), _job(20), _job(30)]
+
+    # Analyses for the jobs at +10 and +30 fail for the first resume; everything else succeeds
+    failing = {("python developer", "job 10"), ("python developer", "job 30")}
+    monkeypatch.setattr(JobMatchingService, "_generate_match_analyses", classmethod(
+        lambda cls, pairs: [None if pair in failing else f"analysis of {pair[1]}" for pair in pairs]
+    ))
+
+    created_count, oldest_failed = JobMatchingService._create_matches(None, [
+        (user, resume, [(job, 0.1) for job in jobs]),
+        (other_user, other_resume, [(job, 0.2) for job in jobs]),
+    ])
+
+    assert created_count == 4
+    assert oldest_failed == {resume.id: jobs[0].created_at}
+
+    scored_until = T0 + timedelta(hours=1)
+    assert JobMatchingService._capped_watermark(scored_until, oldest_failed.get(resume.id)) < jobs[0].created_at
+    assert JobMatchingService._capped_watermark(scored_until, oldest_failed.get(other_resume.id)) == scored_until
+
+
+class _AggregateQuery:
+    def __init__(self, row):
+        self.row = row
+
+    def filter(self, *criteria):
+        return self
+
+    def one(self):
+        return self.row
+
+
+def _scored_until(monkeypatch, newest_embedded, oldest_missing, job_matrix=None):
+    db = SimpleNamespace(query=lambda *columns: _AggregateQuery((newest_embedded, oldest_missing)))
+    if job_matrix is not None:
+        monkeypatch.setattr(JobMatchingService, "_get_job_matrix",
+                            classmethod(lambda cls, db, start_datetime, days: job_matrix))
+    return JobMatchingService._get_scored_until(db, T0 - timedelta(days=1), 1, use_job_matrix=job_matrix is not None)
+
+
+def _matrix(created_minutes, pending_since=None):
+    created_at = np.array([to_datetime64(T0 + timedelta(minutes=m)) for m in created_minutes], dtype='datetime64[us]')
+    return JobEmbeddingMatrix([uuid.uuid4() for _ in created_minutes], np.ones((len(created_minutes), 2)),
+                              created_at, pending_since=pending_since)
+
+
+def test_scored_until_stops_before_jobs_awaiting_embedding(monkeypatch):
+    oldest_missing = T0 + timedelta(minutes=15)
+    assert _scored_until(monkeypatch, T0 + timedelta(minutes=30), oldest_missing) == oldest_missing - timedelta(microseconds=1)
+
+
+def test_scored_until_is_capped_at_jobs_embedded_after_the_matrix_was_loaded(monkeypatch):
+    # The job at +15 was still waiting for its embedding when the matrix was loaded and has been
+    # backfilled since, so the database no longer reports it as missing
+    job_matrix = _matrix([0, 10, 20], pending_since=T0 + timedelta(minutes=15))
+    scored_until = _scored_until(monkeypatch, T0 + timedelta(minutes=30), None, job_matrix)
+    assert scored_until == T0 + timedelta(minutes=15) - timedelta(microseconds=1)
+
+
+def test_scored_until_is_capped_at_the_newest_job_in_the_matrix(monkeypatch):
+    job_matrix = _matrix([0, 10, 20])
+    assert _scored_until(monkeypatch, T0 + timedelta(minutes=30), None, job_matrix) == T0 + timedelta(minutes=20)
+
+
+def test_pending_since_ignores_permanently_failed_jobs():
+    condition = str(JobProcessingService.awaiting_embedding().compile(compile_kwargs={"literal_binds": True}))
+    assert "embedding_attempts < " in condition
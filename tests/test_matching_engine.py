@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import uuid
+import numpy as np
+import pytest
+from app.services.job_matching_service import JobMatchingService
+from app.services.matching_engine import JobEmbeddingMatrix, normalize_rows, to_datetime64
+
+T0 = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+N_JOBS = 12
+DIM = 8
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(42)
+    return rng.normal(size=(N_JOBS, DIM)), rng.normal(size=(5, DIM))
+
+
+def _matrix(job_vectors) -> JobEmbeddingMatrix:
+    created_at = np.array([to_datetime64(T0 + timedelta(hours=i)) for i in range(len(job_vectors))], dtype='datetime64[us]')
+    return JobEmbeddingMatrix([uuid.uuid4() for _ in job_vectors], normalize_rows(job_vectors), created_at)
+
+
+def _brute_force(job_vectors, query, k, first_row=0):
+    """
+    Cosine distances to every job from first_row on, fully sorted.
+    """
+    jobs = job_vectors / np.linalg.norm(job_vectors, axis=1, keepdims=True)
+    distances = 1 - jobs @ (query / np.linalg.norm(query))
+    candidates = sorted(range(first_row, len(jobs)), key=lambda index: distances[index])[:k]
+    return candidates, [distances[index] for index in candidates]
+
+
+def _finite(indices, distances):
+    keep = np.isfinite(distances)
+    return list(indices[keep]), list(distances[keep])
+
+
+@pytest.mark.parametrize("k", [1, 3, N_JOBS - 1, N_JOBS, N_JOBS + 5])
+def test_top_k_matches_brute_force(vectors, k):
+    job_vectors, queries = vectors
+    indices, distances = _matrix(job_vectors).top_k(queries, k)
+
+    assert indices.shape == distances.shape == (len(queries), min(k, N_JOBS))
+    for row, query in enumerate(queries):
+        expected_indices, expected_distances = _brute_force(job_vectors, query, k)
+        assert list(indices[row]) == expected_indices
+        assert distances[row] == pytest.approx(expected_distances, abs=1e-5)
+
+
+@pytest.mark.parametrize("k", [2, N_JOBS + 5])
+def test_top_k_with_since_masks_older_jobs(vectors, monkeypatch, k):
+    job_vectors, queries = vectors
+    # Several query blocks, so each block applies its own offsets
+    monkeypatch.setattr(JobEmbeddingMatrix, "QUERY_BLOCK_SIZE", 2)
+    first_rows = [0, 4, 10, 11, N_JOBS]
+    since = [T0 + timedelta(hours=row) for row in first_rows]
+
+    indices, distances = _matrix(job_vectors).top_k(queries, k, since=since)
+
+    for row, (query, first_row) in enumerate(zip(queries, first_rows)):
+        expected_indices, expected_distances = _brute_force(job_vectors, query, k, first_row)
+        found_indices, found_distances = _finite(indices[row], distances[row])
+        assert found_indices == expected_indices
+        assert found_distances == pytest.approx(expected_distances, abs=1e-5)
+        # Positions without an eligible job are padded with an infinite distance
+        assert np.isinf(distances[row][len(expected_indices):]).all()
+
+
+def test_top_k_with_every_row_masked(vectors):
+    job_vectors, queries = vectors
+    indices, distances = _matrix(job_vectors).top_k(queries[:2], 3, since=[T0 + timedelta(days=1)] * 2)
+
+    assert indices.shape == (2, 3)
+    assert np.isinf(distances).all()
+
+
+def test_find_similar_jobs_numpy_path_matches_brute_force(vectors, monkeypatch):
+    job_vectors, queries = vectors
+    job_matrix = _matrix(job_vectors)
+    jobs = [SimpleNamespace(id=job_id) for job_id in job_matrix.job_ids]
+    resumes = [SimpleNamespace(id=uuid.uuid4(), embedding=query, matched_until=None) for query in queries[:2]]
+    # The second resume has already been matched up to +9h; like the SQL path, jobs from +9h on are searched
+    resumes[1].matched_until = T0 + timedelta(hours=9)
+
+    class JobQuery:
+        def filter(self, criterion):
+            ids = set(criterion.right.value)
+            self.jobs = [job for job in jobs if job.id in ids]
+            return self
+
+        def all(self):
+            return self.jobs
+
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCHING_BACKEND", "numpy")
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCHING_INCREMENTAL", True)
+    monkeypatch.setattr(JobMatchingService, "_get_job_matrix", classmethod(lambda cls, db, start, days: job_matrix))
+    db = SimpleNamespace(query=lambda entity: JobQuery())
+
+    found = JobMatchingService._find_similar_jobs_for_resumes(db, resumes, T0, 5, 1)
+
+    for resume, first_row in zip(resumes, [0, 9]):
+        expected_indices, expected_distances = _brute_force(job_vectors, resume.embedding, 5, first_row)
+        assert [job.id for job, _ in found[resume.id]] == [job_matrix.job_ids[index] for index in expected_indices]
+        assert [distance for _, distance in found[resume.id]] == pytest.approx(expected_distances, abs=1e-5)
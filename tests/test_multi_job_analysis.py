@@ -0,0 +1,95 @@
+import json
+import pytest
+import fake_openai_server
+from app.services.analysis_cache_service import MatchAnalysisCache
+from app.services.job_matching_service import JobMatchingService
+
+
+def _fake_reply(request: dict) -> str:
+    # Same deterministic replies as the local OpenAI stand-in (fake_openai_server.py)
+    return fake_openai_server._chat_content(fake_openai_server.ChatCompletionRequest(**request))
+
+
+def test_parse_orders_analyses_by_job_number():
+    content = json.dumps({"analyses": [
+        {"job": 2, "analysis": " second "},
+        {"job": 1, "analysis": "first"},
+    ]})
+    assert JobMatchingService._parse_multi_job_analyses(content, 2) == ["first", "second"]
+
+
+def test_parse_marks_missing_and_invalid_items_as_none():
+    content = json.dumps({"analyses": [
+        {"job": 1, "analysis": "first"},
+        {"job": 3, "analysis": ""},
+        {"job": 4, "analysis": "out of range"},
+        {"job": "x", "analysis": "bad number"},
+        {"analysis": "no number"},
+    ]})
+    assert JobMatchingService._parse_multi_job_analyses(content, 3) == ["first", None, None]
+
+
+@pytest.mark.parametrize("content", [None, "", "not json", "[1, 2]", json.dumps({"other": []})])
+def test_parse_unusable_content_yields_all_none(content):
+    assert JobMatchingService._parse_multi_job_analyses(content, 2) == [None, None]
+
+
+def test_parse_reads_multi_job_reply_of_fake_server():
+    request = JobMatchingService._build_multi_job_analysis_request("python developer", ["job a", "job b", "job c"])
+    analyses = JobMatchingService._parse_multi_job_analyses(_fake_reply(request), 3)
+    assert all(analyses)
+    assert len(set(analyses)) == 3
+
+
+@pytest.fixture
+def openai_calls(monkeypatch):
+    """
+    Replaces the OpenAI round trip with the fake server's replies. Multi-job replies
+    drop every job whose description contains "dropped"; returns the requests sent.
+    """
+    calls = []
+
+    def create_chat_completions(requests, concurrency, timeout):
+        replies = []
+        for request in requests:
+            calls.append(request)
+            reply = _fake_reply(request)
+            if request.get("response_format"):
+                descriptions = request["messages"][1]["content"]
+                payload = json.loads(reply)
+                payload["analyses"] = [
+                    item for item in payload["analyses"]
+                    if f"dropped-{item['job']}" not in descriptions
+                ]
+                reply = json.dumps(payload)
+            replies.append(reply)
+        return replies
+
+    monkeypatch.setattr("app.services.job_matching_service.create_chat_completions", create_chat_completions)
+    monkeypatch.setattr(MatchAnalysisCache, "get_many", classmethod(lambda cls, keys: [None] * len(keys)))
+    monkeypatch.setattr(MatchAnalysisCache, "set_many", classmethod(lambda cls, entries: None))
+    return calls
+
+
+def test_jobs_missing_from_multi_reply_fall_back_to_single_calls(openai_calls):
+    pairs = [("python developer", "job one"), ("python developer", "job dropped-2"), ("python developer", "job three")]
+
+    analyses = JobMatchingService._generate_multi_job_analyses(pairs)
+
+    assert all(analyses)
+    multi_calls = [call for call in openai_calls if call.get("response_format")]
+    single_calls = [call for call in openai_calls if not call.get("response_format")]
+    assert len(multi_calls) == 1
+    assert len(single_calls) == 1
+    assert "job dropped-2" in single_calls[0]["messages"][1]["content"]
+    assert analyses[1] == _fake_reply(JobMatchingService.build_analysis_request(*pairs[1]))
+
+
+def test_multi_reply_is_split_by_max_jobs(openai_calls, monkeypatch):
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCH_MULTI_ANALYSIS_MAX_JOBS", 2)
+    pairs = [("resume", f"job {number}") for number in range(5)]
+
+    analyses = JobMatchingService._generate_multi_job_analyses(pairs)
+
+    assert all(analyses)
+    assert len(openai_calls) == 3
@@ -0,0 +1,142 @@
+import httpx
+import openai
+import pytest
+from app.services import openai_rate_limiter
+from app.services.openai_rate_limiter import OpenAIRateLimiter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+BUCKET = "test-model"
+
+
+def _api_error(error_class, status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return error_class("error", response=response, body=None)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(openai_rate_limiter, "get_redis_client", lambda: client)
+    monkeypatch.setattr(OpenAIRateLimiter, "_acquire_script", None)
+    monkeypatch.setattr(openai_rate_limiter.settings, "OPENAI_RPM_LIMIT", 3)
+    monkeypatch.setattr(openai_rate_limiter.settings, "OPENAI_TPM_LIMIT", 1000)
+    monkeypatch.setattr(openai_rate_limiter.settings, "OPENAI_CIRCUIT_BREAKER_THRESHOLD", 3)
+    monkeypatch.setattr(openai_rate_limiter.settings, "OPENAI_CIRCUIT_BREAKER_RESET_SECONDS", 30)
+    return client
+
+
+def _pause_seconds(client) -> float:
+    return client.pttl(OpenAIRateLimiter.PAUSE_KEY.format(bucket=BUCKET)) / 1000
+
+
+def _rewind_bucket(client, seconds: float):
+    """
+    Moves the bucket's last refill back in time, as if `seconds` had passed.
+    """
+    bucket_key = OpenAIRateLimiter.BUCKET_KEY.format(bucket=BUCKET)
+    client.hset(bucket_key, "ts", float(client.hget(bucket_key, "ts")) - seconds)
+
+
+def _expire_pause(client):
+    client.delete(OpenAIRateLimiter.PAUSE_KEY.format(bucket=BUCKET))
+
+
+def test_request_burst_is_exhausted_then_waits_for_refill(redis_client):
+    assert [OpenAIRateLimiter._try_acquire(BUCKET, 1) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    # One request refills every 60 / OPENAI_RPM_LIMIT seconds
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 1) == pytest.approx(20, abs=0.5)
+
+
+def test_token_bucket_limits_independently_of_requests(redis_client):
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 600) == 0.0
+
+    # 400 tokens left, the missing 200 refill in 200 * 60 / 1000 seconds
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 600) == pytest.approx(12, abs=0.5)
+
+
+def test_buckets_refill_over_time(redis_client):
+    for _ in range(3):
+        OpenAIRateLimiter._try_acquire(BUCKET, 300)
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 300) > 0
+
+    _rewind_bucket(redis_client, 30)
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 300) == 0.0
+
+
+def test_rate_limit_error_pauses_the_bucket_with_exponential_backoff(redis_client):
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.RateLimitError, 429))
+    assert _pause_seconds(redis_client) == pytest.approx(1, abs=0.1)
+    assert 0 < OpenAIRateLimiter._try_acquire(BUCKET, 1) <= 1
+
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.RateLimitError, 429))
+    assert _pause_seconds(redis_client) == pytest.approx(2, abs=0.1)
+
+    # The bucket is drained, so nobody bursts once the pause is over
+    _expire_pause(redis_client)
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 1) > 0
+
+
+def test_retry_after_extends_the_pause(redis_client):
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.RateLimitError, 429, headers={"retry-after": "7"}))
+    assert _pause_seconds(redis_client) == pytest.approx(7, abs=0.1)
+
+    # A shorter backoff never cuts an existing pause
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.RateLimitError, 429))
+    assert _pause_seconds(redis_client) == pytest.approx(7, abs=0.1)
+
+
+def test_circuit_opens_after_consecutive_failures_and_half_opens_after_reset(redis_client):
+    for _ in range(2):
+        OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.InternalServerError, 500))
+    assert _pause_seconds(redis_client) < 0
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 1) == 0.0
+
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.InternalServerError, 500))
+    assert _pause_seconds(redis_client) == pytest.approx(30, abs=0.1)
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 1) == pytest.approx(30, abs=0.1)
+
+    # Half-open: once the reset period is over calls go through, and one more failure reopens the circuit
+    _expire_pause(redis_client)
+    assert OpenAIRateLimiter._try_acquire(BUCKET, 1) == 0.0
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.InternalServerError, 500))
+    assert _pause_seconds(redis_client) == pytest.approx(30, abs=0.1)
+
+
+def test_success_closes_the_circuit(redis_client):
+    for _ in range(3):
+        OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.InternalServerError, 500))
+    _expire_pause(redis_client)
+
+    OpenAIRateLimiter._record_success(BUCKET)
+    OpenAIRateLimiter._record_failure(BUCKET, _api_error(openai.InternalServerError, 500))
+    assert _pause_seconds(redis_client) < 0
+
+
+def test_call_retries_a_rate_limited_request_after_the_shared_pause(redis_client, monkeypatch):
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if seconds > 0:
+            _expire_pause(redis_client)
+            _rewind_bucket(redis_client, 60)
+
+    monkeypatch.setattr(openai_rate_limiter.settings, "OPENAI_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(openai_rate_limiter.time, "sleep", sleep)
+
+    responses = iter([_api_error(openai.RateLimitError, 429), "ok"])
+
+    def request():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert OpenAIRateLimiter.call(BUCKET, {"input": "hello"}, request) == "ok"
+    # The retry waited for the pause set by the 429 before calling again
+    assert sleeps[0] == 0.0
+    assert 0 < sleeps[1] <= 1
+    assert redis_client.get(OpenAIRateLimiter.STRIKES_KEY.format(bucket=BUCKET)) is None
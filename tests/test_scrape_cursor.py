@@ -0,0 +1,171 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from app.services.job_scraper_service import JobScraperService
+from app.services.job_scrapers.base import ScrapeResult
+from app.services.job_scrapers.hn_algolia import HnAlgoliaScraper
+from app.services.job_scrapers.arbeitnow import ArbeitnowScraper
+
+T0 = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def _job(hours: int) -> dict:
+    return {"source_id": f"job-{hours}", "posted_at": T0 + timedelta(hours=hours)}
+
+
+class StaticScraper:
+    def __init__(self, *pages: ScrapeResult):
+        self.pages = pages
+        self.queue = None
+        self.queued_before_page = []
+
+    def get_source_name(self) -> str:
+        return "static"
+
+    async def fetch_and_normalize(self, client, since=None):
+        for page in self.pages:
+            self.queued_before_page.append(self.queue.qsize())
+            yield page
+
+
+def _run_fetch_stage(*pages: ScrapeResult, limit_per_source=None, scraper=None, since=T0):
+    scraper = scraper or StaticScraper(*pages)
+
+    async def run():
+        scraper.queue = asyncio.Queue()
+        newest = {}
+        await JobScraperService._fetch_stage(scraper, None, scraper.queue, limit_per_source, since, newest)
+        return scraper.queue.qsize(), newest
+    return asyncio.run(run())
+
+
+def test_complete_fetch_advances_cursor_to_newest_posting():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(1), _job(3), _job(2)]))
+    assert queued == 3
+    assert newest == {"static": (T0 + timedelta(hours=3), "job-3")}
+
+
+def test_limit_is_not_applied_once_a_cursor_exists():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(3), _job(2), _job(1)]), limit_per_source=2)
+    assert queued == 3
+    assert newest == {"static": (T0 + timedelta(hours=3), "job-3")}
+
+
+def test_first_run_limit_starts_cursor_at_newest_ingested_posting():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(3), _job(2)]), ScrapeResult([_job(1)]),
+                                      limit_per_source=2, since=None)
+    assert queued == 2
+    assert newest == {"static": (T0 + timedelta(hours=3), "job-3")}
+
+
+def test_limit_not_reached_still_advances_cursor():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(2), _job(1)]), limit_per_source=5)
+    assert queued == 2
+    assert newest == {"static": (T0 + timedelta(hours=2), "job-2")}
+
+
+def test_partial_fetch_keeps_cursor():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(2), _job(1)], complete=False))
+    assert queued == 2
+    assert newest == {}
+
+
+def test_one_incomplete_page_keeps_cursor():
+    queued, newest = _run_fetch_stage(ScrapeResult([_job(3)]), ScrapeResult([], complete=False), ScrapeResult([_job(1)]))
+    assert queued == 2
+    assert newest == {}
+
+
+def test_pages_are_queued_while_later_pages_are_fetched():
+    scraper = StaticScraper(ScrapeResult([_job(3), _job(2)]), ScrapeResult([_job(1)]))
+    _run_fetch_stage(scraper=scraper)
+    assert scraper.queued_before_page == [0, 2]
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    monkeypatch.setattr("app.services.job_scrapers.base.settings.SCRAPER_MAX_RETRIES", 0)
+
+
+def _fetch(scraper, handler, since) -> ScrapeResult:
+    """
+    Runs a scraper against a mocked API and merges its pages into one ScrapeResult.
+    """
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            pages = [page async for page in scraper.fetch_and_normalize(client, since)]
+        return ScrapeResult([job for page in pages for job in page.jobs], all(page.complete for page in pages))
+    return asyncio.run(run())
+
+
+def _hn_page(page: int, pages: int) -> dict:
+    created = int((T0 + timedelta(minutes=100 - page)).timestamp())
+    return {"nbPages": pages, "hits": [{"objectID": f"{page}", "title": f"Job {page}", "created_at_i": created}]}
+
+
+def _hn_handler(pages: int, failing_page: int = None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        if page == failing_page:
+            return httpx.Response(404)
+        return httpx.Response(200, json=_hn_page(page, pages))
+    return handler
+
+
+def test_hn_complete_when_every_page_is_fetched():
+    result = _fetch(HnAlgoliaScraper(), _hn_handler(pages=3), since=T0)
+    assert result.complete
+    assert len(result.jobs) == 3
+
+
+def test_hn_incomplete_when_a_page_fails():
+    result = _fetch(HnAlgoliaScraper(), _hn_handler(pages=3, failing_page=1), since=T0)
+    assert not result.complete
+    assert [job["source_id"] for job in result.jobs] == ["0", "2"]
+
+
+def test_hn_incomplete_when_more_pages_than_max_pages_since_cursor():
+    scraper = HnAlgoliaScraper()
+    result = _fetch(scraper, _hn_handler(pages=scraper.MAX_PAGES + 1), since=T0)
+    assert not result.complete
+    assert len(result.jobs) == scraper.MAX_PAGES
+
+
+def test_hn_first_run_without_cursor_is_complete_at_max_pages():
+    scraper = HnAlgoliaScraper()
+    result = _fetch(scraper, _hn_handler(pages=scraper.MAX_PAGES + 1), since=None)
+    assert result.complete
+
+
+def _arbeitnow_handler(hours: list, next_page: bool):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "data": [
+                {"slug": f"job-{h}", "title": f"Job {h}", "created_at": int((T0 + timedelta(hours=h)).timestamp())}
+                for h in hours
+            ],
+            "links": {"next": "https://www.arbeitnow.com/api/job-board-api?page=2" if next_page else None},
+        })
+    return handler
+
+
+def test_arbeitnow_complete_when_cursor_is_reached():
+    result = _fetch(ArbeitnowScraper(), _arbeitnow_handler([3, 2, -1], next_page=True), since=T0)
+    assert result.complete
+    assert [job["source_id"] for job in result.jobs] == ["job-3", "job-2"]
+
+
+def test_arbeitnow_incomplete_when_next_page_may_hold_newer_postings():
+    result = _fetch(ArbeitnowScraper(), _arbeitnow_handler([3, 2], next_page=True), since=T0)
+    assert not result.complete
+
+
+def test_arbeitnow_complete_on_last_page():
+    result = _fetch(ArbeitnowScraper(), _arbeitnow_handler([3, 2], next_page=False), since=T0)
+    assert result.complete
+
+
+def test_failed_request_is_incomplete():
+    result = _fetch(ArbeitnowScraper(), lambda request: httpx.Response(404), since=T0)
+    assert result == ScrapeResult([], complete=False)
@@ -0,0 +1,104 @@
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import uuid
+import pytest
+from app.models.job import Job
+from app.services.job_digest_service import JobDigestService
+from app.services.job_matching_service import JobMatchingService
+
+T0 = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeSession:
+    """
+    Returns `inserted_ids` from the INSERT ... RETURNING statement, `matches` from ORM queries,
+    and records executed SQL, query criteria and deletions.
+    """
+
+    def __init__(self, inserted_ids=(), matches=()):
+        self.inserted_ids = list(inserted_ids)
+        self.matches = list(matches)
+        self.statements = []
+        self.criteria = []
+        self.deleted = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return [(match_id,) for match_id in self.inserted_ids] if "INSERT INTO job_matches" in str(statement) else []
+
+    def query(self, *entities):
+        return self
+
+    def options(self, *options):
+        return self
+
+    def filter(self, *criteria):
+        self.criteria.extend(criteria)
+        return self
+
+    def all(self):
+        return self.matches
+
+    def delete(self, synchronize_session=None):
+        self.deleted.append(self.criteria[-1])
+
+    def commit(self):
+        pass
+
+
+def _match(resume_id=None):
+    return SimpleNamespace(id=uuid.uuid4(), analysis=None, resume_id=resume_id or uuid.uuid4(),
+                           resume=SimpleNamespace(parsed_content="python developer"),
+                           job=SimpleNamespace(description="job", created_at=T0))
+
+
+@pytest.fixture
+def set_based(monkeypatch):
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCH_ANALYSIS_MODE", "sync")
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCHING_QUANTIZED_SEARCH", True)
+    monkeypatch.setattr(JobMatchingService, "_log_job_window_diagnostics", staticmethod(lambda db, start, days: None))
+    monkeypatch.setattr(JobMatchingService, "_get_scored_until", classmethod(lambda cls, db, start, days: None))
+    monkeypatch.setattr(JobMatchingService, "_vector_search_settings", classmethod(lambda cls, db, **kwargs: nullcontext()))
+    monkeypatch.setattr(JobDigestService, "prompt_text", staticmethod(lambda job: job.description))
+
+
+def test_halfvec_dimension_follows_the_job_embedding_column(set_based, monkeypatch):
+    monkeypatch.setattr(Job.embedding.type, "dim", 3072)
+    db = FakeSession()
+
+    JobMatchingService.match_all_users_set_based(db)
+
+    insert_sql = next(sql for sql in db.statements if "INSERT INTO job_matches" in sql)
+    assert "j.embedding::halfvec(3072) <=> lr.embedding::halfvec(3072)" in insert_sql
+    assert "1536" not in insert_sql
+
+
+def test_analyses_left_by_an_interrupted_run_are_filled(set_based, monkeypatch):
+    # A previous run committed this match and crashed before generating its analysis
+    stranded = _match()
+    db = FakeSession(inserted_ids=[], matches=[stranded])
+    monkeypatch.setattr(JobMatchingService, "_generate_match_analyses",
+                        classmethod(lambda cls, pairs: ["analysis"] * len(pairs)))
+
+    created = JobMatchingService.match_all_users_set_based(db)
+
+    assert created == 0
+    assert stranded.analysis == "analysis"
+    # Every match still missing an analysis in the window is picked up, not only this run's inserts
+    criteria = " ".join(str(criterion) for criterion in db.criteria)
+    assert "job_matches.analysis IS NULL" in criteria
+    assert "job_matches.analysis_batch_id IS NULL" in criteria
+    assert "job_matches.id IN" not in criteria
+
+
+def test_failed_analyses_are_removed_and_not_counted(set_based, monkeypatch):
+    new_match, stranded = _match(), _match()
+    db = FakeSession(inserted_ids=[new_match.id], matches=[new_match, stranded])
+    monkeypatch.setattr(JobMatchingService, "_generate_match_analyses",
+                        classmethod(lambda cls, pairs: [None] * len(pairs)))
+
+    created = JobMatchingService.match_all_users_set_based(db)
+
+    assert created == 0
+    assert len(db.deleted) == 1
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from app.models.job import Job
+from app.services.job_matching_service import JobMatchingService
+
+T0 = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+class RecordingSession:
+    """
+    Records executed SQL and ORM queries in order; current_setting() reports `indexscan`.
+    """
+
+    def __init__(self, indexscan="on", fail_query=False):
+        self.indexscan = indexscan
+        self.fail_query = fail_query
+        self.log = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.log.append(sql if params is None else f"{sql} {params}")
+        return self
+
+    def scalar(self):
+        return self.indexscan
+
+    def query(self, *entities):
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *clauses):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def join(self, target, onclause):
+        return self
+
+    def subquery(self):
+        return SimpleNamespace(c=SimpleNamespace(id=Job.id))
+
+    def all(self):
+        if self.fail_query:
+            raise RuntimeError("query failed")
+        self.log.append("vector query")
+        return []
+
+
+@pytest.fixture(autouse=True)
+def vector_support(monkeypatch):
+    monkeypatch.setattr(JobMatchingService, "_vector_support",
+                        {"iterative_scan": True, "float32_index": True, "halfvec_index": True})
+
+
+def test_exact_search_restores_index_scans_after_the_query():
+    db = RecordingSession(indexscan="on")
+
+    JobMatchingService._search_similar_jobs(db, [0.1, 0.2], T0, 3, exact=True)
+
+    assert db.log == [
+        "SELECT current_setting('enable_indexscan')",
+        "SELECT set_config('enable_indexscan', 'off', true)",
+        "vector query",
+        "SELECT set_config('enable_indexscan', :value, true) {'value': 'on'}",
+    ]
+
+
+def test_missing_index_falls_back_to_a_scoped_exact_search(monkeypatch):
+    monkeypatch.setattr(JobMatchingService, "_vector_support",
+                        {"iterative_scan": True, "float32_index": False, "halfvec_index": False})
+    monkeypatch.setattr("app.services.job_matching_service.settings.MATCHING_QUANTIZED_SEARCH", True)
+    db = RecordingSession(indexscan="off")
+
+    JobMatchingService._search_similar_jobs(db, [0.1, 0.2], T0, 3, exact=False)
+
+    assert db.log[-2:] == ["vector query", "SELECT set_config('enable_indexscan', :value, true) {'value': 'off'}"]
+
+
+def test_failed_exact_search_leaves_the_setting_to_the_rollback():
+    db = RecordingSession(fail_query=True)
+
+    with pytest.raises(RuntimeError):
+        JobMatchingService._search_similar_jobs(db, [0.1, 0.2], T0, 3, exact=True)
+
+    # The aborted transaction rejects further statements; rolling it back discards the setting
+    assert db.log[-1] == "SELECT set_config('enable_indexscan', 'off', true)"
+
+
+def test_ann_search_leaves_index_scans_alone():
+    db = RecordingSession()
+
+    JobMatchingService._search_similar_jobs(db, [0.1, 0.2], T0, 3, exact=False)
+
+    assert not any("enable_indexscan" in sql for sql in db.log)
+    assert any("hnsw.ef_search" in sql for sql in db.log)
+    assert db.log[-1] == "vector query"